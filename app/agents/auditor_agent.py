@@ -1,26 +1,61 @@
-import fnmatch
 import os
+from collections.abc import Mapping
 from pathlib import Path
-from typing import Any
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
+
+from app.utils.dir_tree import ROOT, DirTree
+from app.utils.ignore import GitIgnoreStack, IgnoreMatcher, load_gitignore
+from app.utils.manifest import FileEntry, git_manifest
+from app.utils.shards import package_roots
+
+JS_TS_SUFFIXES = frozenset([".js", ".jsx", ".ts", ".tsx"])
+PY_SUFFIXES = frozenset([".py"])
 
 
 class Files(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
     readmes: list[Path]
     package_jsons: list[Path]
     requirements_txts: list[Path]
     pyproject_tomls: list[Path]
-    dir_tree: list[dict[str, Any]]
+    dir_tree: DirTree
     js_ts_files: int = 0
     py_files: int = 0
+    # Package directories (relative, "" for the root) the analyzers shard their work by
+    packages: list[str] = [""]
+
+    # Files handed to the analyzers as explicit targets, relative to the repo root, so the
+    # tree is traversed once and every tool sees the same ignore rules. Rebuilt from the
+    # tree for each analyzer rather than kept in the workflow state alongside it
+    @property
+    def all_paths(self) -> list[str]:
+        return self.dir_tree.file_paths()
+
+    @property
+    def js_ts_paths(self) -> list[str]:
+        return self.dir_tree.file_paths(JS_TS_SUFFIXES)
+
+    @property
+    def py_paths(self) -> list[str]:
+        return self.dir_tree.file_paths(PY_SUFFIXES)
+
+    @property
+    def blob_shas(self) -> Mapping[str, str]:
+        """Git blob id of each file read from the index; keys the finding cache."""
+        return self.dir_tree.blob_shas
 
 
 class AuditorAgent:
     def __init__(self, repo_path: str):
         self.repo_path = repo_path
         self.files = Files(
-            readmes=[], package_jsons=[], requirements_txts=[], pyproject_tomls=[], dir_tree=[]
+            readmes=[],
+            package_jsons=[],
+            requirements_txts=[],
+            pyproject_tomls=[],
+            dir_tree=DirTree(repo_path),
         )
 
         self.ignore_dirs = [
@@ -83,8 +118,8 @@ class AuditorAgent:
             "Thumbs.db",
             "desktop.ini",
             # Editor files
-            ".swp",
-            ".swo",
+            "*.swp",
+            "*.swo",
             "*~",
             "*.bak",
             "*.tmp",
@@ -142,23 +177,7 @@ class AuditorAgent:
             "__pycache__",
         ]
 
-        self.js_ts_patterns = [".js", ".jsx", ".ts", ".tsx"]
-        self.py_patterns = [".py"]
-
-    def _should_ignore_file(self, filename: str) -> bool:
-        """Check if file should be ignored based on patterns."""
-        # Check exact matches
-        if filename in self.ignore_files:
-            return True
-
-        # Check pattern matches (*.pyc, *.log, etc.)
-        for pattern in self.ignore_patterns:
-            if fnmatch.fnmatch(filename, pattern):
-                return True
-
-        # Check file extensions
-        file_ext = Path(filename).suffix.lower()
-        ignore_extensions = {
+        self.ignore_extensions = [
             ".pyc",
             ".pyo",
             ".so",
@@ -188,96 +207,130 @@ class AuditorAgent:
             ".log",
             ".tmp",
             ".bak",
-        }
+        ]
 
-        if file_ext in ignore_extensions:
-            return True
+        # Compiled once per walk; see IgnoreMatcher
+        self.matcher = IgnoreMatcher(
+            self.ignore_dirs, self.ignore_files, self.ignore_patterns, self.ignore_extensions
+        )
 
-        return False
+        self.js_ts_patterns = JS_TS_SUFFIXES
+        self.py_patterns = PY_SUFFIXES
 
-    def _should_ignore_dir(self, dirname: str) -> bool:
-        """Check if directory should be ignored."""
-        # Check exact matches
-        if dirname in self.ignore_dirs:
+    def _should_ignore_file(self, filename: str, gitignore: GitIgnoreStack | None = None) -> bool:
+        """Check if file should be ignored based on patterns and the repo's .gitignore files."""
+        if self.matcher.ignore_file(filename):
             return True
+        return gitignore is not None and gitignore.ignored(filename, is_dir=False)
 
-        # Check if starts with dot (hidden directories)
-        if dirname.startswith("."):
+    def _should_ignore_dir(self, dirname: str, gitignore: GitIgnoreStack | None = None) -> bool:
+        """Check if directory should be ignored."""
+        if self.matcher.ignore_dir(dirname):
             return True
+        return gitignore is not None and gitignore.ignored(dirname, is_dir=True)
+
+    def _add_file(
+        self, parent: int, name: str, relative: str, size: int, sha: str | None = None
+    ) -> None:
+        """Record one file in the metadata, categorizing it by name and type."""
+        path = os.path.join(self.repo_path, relative)
+
+        # Categorize important files
+        if name.lower() == "readme.md":
+            self.files.readmes.append(Path(path))
+        elif name == "package.json":
+            self.files.package_jsons.append(Path(path))
+        elif name == "requirements.txt":
+            self.files.requirements_txts.append(Path(path))
+        elif name == "pyproject.toml":
+            self.files.pyproject_tomls.append(Path(path))
+
+        suffix = os.path.splitext(name)[1]
+        if suffix in self.js_ts_patterns:
+            self.files.js_ts_files += 1
+        elif suffix in self.py_patterns:
+            self.files.py_files += 1
+
+        self.files.dir_tree.add_file(parent, name, size, sha)
+
+    def _add_directory(self, parent: int, name: str) -> int:
+        return self.files.dir_tree.add_directory(parent, name)
+
+    def _load_index(self, manifest: list[FileEntry]) -> None:
+        """
+        Fill the metadata from the git index: one `git ls-files` call instead of a stat per
+        entry, and every file comes with its blob SHA. Tracked files are part of the repo
+        even if a .gitignore matches them, so only the built-in rules apply here.
+        """
+        # Tree index of each directory seen so far; None if it is ignored
+        directories: dict[str, int | None] = {"": ROOT}
 
-        # Check pattern matches
-        for pattern in self.ignore_patterns:
-            if fnmatch.fnmatch(dirname, pattern):
-                return True
-
-        return False
-
-    def _handle_files(self, root: str, files: list[str]) -> None:
-        """Process individual file based on its type."""
-        for file in files:
-            # Skip ignored files
-            if self._should_ignore_file(file):
-                continue
-
-            file_path = Path(root) / file
-
-            # Skip if file doesn't exist or can't be accessed
+        def directory_index(directory: str) -> int | None:
             try:
-                file_size = os.path.getsize(file_path)
-            except (OSError, PermissionError):
+                return directories[directory]
+            except KeyError:
+                pass
+            parent, _, name = directory.rpartition("/")
+            index = directory_index(parent)
+            if index is not None:
+                index = None if self._should_ignore_dir(name) else self._add_directory(index, name)
+            directories[directory] = index
+            return index
+
+        for entry in manifest:
+            directory, _, name = entry.path.rpartition("/")
+            parent = directory_index(directory)
+            if parent is None or self._should_ignore_file(name):
                 continue
-
-            # Categorize important files
-            if file.lower() == "readme.md":
-                self.files.readmes.append(file_path)
-            elif file == "package.json":
-                self.files.package_jsons.append(file_path)
-            elif file == "requirements.txt":
-                self.files.requirements_txts.append(file_path)
-            elif file == "pyproject.toml":
-                self.files.pyproject_tomls.append(file_path)
-
-            print(file_path.suffix)
-
-            if file_path.suffix in self.js_ts_patterns:
-                self.files.js_ts_files += 1
-            elif file_path.suffix in self.py_patterns:
-                self.files.py_files += 1
-
-            self.files.dir_tree.append(
-                {"name": file, "path": str(file_path), "size": file_size, "type": "file"}
-            )
-
-        return
-
-    def _handle_directories(self, root: str, dirs: list[str]) -> None:
-        """Process individual directories to update directory tree."""
-        # Filter out ignored directories IN-PLACE
-        # This modifies the dirs list that os.walk uses, preventing recursion into ignored dirs
-        dirs[:] = [d for d in dirs if not self._should_ignore_dir(d)]
-
-        for dir_name in dirs:
-            dir_path = Path(root) / dir_name
-
-            # Skip if directory doesn't exist or can't be accessed
-            if not dir_path.exists() or not dir_path.is_dir():
+            self._add_file(parent, name, entry.path, entry.size, entry.sha)
+
+    def _scan(self) -> None:
+        """Fill the metadata from a `scandir` walk, for inputs that are not git checkouts."""
+        pending = [("", GitIgnoreStack(), ROOT)]
+        while pending:
+            relative, gitignore, parent = pending.pop()
+            directory = os.path.join(self.repo_path, relative)
+            try:
+                with os.scandir(directory) as it:
+                    entries = list(it)
+            except OSError:
                 continue
-
-            self.files.dir_tree.append(
-                {"name": dir_name, "path": str(dir_path), "type": "directory"}
+            gitignore = gitignore.with_gitignore(
+                load_gitignore(directory, [e.name for e in entries])
             )
 
-        return
+            for entry in entries:
+                path = f"{relative}/{entry.name}" if relative else entry.name
+                try:
+                    if entry.is_dir():
+                        if self._should_ignore_dir(entry.name, gitignore):
+                            continue
+                        index = self._add_directory(parent, entry.name)
+                        # Like os.walk, list symlinked directories but do not descend into them
+                        if not entry.is_symlink():
+                            pending.append((path, gitignore.child(entry.name), index))
+                    elif not self._should_ignore_file(entry.name, gitignore):
+                        self._add_file(parent, entry.name, path, entry.stat().st_size)
+                except OSError:
+                    # Broken symlink or vanished entry
+                    continue
 
     def generate_dir_metadata(self, log_all: bool = False) -> Files:
         """
-        Generate metadata for the directory by walking
-        through the directory and creating directory tree.
+        Generate metadata for the directory from the git index of the checkout, or by
+        walking through the directory when it is not one, and create the directory tree.
         """
-
-        for root, dirs, files in os.walk(self.repo_path):
-            self._handle_files(root, files)
-            self._handle_directories(root, dirs)
+        manifest = git_manifest(self.repo_path)
+        if manifest is not None:
+            self._load_index(manifest)
+        else:
+            self._scan()
+
+        manifests = [*self.files.package_jsons, *self.files.pyproject_tomls]
+        manifests += self.files.requirements_txts
+        self.files.packages = package_roots(
+            os.path.relpath(path, self.repo_path) for path in manifests
+        )
 
         print("Generated directory metadata:")
         print(f"Found {len(self.files.readmes)} readme files.")
@@ -286,6 +339,7 @@ class AuditorAgent:
         print(f"Found {len(self.files.pyproject_tomls)} pyproject.toml files.")
         print(f"Found {self.files.js_ts_files} JavaScript/TypeScript files.")
         print(f"Found {self.files.py_files} Python files.")
+        print(f"Found {len(self.files.packages)} packages.")
         print(f"Total files and directories processed: {len(self.files.dir_tree)}")
 
         if log_all:
@@ -318,7 +372,7 @@ class AuditorAgent:
             print("\n")
 
             for file in self.files.dir_tree:
-                for key, value in file.items():
+                for key, value in file._asdict().items():
                     print(f"{key}: {value}\n")
                 print("-----\n")
             print("\n")
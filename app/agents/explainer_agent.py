@@ -19,7 +19,4 @@ class ExplainerAgent:
         logger.info("Generated explanation using LLM.")
         logger.debug(f"Findings explanation: {output}")
 
-        with open("explanation_report.md", "w") as f:
-            f.write(str(output.content))
-
-        return "# Analysis Report\n\nTODO: Generate markdown report"
+        return str(output.content)
@@ -1,11 +1,20 @@
 import json
+from collections.abc import Mapping
+from functools import partial
 from pathlib import Path
 from typing import Any
 
 from pydantic import BaseModel
 
 from app.core.logger import logger
-from app.utils.subprocess_runner import run_safe_subprocess
+from app.utils.finding_cache import ToolCache, open_tool_cache
+from app.utils.json_stream import iter_json_object
+from app.utils.shards import in_path_order, run_shards, shard_paths
+from app.utils.subprocess_runner import run_safe_subprocess, run_spooled_subprocess, tool_version
+from app.utils.targets import target_commands
+
+# Radon reads its settings from these files
+RADON_CONFIG_FILES = ["radon.cfg", "setup.cfg", "pyproject.toml"]
 
 
 class CyclomaticComplexity(BaseModel):
@@ -98,152 +107,136 @@ class PerformanceAgent:
     Only analyzes Python files.
     """
 
-    def __init__(self, repo_path: str, py_files: int, log_all_audits: bool = False) -> None:
+    def __init__(
+        self,
+        repo_path: str,
+        py_files: int,
+        log_all_audits: bool = False,
+        py_paths: list[str] | None = None,
+        blob_shas: Mapping[str, str] | None = None,
+        packages: list[str] | None = None,
+    ) -> None:
         self.repo_path = repo_path
         self.py_files = py_files
+        # Explicit targets from the auditor's manifest; without one the tools walk the repo
+        self.py_paths = py_paths if py_paths is not None else ["."]
+        self.blob_shas = blob_shas if blob_shas is not None else {}
+        self.packages = packages or [""]
         self.log_all_audits = log_all_audits
+        # Tools that failed or could not run: "<tool>: <reason>"
+        self.failures: list[str] = []
         self.findings = PerformanceFindings()
 
     def _run_radon_cc(self) -> dict[str, list[dict]]:
         """Run Radon Cyclomatic Complexity analysis."""
-        try:
-            cmd = [
-                "radon",
-                "cc",
-                self.repo_path,
-                "--json",
-                "--min",
-                "C",  # Only report C and above
-                # "--exclude", "*/tests/*,*/venv/*,*/.venv/*,*/node_modules/*"
-            ]
-
-            result = run_safe_subprocess(cmd, cwd=self.repo_path, timeout=300)
-
-            if result["returncode"] == 0 and result["stdout"]:
-                data = json.loads(result["stdout"])
-                logger.info(f"Radon CC analyzed {len(data)} files")
-                return data
-            else:
-                logger.warning(f"Radon CC returned code {result['returncode']}")
-                return {}
-
-        except json.JSONDecodeError as e:
-            logger.error(f"Error parsing Radon CC JSON: {e}")
-            return {}
-        except Exception as e:
-            logger.error(f"Error running Radon CC: {e}")
-            return {}
+        return self._run_radon(["radon", "cc", "--json", "--min", "C"], "CC")  # C and above
 
     def _run_radon_mi(self) -> dict[str, dict]:
         """Run Radon Maintainability Index analysis."""
-        try:
-            cmd = [
-                "radon",
-                "mi",
-                self.repo_path,
-                "--json",
-                # "--exclude", "*/tests/*,*/venv/*,*/.venv/*,*/node_modules/*"
-            ]
-
-            result = run_safe_subprocess(cmd, cwd=self.repo_path, timeout=300)
-
-            if result["returncode"] == 0 and result["stdout"]:
-                data = json.loads(result["stdout"])
-                logger.info(f"Radon MI analyzed {len(data)} files")
-                return data
-            else:
-                logger.warning(f"Radon MI returned code {result['returncode']}")
-                return {}
-
-        except json.JSONDecodeError as e:
-            logger.error(f"Error parsing Radon MI JSON: {e}")
-            return {}
-        except Exception as e:
-            logger.error(f"Error running Radon MI: {e}")
-            return {}
+        return self._run_radon(["radon", "mi", "--json"], "MI")
 
     def _run_radon_raw(self) -> dict[str, dict]:
         """Run Radon Raw Metrics analysis."""
-        try:
-            cmd = [
-                "radon",
-                "raw",
-                self.repo_path,
-                "--json",
-                # "--exclude", "*/tests/*,*/venv/*,*/.venv/*,*/node_modules/*"
-            ]
-
-            result = run_safe_subprocess(cmd, cwd=self.repo_path, timeout=300)
-
-            if result["returncode"] == 0 and result["stdout"]:
-                data = json.loads(result["stdout"])
-                logger.info(f"Radon Raw analyzed {len(data)} files")
-                return data
-            else:
-                logger.warning(f"Radon Raw returned code {result['returncode']}")
-                return {}
-
-        except json.JSONDecodeError as e:
-            logger.error(f"Error parsing Radon Raw JSON: {e}")
-            return {}
-        except Exception as e:
-            logger.error(f"Error running Radon Raw: {e}")
-            return {}
+        return self._run_radon(["radon", "raw", "--json"], "Raw")
 
     def _run_radon_hal(self) -> dict[str, dict]:
         """Run Radon Halstead Metrics analysis."""
-        try:
-            cmd = [
-                "radon",
-                "hal",
-                self.repo_path,
-                "--json",
-                # "--exclude", "*/tests/*,*/venv/*,*/.venv/*,*/node_modules/*"
-            ]
-
-            result = run_safe_subprocess(cmd, cwd=self.repo_path, timeout=300)
+        return self._run_radon(["radon", "hal", "--json"], "Halstead")
 
-            if result["returncode"] == 0 and result["stdout"]:
-                data = json.loads(result["stdout"])
-                logger.info(f"Radon Halstead analyzed {len(data)} files")
-                return data
-            else:
-                logger.warning(f"Radon Halstead returned code {result['returncode']}")
-                return {}
+    def _run_radon(self, cmd: list[str], label: str) -> dict[str, Any]:
+        """
+        Run one Radon metric over the Python files, reusing cached per-file results; the
+        rest is analyzed one shard per package, in parallel.
+        """
+        try:
+            cache = open_tool_cache(
+                f"radon-{cmd[1]}", tool_version("radon"), cmd, self.blob_shas, RADON_CONFIG_FILES
+            )
+            cached, targets = cache.lookup(self.py_paths)
+
+            data = dict(cached)
+            shards = shard_paths(targets, self.packages)
+            for fresh in run_shards(partial(self._radon_shard, cmd, label, cache), shards):
+                if fresh is None:
+                    self.failures.append(f"radon {cmd[1]}: failed")
+                    return {}
+                data.update(fresh)
+
+            data = {
+                path: value
+                for path, value in in_path_order(data, self.py_paths)
+                if value is not None
+            }
+            logger.info(f"Radon {label} analyzed {len(data)} files")
+            return data
 
         except json.JSONDecodeError as e:
-            logger.error(f"Error parsing Radon Halstead JSON: {e}")
+            logger.error(f"Error parsing Radon {label} JSON: {e}")
+            self.failures.append(f"radon {cmd[1]}: unreadable output: {e}")
             return {}
         except Exception as e:
-            logger.error(f"Error running Radon Halstead: {e}")
+            logger.error(f"Error running Radon {label}: {e}")
+            self.failures.append(f"radon {cmd[1]}: {e}")
             return {}
 
+    def _radon_shard(
+        self, cmd: list[str], label: str, cache: ToolCache, targets: list[str]
+    ) -> dict[str, Any] | None:
+        """Run one Radon metric over one shard; None if Radon failed."""
+        # Files Radon leaves out of its output (nothing at or above `--min`) are
+        # cached as None, so they are not analyzed again either
+        fresh: dict[str, Any] = dict.fromkeys(targets)
+        for command in target_commands(cmd, targets):
+            with run_spooled_subprocess(command, cwd=self.repo_path, timeout=300) as result:
+                if result["returncode"] != 0:
+                    logger.warning(f"Radon {label} returned code {result['returncode']}")
+                    return None
+                # Radon's output is an object keyed by file; decoded one file at a time
+                fresh.update(iter_json_object(result["stdout"]))
+
+        # Files Radon could not parse come back as {"error": ...}; they are retried
+        cache.store(
+            {
+                path: value
+                for path, value in fresh.items()
+                if not (isinstance(value, dict) and "error" in value)
+            }
+        )
+        return fresh
+
     def _run_xenon(self) -> None:
         """Run Xenon to enforce complexity thresholds."""
         try:
             cmd = [
                 "xenon",
-                self.repo_path,
                 "--max-absolute",
                 "B",
                 "--max-modules",
                 "B",
                 "--max-average",
                 "A",
-                # "--exclude", "*/tests/*,*/venv/*,*/.venv/*,*/node_modules/*"
             ]
 
-            result = run_safe_subprocess(cmd, cwd=self.repo_path, timeout=300)
-
-            if result["returncode"] != 0:
-                logger.info("Xenon found complexity violations")
-                if result["stdout"]:
-                    self._parse_xenon_output(result["stdout"])
-            else:
+            passed = True
+            for command in target_commands(cmd, self.py_paths):
+                result = run_safe_subprocess(command, cwd=self.repo_path, timeout=300)
+                # Xenon exits 1 when a threshold is exceeded
+                if result["returncode"] not in [0, 1]:
+                    logger.warning(f"Xenon returned code {result['returncode']}")
+                    self.failures.append(f"xenon: exit code {result['returncode']}")
+                elif result["returncode"] != 0:
+                    passed = False
+                    if result["stdout"]:
+                        self._parse_xenon_output(result["stdout"])
+
+            if passed:
                 logger.info("Xenon: All complexity thresholds passed")
+            else:
+                logger.info("Xenon found complexity violations")
 
         except Exception as e:
             logger.error(f"Error running Xenon: {e}")
+            self.failures.append(f"xenon: {e}")
 
     def _parse_xenon_output(self, output: str) -> None:
         """Parse Xenon text output to extract violations."""
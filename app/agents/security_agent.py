@@ -1,12 +1,20 @@
 import json
+import os
+from collections.abc import Mapping
 from enum import Enum
+from functools import partial
 from pathlib import Path
 from typing import Any
 
 from pydantic import BaseModel, HttpUrl
 
 from app.core.logger import logger
-from app.utils.subprocess_runner import run_safe_subprocess
+from app.utils.finding_cache import ToolCache, open_tool_cache
+from app.utils.json_stream import iter_json_object
+from app.utils.shards import in_path_order, run_shards, shard_paths
+from app.utils.subprocess_runner import run_spooled_subprocess, tool_version
+from app.utils.targets import target_commands
+from app.utils.toolchain import SEMGREP_RULE_PACKS
 
 
 class IssueType(str, Enum):
@@ -98,6 +106,22 @@ class SecurityFindings(BaseModel):
     Semgrep: SemgrepFindings
 
 
+def _cacheable(
+    fresh: dict[str, list[dict]], errors: list[dict[str, Any]], path_key: str
+) -> dict[str, list[dict]]:
+    """
+    The per-file results of one analyzer invocation worth caching: not those of files it
+    reported errors for, and none at all after an error not tied to a file.
+    """
+    failed = set()
+    for error in errors:
+        path = error.get(path_key) if isinstance(error, dict) else None
+        if path is None:
+            return {}
+        failed.add(path)
+    return {path: items for path, items in fresh.items() if path not in failed}
+
+
 class SecurityAgent:
     """
     Runs security checks using Bandit and Semgrep.
@@ -109,11 +133,22 @@ class SecurityAgent:
         js_ts_files: int,
         py_files: int,
         log_all_audits: bool = False,
+        all_paths: list[str] | None = None,
+        py_paths: list[str] | None = None,
+        blob_shas: Mapping[str, str] | None = None,
+        packages: list[str] | None = None,
     ) -> None:
         self.repo_path = repo_path
         self.js_ts_files = js_ts_files
         self.py_files = py_files
         self.log_all_audits = log_all_audits
+        # Explicit targets from the auditor's manifest; without one the tools walk the repo
+        self.all_paths = all_paths if all_paths is not None else ["."]
+        self.py_paths = py_paths if py_paths is not None else ["."]
+        self.blob_shas = blob_shas if blob_shas is not None else {}
+        self.packages = packages or [""]
+        # Tools that failed or could not run: "<tool>: <reason>"
+        self.failures: list[str] = []
 
         self.findings = SecurityFindings(Bandit=BanditFindings(), Semgrep=SemgrepFindings())
 
@@ -124,169 +159,212 @@ class SecurityAgent:
         """
         try:
             # Semgrep command with OSS mode
-            cmd = [
-                "semgrep",
-                "scan",
-                "--config",
-                "p/security-audit",
-                "--config",
-                "p/owasp-top-ten",
-                "--config",
-                "p/secrets",
-                "--config",
-                "p/supply-chain",
-                "--config",
-                "p/dockerfile",
-                "--json",
-                "--quiet",
-                self.repo_path,
-            ]
-
-            result = run_safe_subprocess(cmd, cwd=self.repo_path, timeout=600)
-
-            logger.info(f"Semgrep return code: {result['returncode']}")
-            logger.debug(f"Semgrep stdout length: {len(result['stdout'])}")
+            cmd = ["semgrep", "scan"]
+            for rule_pack in SEMGREP_RULE_PACKS:
+                cmd += ["--config", rule_pack]
+            cmd += ["--json", "--quiet"]
 
-            self.findings.Semgrep = SemgrepFindings()
+            cache = open_tool_cache(
+                "semgrep", tool_version("semgrep"), cmd, self.blob_shas, [".semgrepignore"]
+            )
+            cached, targets = cache.lookup(self.all_paths)
 
-            # Semgrep returns 0 (no findings) or 1 (findings found)
-            if result["returncode"] in [0, 1] and result["stdout"]:
-                output = json.loads(result["stdout"])
-
-                # Parse errors
-                self.findings.Semgrep.errors = output.get("errors", [])
-                if self.findings.Semgrep.errors:
-                    logger.warning(
-                        f"Semgrep encountered {len(self.findings.Semgrep.errors)} errors during scan"
-                    )
-
-                # Parse skipped rules
-                self.findings.Semgrep.skipped_rules = output.get("skipped_rules", [])
-
-                # Parse results
-                results = output.get("results", [])
-                for item in results:
-                    # Parse nested structures
-                    start_pos = SemgrepPosition(
-                        col=item.get("start", {}).get("col", 0),
-                        line=item.get("start", {}).get("line", 0),
-                        offset=item.get("start", {}).get("offset", 0),
-                    )
-
-                    end_pos = SemgrepPosition(
-                        col=item.get("end", {}).get("col", 0),
-                        line=item.get("end", {}).get("line", 0),
-                        offset=item.get("end", {}).get("offset", 0),
-                    )
-
-                    # Parse metadata
-                    metadata_dict = item.get("extra", {}).get("metadata", {})
-                    metadata = SemgrepMetadata(
-                        category=metadata_dict.get("category", ""),
-                        confidence=metadata_dict.get("confidence", ""),
-                        cwe=metadata_dict.get("cwe", []),
-                        impact=metadata_dict.get("impact", ""),
-                        license=metadata_dict.get("license", ""),
-                        likelihood=metadata_dict.get("likelihood", ""),
-                        owasp=metadata_dict.get("owasp", []),
-                        references=metadata_dict.get("references", []),
-                        semgrep_dev=metadata_dict.get("semgrep.dev", {}),
-                        shortlink=metadata_dict.get("shortlink", ""),
-                        source=metadata_dict.get("source", ""),
-                        subcategory=metadata_dict.get("subcategory", []),
-                        technology=metadata_dict.get("technology", []),
-                        vulnerability_class=metadata_dict.get("vulnerability_class", []),
-                    )
-
-                    # Parse extra metadata
-                    extra_dict = item.get("extra", {})
-                    extra = SemgrepExtraMetadata(
-                        engine_kind=extra_dict.get("engine_kind", "OSS"),
-                        fingerprint=extra_dict.get("fingerprint", ""),
-                        fix=extra_dict.get("fix", None),
-                        is_ignored=extra_dict.get("is_ignored", False),
-                        lines=extra_dict.get("lines", ""),
-                        message=extra_dict.get("message", ""),
-                        metadata=metadata,
-                        metavars=extra_dict.get("metavars", {}),
-                        severity=extra_dict.get("severity", "INFO"),
-                        validation_state=extra_dict.get("validation_state", ""),
-                    )
-
-                    # Create the finding
-                    finding = SemgrepFinding(
-                        check_id=item.get("check_id", "unknown"),
-                        path=item.get("path", ""),
-                        start=start_pos,
-                        end=end_pos,
-                        extra=extra,
+            self.findings.Semgrep = SemgrepFindings()
+            for command in target_commands(cmd, targets):
+                with run_spooled_subprocess(command, cwd=self.repo_path, timeout=600) as result:
+                    logger.info(f"Semgrep return code: {result['returncode']}")
+                    logger.debug(
+                        f"Semgrep stdout size: {os.fstat(result['stdout'].fileno()).st_size}"
                     )
 
-                    self.findings.Semgrep.results.append(finding)
-            else:
-                logger.warning(f"Semgrep returned unexpected code: {result['returncode']}")
-                if result["stderr"]:
-                    logger.warning(f"Semgrep stderr: {result['stderr']}")
+                    # Semgrep returns 0 (no findings) or 1 (findings found)
+                    if result["returncode"] not in [0, 1]:
+                        logger.warning(f"Semgrep returned unexpected code: {result['returncode']}")
+                        if result["stderr"]:
+                            logger.warning(f"Semgrep stderr: {result['stderr']}")
+                        self.failures.append(f"semgrep: exit code {result['returncode']}")
+                        continue
+
+                    # Every file of the invocation is cached, unless Semgrep failed on it
+                    fresh: dict[str, list[dict]] = {path: [] for path in command[len(cmd) :]}
+                    errors = []
+                    # Results are parsed one at a time straight from the spooled output
+                    for key, value in iter_json_object(result["stdout"], expand={"results"}):
+                        if key == "results":
+                            self.findings.Semgrep.results.append(self._semgrep_finding(value))
+                            fresh.setdefault(value.get("path", ""), []).append(value)
+                        elif key == "errors":
+                            self.findings.Semgrep.errors.extend(value)
+                            errors.extend(value)
+                        elif key == "skipped_rules":
+                            self.findings.Semgrep.skipped_rules = value
+                    cache.store(_cacheable(fresh, errors, "path"))
+
+            self.findings.Semgrep.results.extend(
+                self._semgrep_finding(item) for items in cached.values() for item in items
+            )
+
+            if self.findings.Semgrep.errors:
+                logger.warning(
+                    f"Semgrep encountered {len(self.findings.Semgrep.errors)} errors during scan"
+                )
 
         except json.JSONDecodeError as e:
             logger.error(f"Error parsing Semgrep JSON output: {e}")
+            self.failures.append(f"semgrep: unreadable output: {e}")
         except Exception as e:
             logger.error(f"Error running Semgrep: {e}")
+            self.failures.append(f"semgrep: {e}")
+
+    def _semgrep_finding(self, item: dict[str, Any]) -> SemgrepFinding:
+        """Convert one entry of Semgrep's JSON `results` into a finding."""
+        # Parse nested structures
+        start_pos = SemgrepPosition(
+            col=item.get("start", {}).get("col", 0),
+            line=item.get("start", {}).get("line", 0),
+            offset=item.get("start", {}).get("offset", 0),
+        )
+
+        end_pos = SemgrepPosition(
+            col=item.get("end", {}).get("col", 0),
+            line=item.get("end", {}).get("line", 0),
+            offset=item.get("end", {}).get("offset", 0),
+        )
+
+        # Parse metadata
+        metadata_dict = item.get("extra", {}).get("metadata", {})
+        metadata = SemgrepMetadata(
+            category=metadata_dict.get("category", ""),
+            confidence=metadata_dict.get("confidence", ""),
+            cwe=metadata_dict.get("cwe", []),
+            impact=metadata_dict.get("impact", ""),
+            license=metadata_dict.get("license", ""),
+            likelihood=metadata_dict.get("likelihood", ""),
+            owasp=metadata_dict.get("owasp", []),
+            references=metadata_dict.get("references", []),
+            semgrep_dev=metadata_dict.get("semgrep.dev", {}),
+            shortlink=metadata_dict.get("shortlink", ""),
+            source=metadata_dict.get("source", ""),
+            subcategory=metadata_dict.get("subcategory", []),
+            technology=metadata_dict.get("technology", []),
+            vulnerability_class=metadata_dict.get("vulnerability_class", []),
+        )
+
+        # Parse extra metadata
+        extra_dict = item.get("extra", {})
+        extra = SemgrepExtraMetadata(
+            engine_kind=extra_dict.get("engine_kind", "OSS"),
+            fingerprint=extra_dict.get("fingerprint", ""),
+            fix=extra_dict.get("fix", None),
+            is_ignored=extra_dict.get("is_ignored", False),
+            lines=extra_dict.get("lines", ""),
+            message=extra_dict.get("message", ""),
+            metadata=metadata,
+            metavars=extra_dict.get("metavars", {}),
+            severity=extra_dict.get("severity", "INFO"),
+            validation_state=extra_dict.get("validation_state", ""),
+        )
+
+        return SemgrepFinding(
+            check_id=item.get("check_id", "unknown"),
+            path=item.get("path", ""),
+            start=start_pos,
+            end=end_pos,
+            extra=extra,
+        )
 
     def _run_bandit(self) -> None:
         """
-        Run Bandit security analysis on Python files.
+        Run Bandit security analysis on Python files, one shard per package in parallel.
         """
 
-        cmd = ["bandit", "-r", self.repo_path, "-f", "json"]
-        result = run_safe_subprocess(cmd, cwd=self.repo_path, timeout=300)
-
-        logger.info(f"Bandit return code: {result['returncode']}")
-        logger.debug(f"Bandit stdout length: {len(result['stdout'])}")
-        logger.debug(f"Bandit stderr: {result['stderr'][:200]}")
+        cmd = ["bandit", "-f", "json"]
+        cache = open_tool_cache("bandit", tool_version("bandit"), cmd, self.blob_shas)
+        cached, targets = cache.lookup(self.py_paths)
+
+        per_file = dict(cached)
+        errors = []
+        stderr = []
+        shards = shard_paths(targets, self.packages)
+        for shard_results, shard_errors, shard_stderr in run_shards(
+            partial(self._bandit_shard, cmd, cache), shards
+        ):
+            per_file.update(shard_results)
+            errors.extend(shard_errors)
+            stderr.append(shard_stderr)
 
         self.findings.Bandit = BanditFindings(
-            stderror=result["stderr"],
-            results=[],
+            bandit_errors=errors or None,
+            stderror="".join(stderr),
+            results=[
+                self._bandit_finding(item)
+                for _, items in in_path_order(per_file, self.py_paths)
+                for item in items
+            ],
+        )
+        logger.info(f"Bandit found {len(self.findings.Bandit.results)} security issues")
+
+    def _bandit_shard(
+        self, cmd: list[str], cache: ToolCache, targets: list[str]
+    ) -> tuple[dict[str, list[dict]], list[dict], str]:
+        """Run Bandit over one shard: its results per file, its errors and its stderr."""
+        per_file: dict[str, list[dict]] = {}
+        errors = []
+        stderr = []
+        for command in target_commands(cmd, targets):
+            with run_spooled_subprocess(command, cwd=self.repo_path, timeout=300) as result:
+                logger.info(f"Bandit return code: {result['returncode']}")
+                logger.debug(f"Bandit stdout size: {os.fstat(result['stdout'].fileno()).st_size}")
+                logger.debug(f"Bandit stderr: {result['stderr'][:200]}")
+                stderr.append(result["stderr"])
+
+                # Bandit returns exit code 1 when it finds issues (normal behavior)
+                if result["returncode"] not in [0, 1]:
+                    self.failures.append(f"bandit: exit code {result['returncode']}")
+                    continue
+
+                fresh: dict[str, list[dict]] = {path: [] for path in command[len(cmd) :]}
+                chunk_errors = []
+                for key, value in iter_json_object(result["stdout"], expand={"results"}):
+                    if key == "results":
+                        fresh.setdefault(value["filename"], []).append(value)
+                    elif key == "errors" and value:
+                        chunk_errors.extend(value)
+                cache.store(_cacheable(fresh, chunk_errors, "filename"))
+                per_file.update(fresh)
+                errors.extend(chunk_errors)
+
+        return per_file, errors, "".join(stderr)
+
+    def _bandit_finding(self, item: dict[str, Any]) -> BanditFinding:
+        """Convert one entry of Bandit's JSON `results` into a finding."""
+        # Parse CWE - it's a dict with 'id' and 'link' keys
+        cwe_data = item.get("issue_cwe", {})
+        if isinstance(cwe_data, dict):
+            cwe_id = cwe_data.get("id", 0)
+            cwe_link = cwe_data.get("link", "https://cwe.mitre.org/")
+        else:
+            # Fallback for unexpected format
+            cwe_id = 0
+            cwe_link = "https://cwe.mitre.org/"
+
+        issue_cwe = IssueCWE(id=cwe_id, link=HttpUrl(cwe_link))
+
+        return BanditFinding(
+            code=item["code"],
+            col_offset=item["col_offset"],
+            end_col_offset=item["end_col_offset"],
+            filename=Path(item["filename"]),
+            issue_confidence=IssueType(item["issue_confidence"].upper()),
+            issue_cwe=issue_cwe,
+            issue_severity=IssueType(item["issue_severity"].upper()),
+            issue_text=item["issue_text"],
+            line_number=item["line_number"],
+            line_range=item["line_range"],
+            more_info=item["more_info"],
+            test_id=item["test_id"],
+            test_name=item["test_name"],
         )
-
-        # Bandit returns exit code 1 when it finds issues (normal behavior)
-        if result["returncode"] in [0, 1] and result["stdout"]:
-            output = json.loads(result["stdout"])
-            self.findings.Bandit.bandit_errors = output.get("errors", None)
-
-            results = output.get("results", [])
-            logger.info(f"Bandit found {len(results)} security issues")
-            for item in results:
-                # Parse CWE - it's a dict with 'id' and 'link' keys
-                cwe_data = item.get("issue_cwe", {})
-                if isinstance(cwe_data, dict):
-                    cwe_id = cwe_data.get("id", 0)
-                    cwe_link = cwe_data.get("link", "https://cwe.mitre.org/")
-                else:
-                    # Fallback for unexpected format
-                    cwe_id = 0
-                    cwe_link = "https://cwe.mitre.org/"
-
-                issue_cwe = IssueCWE(id=cwe_id, link=HttpUrl(cwe_link))
-
-                finding = BanditFinding(
-                    code=item["code"],
-                    col_offset=item["col_offset"],
-                    end_col_offset=item["end_col_offset"],
-                    filename=Path(item["filename"]),
-                    issue_confidence=IssueType(item["issue_confidence"].upper()),
-                    issue_cwe=issue_cwe,
-                    issue_severity=IssueType(item["issue_severity"].upper()),
-                    issue_text=item["issue_text"],
-                    line_number=item["line_number"],
-                    line_range=item["line_range"],
-                    more_info=item["more_info"],
-                    test_id=item["test_id"],
-                    test_name=item["test_name"],
-                )
-
-                self.findings.Bandit.results.append(finding)
 
     def _log_findings(self):
         logger.info("Security Agent findings:")
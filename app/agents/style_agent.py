@@ -1,10 +1,43 @@
 import json
 import os
-import shutil
+from collections.abc import Mapping
+from functools import partial
+from pathlib import Path
 from typing import Any
 
 from app.core.logger import logger
-from app.utils.subprocess_runner import run_safe_subprocess
+from app.utils.eslint_daemon import EslintDaemonError, get_eslint_daemon
+from app.utils.eslint_toolchain import (
+    FALLBACK_CONFIG_NAME,
+    FALLBACK_ESLINT_CONFIG,
+    ensure_eslint_toolchain,
+    eslint_bin,
+)
+from app.utils.finding_cache import open_tool_cache
+from app.utils.json_stream import iter_json_array, iter_json_object
+from app.utils.shards import run_shards, shard_paths
+from app.utils.subprocess_runner import run_safe_subprocess, run_spooled_subprocess, tool_version
+from app.utils.targets import target_commands
+
+# Files whose contents change Ruff's or ESLint's findings, anywhere in the repository
+RUFF_CONFIG_FILES = ["pyproject.toml", "ruff.toml", ".ruff.toml"]
+ESLINT_CONFIG_FILES = [
+    "eslint.config.js",
+    "eslint.config.mjs",
+    "eslint.config.cjs",
+    "eslint.config.ts",
+    ".eslintrc",
+    ".eslintrc.js",
+    ".eslintrc.cjs",
+    ".eslintrc.json",
+    ".eslintrc.yml",
+    ".eslintrc.yaml",
+    ".eslintignore",
+    "package.json",
+    "tsconfig.json",
+]
+# Flat configs ESLint picks up from the repository root
+ESLINT_OWN_CONFIG_FILES = ["eslint.config.js", "eslint.config.mjs", "eslint.config.cjs"]
 
 
 class StyleAgent:
@@ -13,138 +46,238 @@ class StyleAgent:
     """
 
     def __init__(
-        self, repo_path: str, js_ts_files: int, py_files: int, log_all_audits: bool = False
+        self,
+        repo_path: str,
+        js_ts_files: int,
+        py_files: int,
+        log_all_audits: bool = False,
+        js_ts_paths: list[str] | None = None,
+        py_paths: list[str] | None = None,
+        blob_shas: Mapping[str, str] | None = None,
+        packages: list[str] | None = None,
     ) -> None:
         self.repo_path = repo_path
         self.findings = []
         self.js_ts_files = js_ts_files
         self.py_files = py_files
         self.log_all_audits = log_all_audits
+        # Explicit targets from the auditor's manifest; without one the tools walk the repo
+        self.js_ts_paths = js_ts_paths if js_ts_paths is not None else ["."]
+        self.py_paths = py_paths if py_paths is not None else ["."]
+        self.blob_shas = blob_shas if blob_shas is not None else {}
+        self.packages = packages or [""]
+        # Tools that failed or could not run: "<tool>: <reason>"
+        self.failures: list[str] = []
 
     def _run_eslint_linting(self):
         """
-        Run eslint with fallback config generation
+        Run eslint over the JS/TS files, reusing cached results of unchanged files
         """
-        config_file = os.path.join(self.repo_path, "eslint.config.js")
-        package_json = os.path.join(self.repo_path, "package.json")
-        temp_config_created = False
-        temp_package_created = False
-
-        # Create package.json if it doesn't exist
-        if not os.path.exists(package_json):
-            minimal_package = {"name": "temp-eslint-analysis", "version": "1.0.0", "private": True}
-            with open(package_json, "w") as f:
-                json.dump(minimal_package, f)
-            temp_package_created = True
-
-        # Install ESLint dependencies locally in the temp directory
-        logger.info("Installing ESLint dependencies in temp directory...")
-        install_cmd = [
-            "npm",
-            "install",
-            "--no-save",
-            "--silent",
+        toolchain = ensure_eslint_toolchain()
+        if toolchain is None:
+            self.failures.append("eslint: toolchain unavailable")
+            return
+
+        own_config = any(
+            os.path.exists(os.path.join(self.repo_path, name)) for name in ESLINT_OWN_CONFIG_FILES
+        )
+        if own_config and not self._own_eslint_config_loads(toolchain):
+            own_config = False
+        args = ["--format", "json-with-metadata"]
+        # Keyed without the toolchain's location: the version already names its contents
+        cache = open_tool_cache(
             "eslint",
-            "@typescript-eslint/parser",
-            "@typescript-eslint/eslint-plugin",
-        ]
-        install_result = run_safe_subprocess(install_cmd, cwd=self.repo_path, timeout=120)
+            toolchain.name,
+            ["eslint", *args],
+            self.blob_shas,
+            ESLINT_CONFIG_FILES,
+            extra="" if own_config else FALLBACK_ESLINT_CONFIG,
+        )
+        cached, targets = cache.lookup(self.js_ts_paths)
 
-        if install_result["returncode"] != 0:
-            logger.error(f"Failed to install ESLint dependencies: {install_result['stderr']}")
-            # Cleanup and return
-            if temp_package_created and os.path.exists(package_json):
-                os.remove(package_json)
-            return
+        config = None if own_config else toolchain / FALLBACK_CONFIG_NAME
+        output: dict[str, Any] = {}
+        errors = ""
+        if targets:
+            output, errors = self._eslint(toolchain, args, config, targets)
+            # Cached results carry repo-relative paths; ESLint reports absolute ones
+            fresh = {}
+            for result in output.get("results", []):
+                path = os.path.relpath(result["filePath"], self.repo_path)
+                fresh[path] = {**result, "filePath": path}
+            cache.store(fresh)
+        if cached:
+            output["results"] = [
+                *(
+                    {**result, "filePath": os.path.join(self.repo_path, result["filePath"])}
+                    for result in cached.values()
+                ),
+                *output.get("results", []),
+            ]
 
-        # Check if config exists, then create minimal one with TypeScript support
-        if not os.path.exists(config_file):
-            minimal_config = """
-const tsParser = require("@typescript-eslint/parser");
-const tsPlugin = require("@typescript-eslint/eslint-plugin");
-
-module.exports = [
-    {
-        files: ["**/*.js", "**/*.jsx", "**/*.ts", "**/*.tsx"],
-        languageOptions: {
-            ecmaVersion: "latest",
-            sourceType: "module",
-            parser: tsParser,
-            parserOptions: {
-                ecmaFeatures: {
-                    jsx: true
+        if output:
+            self.findings.append(
+                {
+                    "tool": "eslint",
+                    "output": output,
+                    "errors": errors,
                 }
-            }
-        },
-        plugins: {
-            "@typescript-eslint": tsPlugin
-        },
-        rules: {
-            "no-unused-vars": "warn",
-            "no-undef": "warn",
-            "semi": "warn",
-            "@typescript-eslint/no-unused-vars": "warn",
-            "@typescript-eslint/no-explicit-any": "warn"
+            )
+
+    @staticmethod
+    def _eslint_env(toolchain: Path) -> dict[str, str]:
+        return {
+            **os.environ,
+            "ESLINT_USE_FLAT_CONFIG": "true",
+            "NODE_PATH": str(toolchain / "node_modules"),
         }
-    }
-];
-            """
-            with open(config_file, "w") as f:
-                f.write(minimal_config)
-            temp_config_created = True
-
-        try:
-            cmd = ["npx", "eslint", "--format", "json-with-metadata", self.repo_path]
-            eslint_result = run_safe_subprocess(cmd, cwd=self.repo_path)
-
-            if eslint_result["stdout"]:
-                self.findings.append(
-                    {
-                        "tool": "eslint",
-                        "output": json.loads(eslint_result["stdout"]),
-                        "errors": eslint_result["stderr"],
-                    }
-                )
-
-        finally:
-            # Cleanup temporary files
-            if temp_config_created and os.path.exists(config_file):
-                os.remove(config_file)
-            if temp_package_created and os.path.exists(package_json):
-                os.remove(package_json)
-            # Cleanup node_modules
-            node_modules = os.path.join(self.repo_path, "node_modules")
-            if os.path.exists(node_modules):
-                shutil.rmtree(node_modules, ignore_errors=True)
+
+    def _own_eslint_config_loads(self, toolchain: Path) -> bool:
+        """
+        Whether the repository's own config loads with the toolchain. Nothing is installed
+        into the checkout, so its requires resolve through NODE_PATH, which Node ignores
+        for ESM imports, and the repository's own devDependencies are missing. Such a
+        config fails to load, and the repository is linted with the fallback config.
+        """
+        target = self.js_ts_paths[0] if self.js_ts_paths != ["."] else "index.js"
+        result = run_safe_subprocess(
+            [str(eslint_bin(toolchain)), "--print-config", target],
+            cwd=self.repo_path,
+            env=self._eslint_env(toolchain),
+        )
+        if result["returncode"] == 0:
+            return True
+        error = result["stderr"].strip().splitlines()
+        logger.warning(
+            "The repository's ESLint config does not load with the toolchain, using the "
+            f"fallback config: {error[-1] if error else result['returncode']}"
+        )
+        return False
+
+    def _eslint(
+        self, toolchain: Path, args: list[str], config: Path | None, targets: list[str]
+    ) -> tuple[dict[str, Any], str]:
+        """
+        Run eslint on `targets` with the repository's config or `config`, one shard per
+        package, linted in parallel and merged in package order.
+        """
+        cmd = [str(eslint_bin(toolchain)), *args]
+        if config is not None:
+            cmd += ["--config", str(config)]
+        env = self._eslint_env(toolchain)
+        output: dict[str, Any] = {}
+        errors = []
+        shards = shard_paths(targets, self.packages)
+        lint_shard = partial(self._eslint_shard, toolchain, cmd, env, config)
+        for shard_output, shard_errors in run_shards(lint_shard, shards):
+            for key, value in shard_output.items():
+                if key == "results":
+                    output.setdefault("results", []).extend(value)
+                else:
+                    output.setdefault(key, value)
+            errors.append(shard_errors)
+        return output, "".join(errors)
+
+    def _eslint_shard(
+        self,
+        toolchain: Path,
+        cmd: list[str],
+        env: dict[str, str],
+        config: Path | None,
+        targets: list[str],
+    ) -> tuple[dict[str, Any], str]:
+        """
+        Run eslint over one shard: its merged JSON output and its stderr. With the fallback
+        config the shard goes to a worker of the ESLint daemon as one batch; eslint is run
+        directly for the repository's own config, or when the daemon is disabled or fails.
+        """
+        output: dict[str, Any] = {}
+        errors: list[str] = []
+        # The daemon's workers are shared, so they never load code from the repository
+        daemon = get_eslint_daemon(toolchain) if config is not None else None
+        if daemon is not None:
+            try:
+                with daemon.lint(self.repo_path, targets, config) as eslint_result:
+                    self._read_eslint_result(eslint_result, output, errors)
+                    self._check_eslint_returncode(eslint_result)
+                return output, "".join(errors)
+            except EslintDaemonError as e:
+                logger.warning(f"ESLint daemon failed, running eslint directly: {e}")
+                output, errors = {}, []
+
+        for command in target_commands(cmd, targets):
+            with run_spooled_subprocess(command, cwd=self.repo_path, env=env) as eslint_result:
+                self._read_eslint_result(eslint_result, output, errors)
+                self._check_eslint_returncode(eslint_result)
+        return output, "".join(errors)
+
+    def _check_eslint_returncode(self, eslint_result: dict[str, Any]) -> None:
+        # ESLint exits 1 when it finds problems and 2 on a crash or a configuration problem
+        if eslint_result["returncode"] not in [0, 1]:
+            self.failures.append(f"eslint: exit code {eslint_result['returncode']}")
+
+    @staticmethod
+    def _read_eslint_result(
+        eslint_result: dict[str, Any], output: dict[str, Any], errors: list[str]
+    ) -> None:
+        """Merge one json-with-metadata report into `output`, its stderr into `errors`."""
+        for key, value in iter_json_object(eslint_result["stdout"], expand={"results"}):
+            if key == "results":
+                output.setdefault("results", []).append(value)
+            else:
+                output.setdefault(key, value)
+        errors.append(eslint_result["stderr"])
 
     def _run_ruff_linting(self):
         """
         Run ruff linting for Python files
         """
-        cmd = ["ruff", "check", self.repo_path, "--output-format=json"]
-        ruff_result = run_safe_subprocess(cmd, cwd=self.repo_path)
+        cmd = ["ruff", "check", "--output-format=json"]
+        cache = open_tool_cache(
+            "ruff", tool_version("ruff"), cmd, self.blob_shas, RUFF_CONFIG_FILES
+        )
+        cached, targets = cache.lookup(self.py_paths)
 
-        logger.info(f"Ruff return code: {ruff_result['returncode']}")
+        # Every analyzed file gets an entry, so files without issues are cached too
+        fresh: dict[str, list[dict]] = {path: [] for path in targets}
+        errors = []
+        for command in target_commands(cmd, targets):
+            with run_spooled_subprocess(command, cwd=self.repo_path) as ruff_result:
+                logger.info(f"Ruff return code: {ruff_result['returncode']}")
 
-        # Ruff returns exit code 1 when it finds issues (normal behavior)
-        if ruff_result["returncode"] in [0, 1] and ruff_result["stdout"]:
-            try:
-                # Parse JSON output
-                output = json.loads(ruff_result["stdout"])
-                logger.info(f"Ruff found {len(output)} issues")
-
-                self.findings.append(
-                    {
-                        "tool": "ruff",
-                        "output": output,  # Store parsed JSON, not string
-                        "errors": ruff_result["stderr"],
-                    }
-                )
-            except json.JSONDecodeError as e:
-                logger.error(f"Error parsing Ruff JSON output: {e}")
-                logger.debug(f"Raw stdout: {ruff_result['stdout'][:500]}")
-        else:
-            logger.info(f"Ruff found no issues or failed. Return code: {ruff_result['returncode']}")
+                # Ruff returns exit code 1 when it finds issues (normal behavior)
+                if ruff_result["returncode"] not in [0, 1]:
+                    logger.info(
+                        f"Ruff found no issues or failed. Return code: {ruff_result['returncode']}"
+                    )
+                    self.failures.append(f"ruff: exit code {ruff_result['returncode']}")
+                    return
+                try:
+                    # Parse JSON output one diagnostic at a time
+                    for issue in iter_json_array(ruff_result["stdout"]):
+                        path = os.path.relpath(issue["filename"], self.repo_path)
+                        fresh.setdefault(path, []).append({**issue, "filename": path})
+                except json.JSONDecodeError as e:
+                    logger.error(f"Error parsing Ruff JSON output: {e}")
+                    self.failures.append(f"ruff: unreadable output: {e}")
+                    return
+                errors.append(ruff_result["stderr"])
+        cache.store(fresh)
+
+        # Cached issues carry repo-relative paths; report them the way Ruff does
+        output = [
+            {**issue, "filename": os.path.join(self.repo_path, issue["filename"])}
+            for issues in (*cached.values(), *fresh.values())
+            for issue in issues
+        ]
+        logger.info(f"Ruff found {len(output)} issues")
+        self.findings.append(
+            {
+                "tool": "ruff",
+                "output": output,  # Store parsed JSON, not string
+                "errors": "".join(errors),
+            }
+        )
 
     def run(self) -> dict[str, Any]:
         """Run style checks on the repository."""
@@ -0,0 +1,67 @@
+import argparse
+import asyncio
+import signal
+
+from app.core.config import settings
+from app.core.logger import logger
+
+
+async def run_worker(concurrency: int, worker_id: str | None = None) -> None:
+    """Claim and execute runs from the shared queue until SIGINT/SIGTERM."""
+    from app.core.dependencies import build_job_queue, init_orchestrator
+    from app.utils.eslint_daemon import shutdown_eslint_daemon
+
+    init_orchestrator()
+    queue = build_job_queue(concurrency)
+    if worker_id:
+        queue.worker_id = worker_id
+
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+
+    await queue.start()
+    logger.info(f"Worker {queue.worker_id} ready")
+    await stopping.wait()
+
+    logger.info(f"Worker {queue.worker_id} shutting down")
+    await queue.stop()
+    shutdown_eslint_daemon()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="marc-ai", description="MARC-AI command line")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    worker = commands.add_parser("worker", help="execute queued analysis runs")
+    worker.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        default=settings.MAX_CONCURRENT_RUNS,
+        help="runs to execute at once (default: MAX_CONCURRENT_RUNS)",
+    )
+    worker.add_argument("--worker-id", help="identifier recorded on claimed runs")
+
+    commands.add_parser(
+        "eslint-toolchain", help="install the shared ESLint toolchain (ESLINT_TOOLCHAIN_DIR)"
+    )
+
+    args = parser.parse_args(argv)
+
+    if args.command == "worker":
+        if settings.QUEUE_BACKEND == "memory":
+            parser.error("worker mode needs a shared queue; set QUEUE_BACKEND=sqlite")
+        asyncio.run(run_worker(args.concurrency, args.worker_id))
+    elif args.command == "eslint-toolchain":
+        from app.utils.eslint_toolchain import ensure_eslint_toolchain
+
+        toolchain = ensure_eslint_toolchain()
+        if toolchain is None:
+            raise SystemExit("failed to install the ESLint toolchain")
+        print(toolchain)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
 # app/core/config.py
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -20,5 +22,86 @@ class Settings(BaseSettings):
     LOG_LEVEL: str = "DEBUG"
     ENVIRONMENT: str = "production"
 
+    # Job queue: number of analysis runs allowed to execute concurrently (per process)
+    MAX_CONCURRENT_RUNS: int = 1
+
+    # Where queued runs are kept. "memory": the API process executes runs itself.
+    # "sqlite": the API only enqueues and `marc-ai worker` processes execute runs;
+    # runs of a worker that stops heartbeating are retried up to QUEUE_MAX_ATTEMPTS times
+    QUEUE_BACKEND: Literal["memory", "sqlite"] = "memory"
+    QUEUE_DB_PATH: str = "data/queue.sqlite3"
+    QUEUE_LEASE_SECONDS: int = 60
+    QUEUE_MAX_ATTEMPTS: int = 3
+
+    # SQLite database holding consolidated reports, indexed by run id / repo / commit
+    REPORT_STORE_PATH: str = "data/reports.sqlite3"
+
+    # Bare mirrors of previously scanned repositories; keep on the same filesystem as
+    # the run workspaces so checkouts can hardlink objects
+    MIRROR_CACHE_ENABLED: bool = True
+    MIRROR_CACHE_DIR: str = "/tmp/marcai-mirrors"
+    MIRROR_CACHE_MAX_BYTES: int = 5 * 1024**3
+
+    # Reuse the report of an earlier run for the same commit and toolchain
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    RESULT_CACHE_MAX_ENTRIES: int = 20_000
+
+    # Per-file analyzer results keyed by blob id, tool version and tool configuration, so
+    # re-scans only analyze changed files; least recently used results beyond the size cap go
+    FINDING_CACHE_ENABLED: bool = True
+    FINDING_CACHE_PATH: str = "data/findings.sqlite3"
+    FINDING_CACHE_MAX_BYTES: int = 512 * 1024**2
+    FINDING_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+
+    # Clone only what the agents analyze (sparse checkout of sources, manifests, Dockerfiles
+    # and config). Blobs of files over CLONE_MAX_FILE_BYTES are never downloaded (a
+    # size-filtered partial clone, in the mirrors as well) and the files are left out
+    SPARSE_CLONE_ENABLED: bool = True
+    CLONE_MAX_FILE_BYTES: int = 1024 * 1024
+
+    # How long `git ls-remote` results (repo existence, ref -> SHA) are reused
+    REMOTE_REF_CACHE_TTL_SECONDS: int = 60
+    # How long POST /analyze waits for the ref to resolve to a commit, to coalesce
+    # submissions of the same commit; on timeout the run is keyed on the ref as given
+    SUBMIT_RESOLVE_TIMEOUT_SECONDS: float = 2.0
+
+    # CPU slots shared by the analyzer subprocesses of all runs in a process; multi-threaded
+    # tools (Semgrep --jobs, Ruff) are sized to what is free. 0: derive from the cgroup quota
+    TOOL_CPU_SLOTS: int = 0
+
+    # Bandit, Radon and ESLint run once per package of a monorepo (directories with a
+    # package.json / pyproject.toml / requirements.txt), in parallel; packages with more
+    # files than this are split further
+    SHARD_MAX_FILES: int = 2000
+
+    # ESLint and its TypeScript parser/plugin, installed once from package-lock.json into
+    # a versioned directory under this one and shared by every run (prebuilt in the image)
+    ESLINT_TOOLCHAIN_DIR: str = "/tmp/marcai-eslint"
+
+    # Long-lived ESLint workers (Node processes keeping ESLint and its plugins loaded) that
+    # StyleAgent sends file batches to. A worker is replaced when it dies, fails a health
+    # check after sitting idle, misses the request timeout or grows past the RSS cap
+    ESLINT_DAEMON_ENABLED: bool = True
+    ESLINT_DAEMON_WORKERS: int = 2
+    ESLINT_DAEMON_MAX_RSS_BYTES: int = 1536 * 1024**2
+    ESLINT_DAEMON_REQUEST_TIMEOUT_SECONDS: int = 300
+    ESLINT_DAEMON_HEALTH_CHECK_SECONDS: int = 60
+
+    # Upper bound on how many runs of one batch may be queued or running at once;
+    # finished batches stay visible to the batch endpoints for BATCH_RETENTION_SECONDS
+    BATCH_MAX_PARALLELISM: int = 4
+    BATCH_RETENTION_SECONDS: int = 7 * 24 * 3600
+
+    # Admission control: submissions get 429 when the queue is this deep, when a client
+    # (X-API-Key or IP) exceeds its rate limit (0 disables it), or when free disk space
+    # in the workspace directory / memory usage on any worker cross their watermarks.
+    # With QUEUE_BACKEND=sqlite the rate limit is shared by every API process
+    ADMISSION_MAX_QUEUE_DEPTH: int = 100
+    RATE_LIMIT_PER_MINUTE: float = 30
+    RATE_LIMIT_BURST: int = 10
+    ADMISSION_MIN_FREE_DISK_BYTES: int = 2 * 1024**3
+    ADMISSION_MAX_MEMORY_PERCENT: float = 90.0
+
 
 settings = Settings()
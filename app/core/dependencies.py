@@ -1,39 +1,183 @@
+from collections.abc import Callable
+from typing import Any
+
 from langchain_openai import AzureChatOpenAI
+from langgraph.graph.state import CompiledStateGraph
 from pydantic import SecretStr
 
 from app.core.config import settings
+from app.core.logger import logger
+from app.services.admission import AdmissionController, TokenBucket
+from app.services.batch_service import BatchScheduler
+from app.services.code_review_service import AnalysisRunner
+from app.services.event_log import SQLiteEventLog
+from app.services.job_queue import JobQueue
+from app.services.mirror_cache import MirrorCache
+from app.services.queue_backend import InMemoryQueueBackend, QueueBackend, SQLiteQueueBackend
+from app.services.remote_refs import RemoteRefResolver
+from app.services.report_store import ReportStore
+from app.services.result_cache import ResultCache
+from app.services.run_events import EventPublisher, RunEventBus
 from app.workflows.code_review_workflow import build_workflow
 
 
-def get_orchestrator():
+class AnalysisOrchestrator:
+    """
+    Holds the compiled LangGraph workflow and the LLM client. Both are built once per
+    process and shared by every run; each run gets its own fresh state.
+    """
+
+    def __init__(self, llm: AzureChatOpenAI, graph: CompiledStateGraph):
+        self.llm = llm
+        self.graph = graph
+
+    def run(
+        self,
+        tmpdir: str,
+        log_all_audit: bool = False,
+        progress: Callable[..., None] | None = None,
+    ) -> dict[str, Any]:
+        state = {
+            "repo_path": tmpdir,
+            "log_all_audits": log_all_audit,
+            "llm": self.llm,
+            "progress": progress,
+        }
+        return self.graph.invoke(state)
+
+
+_orchestrator: AnalysisOrchestrator | None = None
+
+
+def init_orchestrator() -> AnalysisOrchestrator:
+    """
+    Build the process-wide orchestrator. Called from the app lifespan so the LLM client
+    and compiled graph are ready before the first request.
+    """
+    global _orchestrator
+    if _orchestrator is None:
+        llm = AzureChatOpenAI(
+            model=settings.AZURE_OPENAI_DEPLOYMENT,
+            temperature=0.3,
+            azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
+            azure_deployment=settings.AZURE_OPENAI_DEPLOYMENT,
+            api_version=settings.AZURE_OPENAI_API_VERSION,
+            api_key=SecretStr(settings.AZURE_OPENAI_API_KEY),
+        )
+        graph = build_workflow()
+        logger.debug(f"Compiled review workflow:\n{graph.get_graph().draw_ascii()}")
+
+        _orchestrator = AnalysisOrchestrator(llm=llm, graph=graph)
+
+    return _orchestrator
+
+
+def get_orchestrator() -> AnalysisOrchestrator:
+    """
+    Return the shared orchestrator, building it on first use if the lifespan did not.
+    """
+    return _orchestrator or init_orchestrator()
+
+
+report_store = ReportStore(settings.REPORT_STORE_PATH)
+run_events = RunEventBus()
+remote_refs = RemoteRefResolver(ttl_seconds=settings.REMOTE_REF_CACHE_TTL_SECONDS)
+result_cache = (
+    ResultCache(
+        settings.REPORT_STORE_PATH,
+        ttl_seconds=settings.RESULT_CACHE_TTL_SECONDS,
+        max_entries=settings.RESULT_CACHE_MAX_ENTRIES,
+    )
+    if settings.RESULT_CACHE_ENABLED
+    else None
+)
+mirror_cache = (
+    MirrorCache(
+        settings.MIRROR_CACHE_DIR,
+        max_bytes=settings.MIRROR_CACHE_MAX_BYTES,
+        max_file_bytes=settings.CLONE_MAX_FILE_BYTES,
+    )
+    if settings.MIRROR_CACHE_ENABLED
+    else None
+)
+
+# With the SQLite queue, runs execute in worker processes: their events go through a
+# log in the queue database, which the API relays into `run_events`
+queue_backend: QueueBackend
+event_log: SQLiteEventLog | None
+if settings.QUEUE_BACKEND == "sqlite":
+    queue_backend = SQLiteQueueBackend(settings.QUEUE_DB_PATH)
+    event_log = SQLiteEventLog(settings.QUEUE_DB_PATH)
+else:
+    queue_backend = InMemoryQueueBackend()
+    event_log = None
+events: EventPublisher = event_log or run_events
+
+
+def build_job_queue(max_concurrent_runs: int = settings.MAX_CONCURRENT_RUNS) -> JobQueue:
+    return JobQueue(
+        runner=AnalysisRunner(
+            orchestrator_factory=get_orchestrator,
+            report_store=report_store,
+            events=events,
+            mirror_cache=mirror_cache,
+            result_cache=result_cache,
+            resolver=remote_refs,
+            sparse_clone=settings.SPARSE_CLONE_ENABLED,
+            max_file_bytes=settings.CLONE_MAX_FILE_BYTES,
+        ),
+        max_concurrent_runs=max_concurrent_runs,
+        events=events,
+        backend=queue_backend,
+        lease_seconds=settings.QUEUE_LEASE_SECONDS,
+        max_attempts=settings.QUEUE_MAX_ATTEMPTS,
+        resolver=remote_refs,
+        resolve_timeout=settings.SUBMIT_RESOLVE_TIMEOUT_SECONDS,
+    )
+
+
+job_queue = build_job_queue()
+batch_scheduler = BatchScheduler(
+    job_queue,
+    report_store,
+    max_parallelism=settings.BATCH_MAX_PARALLELISM,
+    lease_seconds=settings.QUEUE_LEASE_SECONDS,
+    retention_seconds=settings.BATCH_RETENTION_SECONDS,
+)
+admission = AdmissionController(
+    job_queue,
+    max_queue_depth=settings.ADMISSION_MAX_QUEUE_DEPTH,
+    rate_limit=(
+        TokenBucket(
+            settings.RATE_LIMIT_PER_MINUTE / 60, settings.RATE_LIMIT_BURST, backend=queue_backend
+        )
+        if settings.RATE_LIMIT_PER_MINUTE > 0
+        else None
+    ),
+    min_free_disk_bytes=settings.ADMISSION_MIN_FREE_DISK_BYTES,
+    max_memory_percent=settings.ADMISSION_MAX_MEMORY_PERCENT,
+)
+
+
+def get_job_queue() -> JobQueue:
     """
-    Return an orchestrator / LangGraph client instance.
-    This is a factory placeholder — do not initialize heavy clients at import time.
+    Return the process-wide job queue. With the in-memory backend its workers are
+    started in the app lifespan.
     """
+    return job_queue
+
+
+def get_report_store() -> ReportStore:
+    return report_store
 
-    class AnalysisOrchestrator:
-        def __init__(self):
-            self.llm = AzureChatOpenAI(
-                model=settings.AZURE_OPENAI_DEPLOYMENT,
-                temperature=0.3,
-                azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
-                azure_deployment=settings.AZURE_OPENAI_DEPLOYMENT,
-                api_version=settings.AZURE_OPENAI_API_VERSION,
-                api_key=SecretStr(settings.AZURE_OPENAI_API_KEY),
-            )
 
-            self.graph = build_workflow()
-            self.state = {}
+def get_run_events() -> RunEventBus:
+    return run_events
 
-            # Debug: print the workflow graph
-            print(self.graph.get_graph().draw_ascii())
 
-        def run(self, tmpdir: str, log_all_audit: bool = False) -> None:
-            self.state["repo_path"] = tmpdir
-            self.state["log_all_audits"] = log_all_audit
-            self.state["llm"] = self.llm
+def get_batch_scheduler() -> BatchScheduler:
+    return batch_scheduler
 
-            self.graph.invoke(self.state)
-            return
 
-    return AnalysisOrchestrator()
+def get_admission_controller() -> AdmissionController:
+    return admission
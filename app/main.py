@@ -1,8 +1,47 @@
 # app/main.py
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
 from app.core.config import settings
+from app.core.dependencies import (
+    batch_scheduler,
+    event_log,
+    init_orchestrator,
+    job_queue,
+    run_events,
+)
+from app.core.logger import logger
 from app.routers import code_review
+from app.utils.eslint_daemon import shutdown_eslint_daemon
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    run_events.attach_loop(asyncio.get_running_loop())
+    await batch_scheduler.start()
+
+    if event_log is not None:
+        # Runs execute in `marc-ai worker` processes; this process only enqueues
+        relay = asyncio.create_task(event_log.relay(run_events))
+        yield
+        relay.cancel()
+        await batch_scheduler.stop()
+        return
+
+    try:
+        init_orchestrator()
+    except Exception as e:
+        # Keep serving (health checks, stored reports); runs will report the error
+        logger.error(f"Failed to initialize analysis orchestrator: {e}")
+
+    await job_queue.start()
+    yield
+    await batch_scheduler.stop()
+    await job_queue.stop()
+    shutdown_eslint_daemon()
+
 
 app = FastAPI(
     title="MARC-AI Multi-Agent Code Review",
@@ -11,6 +50,7 @@ app = FastAPI(
     docs_url="/docs" if settings.ENVIRONMENT != "production" else None,
     redoc_url="/redoc" if settings.ENVIRONMENT != "production" else None,
     redirect_slashes=False,
+    lifespan=lifespan,
 )
 
 app.include_router(code_review.router, prefix="/api/v1/review", tags=["Review"])
@@ -0,0 +1,51 @@
+from datetime import datetime
+from enum import StrEnum
+
+from pydantic import BaseModel, ConfigDict
+
+
+class RunState(StrEnum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    @property
+    def finished(self) -> bool:
+        return self in (RunState.COMPLETED, RunState.FAILED, RunState.CANCELLED)
+
+
+class RunRecord(BaseModel):
+    """Registry entry tracking a single analysis run through the job queue."""
+
+    model_config = ConfigDict(extra="forbid")
+    run_id: str
+    repo_url: str
+    ref: str | None = None
+    commit_sha: str | None = None
+    scan_id: str | None = None
+    force: bool = False
+    cached_from: str | None = None  # run whose stored report answered this run
+    duplicates: int = 0  # identical submissions coalesced into this run
+    state: RunState = RunState.QUEUED
+    queue_position: int | None = None  # 1-based, only set while queued
+    workspace: str | None = None
+    worker_id: str | None = None  # worker holding the run while it executes
+    attempts: int = 0  # times the run was claimed by a worker
+    error: str | None = None
+    submitted_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+
+
+class BatchRecord(BaseModel):
+    """Registry entry for a batch of runs scheduled together."""
+
+    model_config = ConfigDict(extra="forbid")
+    batch_id: str
+    total: int
+    parallelism: int
+    run_ids: list[str | None]  # None until the request has been handed to the job queue
+    submitted_at: datetime
+    finished_at: datetime | None = None
@@ -15,6 +15,9 @@ class ConsolidatedReport(BaseModel):
     model_config = ConfigDict(extra="forbid")
     run_id: str
     repo_url: str
+    ref: str | None = None
+    commit_sha: str | None = None
     summary: str | None = None
     findings: list[AgentFinding] = []
     markdown: str | None = None
+    metadata: dict[str, Any] | None = None
@@ -1,8 +1,17 @@
 from pydantic import BaseModel, ConfigDict, Field, HttpUrl
 
+MAX_BATCH_SIZE = 5000
+
 
 class RepoRequest(BaseModel):
     model_config = ConfigDict(extra="forbid", strict=True)
     repo_url: HttpUrl = Field(..., description="Git URL to repository")
     ref: str | None = Field(None, description="branch, tag, or commit")
     scan_id: str | None = Field(None, description="optional client-provided id")
+    force: bool = Field(False, description="re-run the analysis even if a cached result exists")
+
+
+class BatchRequest(BaseModel):
+    model_config = ConfigDict(extra="forbid", strict=True)
+    requests: list[RepoRequest] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+    parallelism: int | None = Field(None, ge=1, description="max runs of this batch in flight")
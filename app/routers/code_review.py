@@ -1,46 +1,254 @@
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+import asyncio
+import hashlib
 
-from app.core.dependencies import get_orchestrator
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.core.dependencies import (
+    get_admission_controller,
+    get_batch_scheduler,
+    get_job_queue,
+    get_report_store,
+    get_run_events,
+)
+from app.models.jobs import RunRecord, RunState
 from app.models.report import ConsolidatedReport
-from app.models.requests import RepoRequest
+from app.models.requests import BatchRequest, RepoRequest
+from app.services.admission import AdmissionController, AdmissionRejectedError
+from app.services.batch_service import BatchScheduler
 from app.services.code_review_service import RepoClonerService
+from app.services.job_queue import JobQueue
+from app.services.report_store import ReportStore
+from app.services.run_events import RunEventBus, format_sse
 
 router = APIRouter()
 
+_SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def client_id(request: Request) -> str:
+    """Rate-limit identity of the caller: its API key if it sent one, else its IP."""
+    api_key = request.headers.get("X-API-Key")
+    if api_key:
+        return "key:" + hashlib.sha256(api_key.encode()).hexdigest()[:16]
+    return "ip:" + (request.client.host if request.client else "unknown")
+
+
+async def admit(admission: AdmissionController, request: Request, runs: int = 1) -> None:
+    try:
+        await admission.admit(client_id(request), runs=runs)
+    except AdmissionRejectedError as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=e.reason,
+            headers={"Retry-After": str(e.retry_after)},
+        ) from e
+
 
 @router.post("/analyze", status_code=status.HTTP_202_ACCEPTED)
 async def analyze_repo(
-    payload: RepoRequest, background_tasks: BackgroundTasks, orchestrator=Depends(get_orchestrator)
+    payload: RepoRequest,
+    request: Request,
+    job_queue: JobQueue = Depends(get_job_queue),
+    admission: AdmissionController = Depends(get_admission_controller),
 ):
-    try:
-        tmpdir: str = RepoClonerService(
-            repo_url=str(payload.repo_url),
-            ref=str(payload.ref) if payload.ref else "",
-            scan_id="scan_stub_id",
-        ).clone()
+    """
+    Queue a repository for analysis. Cloning happens in the background job, so this
+    returns as soon as the run is registered. Returns 429 with Retry-After when the
+    service is over capacity.
+    """
+    if not RepoClonerService.is_supported_url(str(payload.repo_url)):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only GitHub repository URLs ending in .git are supported",
+        )
+
+    # Submissions coalesced into an in-flight run cost nothing, so are not admission checked
+    record, created = await job_queue.submit(payload, admit=lambda: admit(admission, request))
+
+    return {
+        "run_id": record.run_id,
+        "status": record.state,
+        "queue_position": record.queue_position,
+        "deduplicated": not created,
+        "message": "Analysis scheduled." if created else "Attached to in-flight analysis.",
+    }
 
-        background_tasks.add_task(orchestrator.run, tmpdir=tmpdir, log_all_audit=True)
 
-        run_id = "run_stub_id"  # TODO: replace with generated id
-        # TODO: enqueue background workflow using orchestrator
-        return {"run_id": run_id, "message": "Analysis scheduled."}
+@router.post("/batch", status_code=status.HTTP_202_ACCEPTED)
+async def analyze_batch(
+    payload: BatchRequest,
+    request: Request,
+    batch_scheduler: BatchScheduler = Depends(get_batch_scheduler),
+    admission: AdmissionController = Depends(get_admission_controller),
+):
+    """
+    Queue many repositories in one call. Runs are fed to the job queue at most
+    `parallelism` at a time; track them with the batch progress and summary endpoints.
+    """
+    unsupported = [
+        index
+        for index, request in enumerate(payload.requests)
+        if not RepoClonerService.is_supported_url(str(request.repo_url))
+    ]
+    if unsupported:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "message": "Only GitHub repository URLs ending in .git are supported",
+                "indexes": unsupported,
+            },
+        )
 
-    except Exception as e:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+    # A batch never has more than its parallelism in the queue at once
+    await admit(admission, request, runs=batch_scheduler.parallelism(payload))
+    batch = await batch_scheduler.submit(payload)
 
+    return {
+        "batch_id": batch.batch_id,
+        "total": batch.total,
+        "parallelism": batch.parallelism,
+        "message": "Batch scheduled.",
+    }
 
-@router.get("/status/{run_id}")
-async def get_status(run_id: str):
+
+@router.get("/batch/{batch_id}")
+async def get_batch_status(
+    batch_id: str, batch_scheduler: BatchScheduler = Depends(get_batch_scheduler)
+):
+    """
+    Aggregate progress of a batch: number of runs in each state.
+    """
+    batch = await batch_scheduler.get(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Batch not found")
+
+    return await batch_scheduler.progress(batch)
+
+
+@router.get("/batch/{batch_id}/summary")
+async def get_batch_summary(
+    batch_id: str, batch_scheduler: BatchScheduler = Depends(get_batch_scheduler)
+):
+    """
+    Combined summary of a batch: per-agent findings totals and one row per run.
+    """
+    batch = await batch_scheduler.get(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Batch not found")
+
+    return await batch_scheduler.summary(batch)
+
+
+@router.get("/status/{run_id}", response_model=RunRecord)
+async def get_status(run_id: str, job_queue: JobQueue = Depends(get_job_queue)):
     """
     Returns the current state of a run (queued/ running / completed / failed).
     """
-    return {"run_id": run_id, "status": "queued"}
+    record = await job_queue.get(run_id)
+    if record is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found")
+
+    return record
+
+
+@router.get("/events")
+async def stream_all_events(events: RunEventBus = Depends(get_run_events)):
+    """
+    Server-Sent Events stream of progress events for every run, for dashboards that
+    would otherwise poll many runs.
+    """
+
+    async def event_stream():
+        async for event in events.subscribe():
+            yield format_sse(event)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=_SSE_HEADERS)
+
+
+@router.get("/events/{run_id}")
+async def stream_run_events(
+    run_id: str,
+    job_queue: JobQueue = Depends(get_job_queue),
+    events: RunEventBus = Depends(get_run_events),
+):
+    """
+    Server-Sent Events stream of one run's progress: queue transitions, workflow node
+    start/finish with timings and findings counts. Closes once the run finishes.
+    """
+    record = await job_queue.get(run_id)
+    if record is None and not events.history(run_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found")
+
+    finished = record is not None and record.state.finished
+
+    async def event_stream():
+        if finished and not events.history(run_id):
+            # Progress history already evicted: report the final state only
+            yield format_sse({"id": 0, "run_id": run_id, "event": record.state.value})
+            return
+        async for event in events.subscribe(run_id):
+            yield format_sse(event)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=_SSE_HEADERS)
 
 
 @router.get("/report/{run_id}", response_model=ConsolidatedReport)
-async def get_report(run_id: str):
+async def get_report(
+    run_id: str,
+    job_queue: JobQueue = Depends(get_job_queue),
+    report_store: ReportStore = Depends(get_report_store),
+):
     """
     Return consolidated report (JSON + markdown). If still running, return 202.
     """
-    # TODO: lookup persisted report
-    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Report not found")
+    record = await job_queue.get(run_id)
+    if record is not None and not record.state.finished:
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content={"run_id": run_id, "status": record.state.value},
+        )
+
+    if not await asyncio.to_thread(report_store.exists, run_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Report not found")
+
+    return StreamingResponse(report_store.stream(run_id), media_type="application/json")
+
+
+@router.get("/reports")
+def list_reports(
+    repo_url: str | None = None,
+    commit: str | None = None,
+    limit: int = 50,
+    report_store: ReportStore = Depends(get_report_store),
+):
+    """
+    List stored reports, newest first, optionally filtered by repository URL and commit SHA.
+    """
+    return report_store.find(repo_url=repo_url, commit_sha=commit, limit=min(limit, 500))
+
+
+@router.delete("/{run_id}")
+async def cancel_run(run_id: str, job_queue: JobQueue = Depends(get_job_queue)):
+    """
+    Cancel a queued or running run. Running analyzers are killed (with their child
+    processes), the remaining workflow nodes are skipped and the workspace is removed.
+    """
+    record = await job_queue.get(run_id)
+    if record is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found")
+    if record.state.finished:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Run already {record.state.value}",
+        )
+
+    record = await job_queue.cancel(run_id)
+    assert record is not None
+
+    cancelled = record.state == RunState.CANCELLED
+    return {
+        "run_id": run_id,
+        "status": record.state,
+        "message": "Run cancelled." if cancelled else "Cancellation requested.",
+    }
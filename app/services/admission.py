@@ -0,0 +1,114 @@
+import asyncio
+import math
+import tempfile
+
+from app.core.logger import logger
+from app.services.job_queue import JobQueue
+from app.services.queue_backend import InMemoryQueueBackend, QueueBackend, call_backend
+from app.utils.resources import free_disk_bytes, memory_usage_percent
+
+
+class AdmissionRejectedError(Exception):
+    """Raised when a submission is refused; `retry_after` is in seconds."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Per-client token buckets refilled at `rate` tokens/second up to `burst` tokens.
+    The buckets are kept in `backend`, so every API process sharing it enforces the
+    same limit; by default they live in this process only.
+    """
+
+    def __init__(self, rate: float, burst: int, backend: QueueBackend | None = None):
+        self.rate = rate
+        self.burst = burst
+        self.backend = backend or InMemoryQueueBackend()
+
+    def take(self, client: str, cost: float = 1.0) -> float:
+        """
+        Take `cost` tokens from the client's bucket. Returns 0 on success, otherwise the
+        number of seconds until enough tokens will be available (nothing is taken).
+        """
+        return self.backend.take_tokens(client, cost, self.rate, self.burst)
+
+
+class AdmissionController:
+    """
+    Decides whether a submission may be accepted. Rejects when the queue is at its
+    maximum depth, when the client exceeds its rate limit, or when free disk space or
+    memory fall past their watermarks (clones and analyzers need both). The watermarks
+    apply to what the queue's workers report about their hosts, since they are the ones
+    cloning; until a worker has reported, this host's are measured in `workspace_dir`.
+
+    Retry-After hints come from the queue's observed drain rate: a client turned away
+    for capacity is told roughly when a slot will have freed up.
+    """
+
+    # Used when no run has finished recently and the drain rate is unknown
+    DEFAULT_RETRY_AFTER = 60
+    MAX_RETRY_AFTER = 3600
+
+    def __init__(
+        self,
+        job_queue: JobQueue,
+        max_queue_depth: int,
+        rate_limit: TokenBucket | None = None,
+        min_free_disk_bytes: int = 0,
+        max_memory_percent: float = 100.0,
+        workspace_dir: str | None = None,
+    ):
+        self.job_queue = job_queue
+        self.max_queue_depth = max_queue_depth
+        self.rate_limit = rate_limit
+        self.min_free_disk_bytes = min_free_disk_bytes
+        self.max_memory_percent = max_memory_percent
+        self.workspace_dir = workspace_dir or tempfile.gettempdir()
+
+    async def _retry_after(self, runs_to_drain: int) -> int:
+        rate = await self.job_queue.drain_rate()
+        if rate <= 0:
+            return self.DEFAULT_RETRY_AFTER
+        return max(1, min(self.MAX_RETRY_AFTER, math.ceil(runs_to_drain / rate)))
+
+    async def _resources(self) -> list[tuple[str, int, float | None]]:
+        reported = await self.job_queue.worker_resources()
+        if reported:
+            return reported
+        free_disk = await asyncio.to_thread(free_disk_bytes, self.workspace_dir)
+        return [("this host", free_disk, await asyncio.to_thread(memory_usage_percent))]
+
+    async def admit(self, client: str, runs: int = 1) -> None:
+        """
+        Admit a submission that may add up to `runs` runs to the queue, or raise
+        `AdmissionRejectedError`.
+        """
+        depth = await self.job_queue.depth()
+        if depth + runs > self.max_queue_depth:
+            raise AdmissionRejectedError(
+                f"Queue is full ({depth}/{self.max_queue_depth} runs waiting)",
+                await self._retry_after(depth + runs - self.max_queue_depth),
+            )
+
+        # The next run may be claimed by any of the workers, so each needs room for it
+        for worker_id, free_disk, memory in await self._resources():
+            if free_disk < self.min_free_disk_bytes:
+                logger.warning(f"Rejecting submission: {free_disk} bytes free on {worker_id}")
+                raise AdmissionRejectedError(
+                    "Not enough free disk space", await self._retry_after(1)
+                )
+            if memory is not None and memory > self.max_memory_percent:
+                logger.warning(
+                    f"Rejecting submission: memory usage at {memory:.1f}% on {worker_id}"
+                )
+                raise AdmissionRejectedError("Memory usage too high", await self._retry_after(1))
+
+        # Rate limit last, so requests refused for capacity do not use up tokens
+        if self.rate_limit is not None:
+            wait = await call_backend(self.rate_limit.backend, self.rate_limit.take, client)
+            if wait > 0:
+                raise AdmissionRejectedError("Rate limit exceeded", math.ceil(wait))
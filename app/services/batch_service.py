@@ -0,0 +1,236 @@
+import asyncio
+import uuid
+from collections import Counter
+from datetime import UTC, datetime
+from typing import Any
+
+from app.core.logger import logger
+from app.models.jobs import BatchRecord, RunRecord, RunState
+from app.models.requests import BatchRequest, RepoRequest
+from app.services.job_queue import JobQueue, default_worker_id
+from app.services.queue_backend import QueueBackend, call_backend
+from app.services.report_store import ReportStore
+
+
+def generate_batch_id() -> str:
+    return f"batch_{uuid.uuid4().hex}"
+
+
+class BatchScheduler:
+    """
+    Schedules a batch of repositories through the shared job queue.
+
+    A batch never has more than `parallelism` of its runs queued or running at once, so
+    a fleet-wide scan drains steadily through the worker pool without flooding the queue
+    ahead of interactive submissions.
+
+    Batches are stored in the queue backend, so with a shared backend every API process
+    can report on them. The process a batch was submitted to feeds it while holding a
+    lease; when that process dies, another one takes the batch over and resumes it.
+    Finished batches are forgotten after `retention_seconds`.
+    """
+
+    def __init__(
+        self,
+        job_queue: JobQueue,
+        report_store: ReportStore,
+        max_parallelism: int,
+        lease_seconds: float = 60.0,
+        retention_seconds: float = 7 * 24 * 3600,
+    ):
+        self.job_queue = job_queue
+        self.report_store = report_store
+        self.max_parallelism = max_parallelism
+        self.lease_seconds = lease_seconds
+        self.retention_seconds = retention_seconds
+        self.feeder_id = default_worker_id()
+
+        self._feeding: dict[str, tuple[BatchRecord, asyncio.Task]] = {}
+        self._maintainer: asyncio.Task | None = None
+
+    @property
+    def backend(self) -> QueueBackend:
+        return self.job_queue.backend
+
+    def parallelism(self, batch: BatchRequest) -> int:
+        """Runs of the batch allowed in flight at once."""
+        requested = batch.parallelism or self.max_parallelism
+        return min(requested, self.max_parallelism, len(batch.requests))
+
+    async def start(self) -> None:
+        """Start renewing leases, resuming orphaned batches and pruning old ones."""
+        if self._maintainer is None:
+            self._maintainer = asyncio.create_task(self._maintain(), name="marcai-batches")
+
+    async def stop(self) -> None:
+        """Stop feeding. Unfinished batches are resumed by another process, or on restart."""
+        tasks = [task for _, task in self._feeding.values()]
+        if self._maintainer is not None:
+            tasks.append(self._maintainer)
+            self._maintainer = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def submit(self, batch: BatchRequest) -> BatchRecord:
+        """Register the batch and start feeding its runs to the job queue."""
+        parallelism = self.parallelism(batch)
+        record = BatchRecord(
+            batch_id=generate_batch_id(),
+            total=len(batch.requests),
+            parallelism=parallelism,
+            run_ids=[None] * len(batch.requests),
+            submitted_at=datetime.now(UTC),
+        )
+        await call_backend(
+            self.backend,
+            self.backend.add_batch,
+            record,
+            batch.requests,
+            self.feeder_id,
+            self.lease_seconds,
+        )
+        self._start_feeding(record, batch.requests)
+
+        logger.info(f"Batch {record.batch_id}: {record.total} runs, parallelism {parallelism}")
+        return record
+
+    async def get(self, batch_id: str) -> BatchRecord | None:
+        return await call_backend(self.backend, self.backend.get_batch, batch_id)
+
+    def _start_feeding(self, record: BatchRecord, requests: list[RepoRequest]) -> None:
+        task = asyncio.create_task(self._feed(record, requests))
+        self._feeding[record.batch_id] = (record, task)
+        task.add_done_callback(lambda _: self._feeding.pop(record.batch_id, None))
+
+    async def _save(self, record: BatchRecord) -> bool:
+        return await call_backend(
+            self.backend, self.backend.update_batch, record, self.feeder_id, self.lease_seconds
+        )
+
+    async def _feed(self, record: BatchRecord, requests: list[RepoRequest]) -> None:
+        slots = asyncio.Semaphore(record.parallelism)
+        waiters = []
+
+        async def wait_and_release(run_id: str) -> None:
+            try:
+                await self.job_queue.wait(run_id)
+            finally:
+                slots.release()
+
+        try:
+            # A resumed batch first waits for the runs its previous feeder handed over
+            for run_id in record.run_ids:
+                if run_id is not None:
+                    await slots.acquire()
+                    waiters.append(asyncio.create_task(wait_and_release(run_id)))
+
+            for index, request in enumerate(requests):
+                if record.run_ids[index] is not None:
+                    continue
+                await slots.acquire()
+                run, _ = await self.job_queue.submit(request)
+                record.run_ids[index] = run.run_id
+                await self._save(record)
+                waiters.append(asyncio.create_task(wait_and_release(run.run_id)))
+
+            await asyncio.gather(*waiters)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+        record.finished_at = datetime.now(UTC)
+        await self._save(record)
+        logger.info(f"Batch {record.batch_id} finished")
+
+    async def _maintain(self) -> None:
+        last_prune = None
+        while True:
+            for record, task in list(self._feeding.values()):
+                if not await self._save(record):
+                    logger.warning(f"Batch {record.batch_id}: lease lost to another process")
+                    task.cancel()
+
+            while (
+                claimed := await call_backend(
+                    self.backend, self.backend.claim_batch, self.feeder_id, self.lease_seconds
+                )
+            ) is not None:
+                record, requests = claimed
+                logger.info(f"Resuming batch {record.batch_id}")
+                self._start_feeding(record, requests)
+
+            now = asyncio.get_running_loop().time()
+            if last_prune is None or now - last_prune > 3600:
+                last_prune = now
+                pruned = await call_backend(
+                    self.backend, self.backend.prune_batches, self.retention_seconds
+                )
+                logger.debug(f"Pruned {pruned} finished batch(es)")
+
+            await asyncio.sleep(self.lease_seconds / 3)
+
+    async def _runs(self, record: BatchRecord) -> dict[str, RunRecord]:
+        """The batch's submitted runs, read in one backend call."""
+        return await self.job_queue.get_many([run_id for run_id in record.run_ids if run_id])
+
+    async def progress(
+        self, record: BatchRecord, runs: dict[str, RunRecord] | None = None
+    ) -> dict[str, Any]:
+        """Aggregate state counts for the batch's runs."""
+        if runs is None:
+            runs = await self._runs(record)
+        states: Counter[str] = Counter()
+        for run_id in record.run_ids:
+            run = runs.get(run_id) if run_id else None
+            states[run.state.value if run else "pending"] += 1
+
+        done = sum(states[state.value] for state in RunState if state.finished)
+        return {
+            "batch_id": record.batch_id,
+            "total": record.total,
+            "parallelism": record.parallelism,
+            "states": {
+                "pending": states["pending"],
+                **{state.value: states[state.value] for state in RunState},
+            },
+            "progress": round(done / record.total, 4),
+            "submitted_at": record.submitted_at,
+            "finished_at": record.finished_at,
+        }
+
+    async def summary(self, record: BatchRecord) -> dict[str, Any]:
+        """
+        Combined view of the batch: progress, findings totals per agent across completed
+        runs and one row per run. Only report headers are read, never full findings.
+        """
+        snapshots = await self._runs(record)
+        completed = [run_id for run_id, run in snapshots.items() if run.state == RunState.COMPLETED]
+        headers = await asyncio.to_thread(self.report_store.headers, completed)
+
+        totals: Counter[str] = Counter()
+        runs = []
+        for index, run_id in enumerate(record.run_ids):
+            run = snapshots.get(run_id) if run_id else None
+            row: dict[str, Any] = {
+                "index": index,
+                "run_id": run_id,
+                "state": run.state.value if run else "pending",
+            }
+            if run is not None:
+                row.update(repo_url=run.repo_url, ref=run.ref, commit_sha=run.commit_sha)
+                if run.error:
+                    row["error"] = run.error
+
+            if run is not None and run.state == RunState.COMPLETED:
+                header = headers.get(run.run_id) or {}
+                counts = (header.get("metadata") or {}).get("findings_count", {})
+                totals.update(counts)
+                row["findings_count"] = counts
+
+            runs.append(row)
+
+        return {
+            **await self.progress(record, snapshots),
+            "findings_count": dict(totals),
+            "runs": runs,
+        }
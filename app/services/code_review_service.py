@@ -1,58 +1,349 @@
+import asyncio
+import os
+import shutil
 import tempfile
+from collections.abc import Callable
 from pathlib import Path
+from typing import Any
 
-import requests
+from app.core.logger import logger
+from app.models.jobs import RunRecord
+from app.models.report import AgentFinding, ConsolidatedReport
+from app.services.mirror_cache import MirrorCache, MirrorCacheError
+from app.services.remote_refs import RemoteRefResolver, RepositoryNotFoundError
+from app.services.report_store import ReportStore
+from app.services.result_cache import ResultCache, run_cache_key
+from app.services.run_events import EventPublisher
+from app.utils.cancellation import run_in_thread
+from app.utils.finding_cache import FindingCacheStats, finding_cache_stats
+from app.utils.sparse_checkout import prepare_checkout, remove_large_files, size_filter
+from app.utils.subprocess_runner import run_async_subprocess, run_safe_subprocess
+from app.utils.tool_limits import ToolUsage, tool_usage
+from app.utils.toolchain import toolchain_fingerprint
+from app.workflows.code_review_workflow import count_findings
 
-from app.utils.subprocess_runner import run_safe_subprocess
+AGENT_STATE_KEYS = {
+    "style": "style_findings",
+    "security": "security_findings",
+    "performance": "performance_findings",
+}
 
 
 class RepoClonerService:
-    def __init__(self, repo_url: str, ref: str, scan_id: str):
+    def __init__(
+        self,
+        repo_url: str,
+        ref: str,
+        scan_id: str,
+        mirror_cache: MirrorCache | None = None,
+        resolver: RemoteRefResolver | None = None,
+        sparse: bool = False,
+        max_file_bytes: int | None = None,
+    ):
         self.repo_url: str = repo_url
         self.ref: str = ref
         self.scan_id: str = scan_id
+        self.mirror_cache = mirror_cache
+        self.resolver = resolver or RemoteRefResolver()
+        self.sparse = sparse
+        self.max_file_bytes = max_file_bytes
 
-    def _repo_exists(self) -> bool:
+    @staticmethod
+    def is_supported_url(repo_url: str) -> bool:
         """
-        Check if the repository exists.
+        Check that the URL points at a GitHub repository clone URL.
         """
+        return repo_url.startswith("https://github.com/") and repo_url.endswith(".git")
 
-        prefix = "https://github.com/"
-        suffix = ".git"
-        if not self.repo_url.startswith(prefix) or not self.repo_url.endswith(suffix):
-            return False
-
-        response = requests.get(self.repo_url)
-        return response.status_code == 200
+    async def resolve_commit(self) -> str:
+        """
+        Check that the repository and ref exist and return the commit SHA the ref points to.
+        Results are cached by the shared resolver, so repeated calls are cheap.
+        """
+        if not self.is_supported_url(self.repo_url):
+            raise RepositoryNotFoundError("Repository does not exist")
+        return await self.resolver.resolve(self.repo_url, self.ref)
 
-    def clone(self) -> str:
+    async def clone(self) -> str:
         """
         Clone the repository and return the path to the cloned repository.
+        Runs git as an asyncio subprocess so the event loop is never blocked.
         """
+        tmpdir = ""
         try:
-            if not self._repo_exists():
-                raise Exception("Repository does not exist")
+            await self.resolve_commit()
 
             tmpdir = tempfile.mkdtemp(prefix="marcai-temp-work-")
-            if self.ref:
-                cmd = ["git", "clone", "--depth", "1", "--branch", self.ref, self.repo_url, tmpdir]
-            else:
-                cmd = ["git", "clone", "--depth", "1", self.repo_url, tmpdir]
-
-            result = run_safe_subprocess(
-                command=cmd,
-                cwd=Path("/tmp"),
-                timeout=300,
-            )
 
-            print("dir: ", tmpdir)
-            print("result:", result)
+            cloned = False
+            if self.mirror_cache is not None:
+                try:
+                    await self.mirror_cache.checkout(
+                        self.repo_url, self.ref, tmpdir, sparse=self.sparse
+                    )
+                    cloned = True
+                except MirrorCacheError as e:
+                    logger.warning(f"Mirror cache checkout failed, cloning directly: {e}")
+                    shutil.rmtree(tmpdir, ignore_errors=True)
+                    os.makedirs(tmpdir)
+
+            if not cloned:
+                await self._clone_direct(tmpdir)
+
+            if self.max_file_bytes is not None:
+                removed = await asyncio.to_thread(remove_large_files, tmpdir, self.max_file_bytes)
+                if removed:
+                    logger.info(f"Removed {removed} file(s) over {self.max_file_bytes} bytes")
 
         except Exception as e:
+            if tmpdir:
+                shutil.rmtree(tmpdir, ignore_errors=True)
             raise Exception(f"Failed to clone repository: {str(e)}")
 
+        return tmpdir
+
+    async def _git(self, cmd: list[str]) -> str:
+        result = await run_async_subprocess(
+            command=cmd,
+            cwd=Path("/tmp"),
+            timeout=300,
+            env={**os.environ, "GIT_TERMINAL_PROMPT": "0"},
+        )
+
+        if result["returncode"] != 0:
+            raise Exception(result["stderr"].strip() or f"git {cmd[1]} failed")
+        return result["stdout"].strip()
+
+    async def _clone_direct(self, tmpdir: str) -> None:
+        """
+        Shallow clone into `tmpdir`. With a max file size the blobs of larger files are
+        never downloaded, and those files are left out of the checkout. Otherwise, in
+        sparse mode, the clone is blobless and only the analyzable files are checked out,
+        so only their blobs are downloaded.
+        """
+        cmd = ["git", "clone", "--depth", "1", "--no-checkout"]
+        if self.max_file_bytes is not None:
+            cmd.append(f"--filter={size_filter(self.max_file_bytes)}")
+        elif self.sparse:
+            cmd.append("--filter=blob:none")
+        if self.ref:
+            cmd += ["--branch", self.ref]
+        await self._git([*cmd, self.repo_url, tmpdir])
+
+        await prepare_checkout(
+            lambda *args: self._git(["git", *args]),
+            tmpdir,
+            "HEAD",
+            self.sparse,
+            size_filtered=self.max_file_bytes is not None,
+        )
+        await self._git(["git", "-C", tmpdir, "checkout", "--quiet"])
+
+        logger.info(f"Cloned {self.repo_url} into {tmpdir}{' (sparse)' if self.sparse else ''}")
+
+
+def resolve_head_commit(repo_path: str) -> str | None:
+    """
+    Return the commit SHA checked out in a cloned workspace.
+    """
+    result = run_safe_subprocess(["git", "rev-parse", "HEAD"], cwd=repo_path, timeout=30)
+    if result["returncode"] != 0:
+        return None
+    return result["stdout"].strip() or None
+
+
+def build_report(
+    record: RunRecord,
+    state: dict[str, Any],
+    usage: list[ToolUsage] | None = None,
+    cache_stats: dict[str, FindingCacheStats] | None = None,
+) -> ConsolidatedReport:
+    """
+    Assemble the consolidated report from the final workflow state, the resource usage
+    of the run's analyzer subprocesses and the finding cache hits/misses per tool.
+    """
+    findings = [AgentFinding(agent="style", findings=state.get("style_findings") or [])]
+
+    security = state.get("security_findings")
+    if security is not None:
+        findings.append(
+            AgentFinding(
+                agent="security",
+                findings=[
+                    {"tool": "bandit", "output": security.Bandit.model_dump(mode="json")},
+                    {"tool": "semgrep", "output": security.Semgrep.model_dump(mode="json")},
+                ],
+            )
+        )
+
+    performance = state.get("performance_findings")
+    if performance is not None:
+        findings.append(
+            AgentFinding(
+                agent="performance",
+                findings=[
+                    {"tool": "radon", "output": performance.radon.model_dump(mode="json")},
+                    {
+                        "tool": "xenon",
+                        "output": [v.model_dump(mode="json") for v in performance.xenon_violations],
+                    },
+                ],
+                metadata=performance.summary,
+            )
+        )
+
+    # Per-agent totals let history and batch summaries skip loading the findings
+    findings_count = {
+        agent: count
+        for agent, key in AGENT_STATE_KEYS.items()
+        if key in state and (count := count_findings({key: state[key]})) is not None
+    }
+
+    return ConsolidatedReport(
+        run_id=record.run_id,
+        repo_url=record.repo_url,
+        ref=record.ref,
+        commit_sha=record.commit_sha,
+        findings=findings,
+        markdown=state.get("markdown_report"),
+        metadata={
+            "findings_count": findings_count,
+            "tool_usage": [u.model_dump() for u in usage or []],
+            "finding_cache": {
+                tool: stats.model_dump() for tool, stats in (cache_stats or {}).items()
+            },
+            "tool_failures": state.get("tool_failures") or [],
+        },
+    )
+
+
+class AnalysisRunner:
+    """
+    Executes a queued run: clones the repository, hands the workspace to the orchestrator
+    and persists the consolidated report. The LangGraph workflow is synchronous, so it
+    runs in a thread to keep the event loop free.
+    """
+
+    def __init__(
+        self,
+        orchestrator_factory: Callable[[], Any],
+        report_store: ReportStore,
+        events: EventPublisher | None = None,
+        mirror_cache: MirrorCache | None = None,
+        result_cache: ResultCache | None = None,
+        resolver: RemoteRefResolver | None = None,
+        sparse_clone: bool = False,
+        max_file_bytes: int | None = None,
+    ):
+        self.orchestrator_factory = orchestrator_factory
+        self.report_store = report_store
+        self.events = events
+        self.mirror_cache = mirror_cache
+        self.result_cache = result_cache
+        self.resolver = resolver or RemoteRefResolver()
+        self.sparse_clone = sparse_clone
+        self.max_file_bytes = max_file_bytes
+
+    async def __call__(self, record: RunRecord) -> None:
+        cloner = RepoClonerService(
+            repo_url=record.repo_url,
+            ref=record.ref or "",
+            scan_id=record.scan_id or "",
+            mirror_cache=self.mirror_cache,
+            resolver=self.resolver,
+            sparse=self.sparse_clone,
+            max_file_bytes=self.max_file_bytes,
+        )
+
+        # The resolved SHA keys the result cache, so a cache hit skips the clone entirely
+        record.commit_sha = await cloner.resolve_commit()
+        if not record.force and await self._serve_cached(record):
+            return
+
+        record.workspace = await cloner.clone()
+        try:
+            await self._analyze(record)
         finally:
-            # shutil.rmtree(tmpdir)
-            pass
+            logger.info(f"Cleaning up workspace: {record.workspace}")
+            await asyncio.to_thread(shutil.rmtree, record.workspace, ignore_errors=True)
 
-        return tmpdir
+    async def _cache_key(self, record: RunRecord) -> str | None:
+        if self.result_cache is None or not record.commit_sha:
+            return None
+        fingerprint = await asyncio.to_thread(toolchain_fingerprint)
+        return run_cache_key(record.repo_url, record.commit_sha, fingerprint)
+
+    async def _analyze(self, record: RunRecord) -> None:
+        assert record.workspace is not None
+        # The branch may have moved since the ref was resolved; record what was analyzed
+        checked_out = await asyncio.to_thread(resolve_head_commit, record.workspace)
+        record.commit_sha = checked_out or record.commit_sha
+
+        progress = None
+        if self.events is not None:
+            events = self.events
+
+            def progress(event: str, **data: Any) -> None:
+                events.publish(record.run_id, event, **data)
+
+        # Every analyzer subprocess of the run appends its wall/CPU time and peak RSS
+        usage: list[ToolUsage] = []
+        token = tool_usage.set(usage)
+        cache_stats: dict[str, FindingCacheStats] = {}
+        cache_token = finding_cache_stats.set(cache_stats)
+        try:
+            orchestrator = self.orchestrator_factory()
+            # Removing the workspace must wait until the workflow stopped using it
+            state = await run_in_thread(
+                orchestrator.run, tmpdir=record.workspace, log_all_audit=True, progress=progress
+            )
+        finally:
+            finding_cache_stats.reset(cache_token)
+            tool_usage.reset(token)
+
+        report = build_report(record, state, usage, cache_stats)
+        await asyncio.to_thread(self.report_store.save, report)
+
+        # A report missing an analyzer's findings must not be served for later runs
+        failures = state.get("tool_failures") or []
+        if failures:
+            logger.warning(f"Run {record.run_id} not cached, analyzers failed: {failures}")
+            return
+
+        cache_key = await self._cache_key(record)
+        if self.result_cache is not None and cache_key is not None:
+            await asyncio.to_thread(self.result_cache.store, cache_key, record.run_id)
+
+    async def _serve_cached(self, record: RunRecord) -> bool:
+        """
+        Answer the run from a cached report, stored again under this run's id.
+        Returns False on a cache miss.
+        """
+        cache_key = await self._cache_key(record)
+        if self.result_cache is None or cache_key is None:
+            return False
+
+        source_run_id = await asyncio.to_thread(self.result_cache.lookup, cache_key)
+        if source_run_id is None:
+            return False
+
+        cached = await asyncio.to_thread(self.report_store.load, source_run_id)
+        if cached is None:
+            # Report was removed from the store; the cache entry is useless
+            await asyncio.to_thread(self.result_cache.invalidate, cache_key)
+            return False
+
+        report = cached.model_copy(
+            update={
+                "run_id": record.run_id,
+                "ref": record.ref,
+                "metadata": {**(cached.metadata or {}), "cached_from": source_run_id},
+            }
+        )
+        await asyncio.to_thread(self.report_store.save, report)
+
+        record.cached_from = source_run_id
+        logger.info(f"Run {record.run_id} served from cached run {source_run_id}")
+        if self.events is not None:
+            self.events.publish(record.run_id, "cache_hit", cached_from=source_run_id)
+        return True
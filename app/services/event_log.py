@@ -0,0 +1,92 @@
+import asyncio
+import json
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from app.core.logger import logger
+from app.services.run_events import RunEventBus
+from app.utils.sqlite import SQLiteDatabase
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS run_event_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_run_event_log_created ON run_event_log (created_at);
+"""
+
+
+class SQLiteEventLog:
+    """
+    Run progress events written to SQLite by worker processes and relayed into the API
+    process's event bus, which serves them to Server-Sent Events subscribers.
+    Has the same `publish` signature as `RunEventBus`, so runners can use either.
+    """
+
+    def __init__(self, db_path: str | Path, retention_seconds: int = 24 * 3600):
+        self.db = SQLiteDatabase(db_path, _SCHEMA)
+        self.retention_seconds = retention_seconds
+
+    def publish(self, run_id: str, event: str, **data: Any) -> None:
+        payload = {
+            "run_id": run_id,
+            "event": event,
+            "timestamp": datetime.now(UTC).isoformat(),
+            **data,
+        }
+        with self.db.connect() as conn:
+            conn.execute(
+                "INSERT INTO run_event_log (created_at, payload) VALUES (?, ?)",
+                (time.time(), json.dumps(payload)),
+            )
+
+    def read(self, after_id: int, limit: int = 500) -> list[tuple[int, dict[str, Any]]]:
+        with self.db.connect() as conn:
+            rows = conn.execute(
+                "SELECT id, payload FROM run_event_log WHERE id > ? ORDER BY id LIMIT ?",
+                (after_id, limit),
+            ).fetchall()
+        return [(event_id, json.loads(payload)) for event_id, payload in rows]
+
+    def last_id(self) -> int:
+        """Id of the newest event in the log, 0 when it is empty."""
+        with self.db.connect() as conn:
+            return conn.execute("SELECT COALESCE(MAX(id), 0) FROM run_event_log").fetchone()[0]
+
+    def prune(self) -> int:
+        with self.db.connect() as conn:
+            return conn.execute(
+                "DELETE FROM run_event_log WHERE created_at < ?",
+                (time.time() - self.retention_seconds,),
+            ).rowcount
+
+    async def relay(self, bus: RunEventBus, poll_interval: float = 0.5) -> None:
+        """
+        Tail the log and publish every event written from now on on `bus`. Runs until
+        cancelled. Events already in the log are not replayed: the bus keeps its own
+        history, and replaying a day of events on every restart would flood it.
+        """
+        last_id = await asyncio.to_thread(self.last_id)
+        await asyncio.to_thread(self.prune)
+        last_prune = time.monotonic()
+
+        while True:
+            try:
+                batch = await asyncio.to_thread(self.read, last_id)
+            except Exception as e:
+                logger.error(f"Failed to read run event log: {e}")
+                batch = []
+
+            for event_id, payload in batch:
+                bus.publish(payload.pop("run_id"), payload.pop("event"), **payload)
+                last_id = event_id
+
+            if time.monotonic() - last_prune > 3600:
+                await asyncio.to_thread(self.prune)
+                last_prune = time.monotonic()
+
+            if not batch:
+                await asyncio.sleep(poll_interval)
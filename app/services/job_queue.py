@@ -0,0 +1,390 @@
+import asyncio
+import os
+import socket
+import tempfile
+import uuid
+from collections.abc import Awaitable, Callable
+from datetime import UTC, datetime
+from typing import Any, TypeVar
+
+from app.core.logger import logger
+from app.models.jobs import RunRecord, RunState
+from app.models.requests import RepoRequest
+from app.services.mirror_cache import normalize_repo_url
+from app.services.queue_backend import InMemoryQueueBackend, QueueBackend, call_backend
+from app.services.remote_refs import RefNotFoundError, RemoteRefResolver, RepositoryNotFoundError
+from app.services.run_events import EventPublisher
+from app.utils.cancellation import CancelScope, RunCancelled, current_scope
+from app.utils.resources import free_disk_bytes, memory_usage_percent
+
+# Finished runs stay visible to the status endpoint for this long
+FINISHED_RUN_RETENTION_SECONDS = 7 * 24 * 3600
+
+RunHandler = Callable[[RunRecord], Awaitable[None]]
+Admit = Callable[[], Awaitable[None]]
+T = TypeVar("T")
+
+
+def generate_run_id() -> str:
+    return f"run_{uuid.uuid4().hex}"
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def dedup_key(request: RepoRequest, commit_sha: str | None = None) -> str:
+    """
+    Identity of the work a request asks for. Submissions with the same key while a run
+    is queued or in progress are coalesced into that run. Keyed on the commit the ref
+    resolves to when known, so a branch, HEAD and the SHA of one commit coalesce.
+    """
+    target = commit_sha or request.ref or "HEAD"
+    mode = "force" if request.force else "cached"
+    return f"{normalize_repo_url(str(request.repo_url))}@{target}#{mode}"
+
+
+class JobQueue:
+    """
+    Bounded worker pool that executes analysis runs in FIFO order.
+
+    Runs are stored in a pluggable `QueueBackend`. With the in-memory backend the API
+    process executes runs itself; with a shared backend the API only enqueues and any
+    number of `marc-ai worker` processes claim runs from it. Within one process at most
+    `max_concurrent_runs` runs execute at once. Identical submissions (same repo and
+    commit, resolved with `resolver` within `resolve_timeout` seconds, else the same
+    literal ref) are coalesced while a run is in flight.
+
+    While started, the queue reports the free disk space in `workspace_dir` and the
+    memory usage of its host to the backend, for admission control in the API, and
+    prunes runs that finished more than `retention_seconds` ago from it every hour.
+    """
+
+    def __init__(
+        self,
+        runner: RunHandler,
+        max_concurrent_runs: int = 1,
+        events: EventPublisher | None = None,
+        backend: QueueBackend | None = None,
+        worker_id: str | None = None,
+        poll_interval: float = 1.0,
+        lease_seconds: float = 60.0,
+        max_attempts: int = 3,
+        resolver: RemoteRefResolver | None = None,
+        workspace_dir: str | None = None,
+        resolve_timeout: float = 2.0,
+        retention_seconds: float = FINISHED_RUN_RETENTION_SECONDS,
+    ) -> None:
+        if max_concurrent_runs < 1:
+            raise ValueError("max_concurrent_runs must be at least 1")
+
+        self.runner = runner
+        self.max_concurrent_runs = max_concurrent_runs
+        self.events = events
+        self.backend = backend or InMemoryQueueBackend()
+        self.worker_id = worker_id or default_worker_id()
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.resolver = resolver
+        self.resolve_timeout = resolve_timeout
+        self.retention_seconds = retention_seconds
+        self.workspace_dir = workspace_dir or tempfile.gettempdir()
+
+        self._wakeup = asyncio.Event()
+        self._finished: dict[str, asyncio.Event] = {}  # run id -> set when it finishes
+        self._executing: dict[str, tuple[CancelScope, asyncio.Task]] = {}
+        self._workers: list[asyncio.Task] = []
+        # Lookups that outlived `resolve_timeout`; they finish to warm the resolver's cache
+        self._resolving: set[asyncio.Task] = set()
+
+    @property
+    def started(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self) -> None:
+        """Spawn the worker tasks. Must be called from within the running event loop."""
+        if self.started:
+            return
+
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"marcai-run-worker-{i}")
+            for i in range(self.max_concurrent_runs)
+        ]
+        self._workers.append(
+            asyncio.create_task(self._report_resources(), name="marcai-run-resources")
+        )
+        self._workers.append(asyncio.create_task(self._prune(), name="marcai-run-prune"))
+        logger.info(f"Job queue started with {self.max_concurrent_runs} worker(s)")
+
+    async def stop(self) -> None:
+        """
+        Cancel the worker tasks. Runs still queued stay queued; runs interrupted
+        mid-execution are put back at the front of the queue once they have unwound.
+        """
+        for scope, _ in self._executing.values():
+            scope.interrupt()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def _call(self, method: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        return await call_backend(self.backend, method, *args, **kwargs)
+
+    async def _resolve_commit(self, request: RepoRequest) -> str | None:
+        """
+        The commit the request's ref points to, from the resolver's cached ls-remote.
+        None when it cannot be resolved; the run then reports why when it executes.
+        """
+        if self.resolver is None:
+            return None
+        try:
+            return await self.resolver.resolve(str(request.repo_url), request.ref or "")
+        except (RepositoryNotFoundError, RefNotFoundError):
+            return None
+        except Exception as e:
+            logger.warning(f"Could not resolve {request.repo_url}@{request.ref or 'HEAD'}: {e}")
+            return None
+
+    async def _resolve_commit_briefly(self, request: RepoRequest) -> str | None:
+        """
+        `_resolve_commit` bounded by `resolve_timeout`, so a slow remote does not hold up
+        the submission; None once it runs out. The lookup itself keeps going, so the run
+        finds the refs cached when it executes.
+        """
+        if self.resolver is None:
+            return None
+        task = asyncio.create_task(self._resolve_commit(request))
+        self._resolving.add(task)
+        task.add_done_callback(self._resolving.discard)
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout=self.resolve_timeout)
+        except TimeoutError:
+            logger.info(
+                f"Resolving {request.repo_url}@{request.ref or 'HEAD'} timed out; "
+                "keying the run on the ref"
+            )
+            return None
+
+    async def submit(
+        self, request: RepoRequest, admit: Admit | None = None
+    ) -> tuple[RunRecord, bool]:
+        """
+        Register a new run and place it at the back of the queue.
+
+        Returns the run and whether it was created. When an identical run is already
+        queued or running, that run is returned instead and nothing new is scheduled.
+        `admit` is awaited before the ref is resolved, and may raise to refuse the run;
+        submissions that coalesce into an existing run for the same literal ref skip it.
+        """
+        record = RunRecord(
+            run_id=generate_run_id(),
+            repo_url=str(request.repo_url),
+            ref=request.ref,
+            scan_id=request.scan_id,
+            force=request.force,
+            submitted_at=datetime.now(UTC),
+        )
+        # Admission comes first, so refused submissions never wait on the remote
+        if (
+            admit is not None
+            and await self._call(self.backend.in_flight, dedup_key(request)) is None
+        ):
+            await admit()
+        key = dedup_key(request, await self._resolve_commit_briefly(request))
+        record, created = await self._call(self.backend.enqueue, record, key)
+        if not created:
+            logger.info(f"Coalesced submission for {request.repo_url} into run {record.run_id}")
+            return record, False
+
+        self._wakeup.set()
+        logger.info(
+            f"Queued run {record.run_id} for {record.repo_url} (position={record.queue_position})"
+        )
+        self._publish(record.run_id, RunState.QUEUED, queue_position=record.queue_position)
+        return record, True
+
+    async def get(self, run_id: str) -> RunRecord | None:
+        """Return a snapshot of the run, with its current queue position if still queued."""
+        return await self._call(self.backend.get, run_id)
+
+    async def get_many(self, run_ids: list[str]) -> dict[str, RunRecord]:
+        """Snapshots of many runs in one backend call, by run id, without queue positions."""
+        return await self._call(self.backend.get_many, run_ids)
+
+    async def cancel(self, run_id: str) -> RunRecord | None:
+        """
+        Cancel a run. A queued run is cancelled immediately. A running run has its
+        subprocesses killed, its remaining workflow nodes skipped and its workspace
+        removed, by this process if it executes the run, otherwise by the worker holding
+        it within `poll_interval`.
+        """
+        record = await self._call(self.backend.cancel, run_id)
+        if record is None:
+            return None
+
+        if record.state == RunState.CANCELLED:
+            logger.info(f"Run {run_id} cancelled while queued")
+            self._publish(run_id, RunState.CANCELLED)
+            self._notify_finished(run_id)
+        elif run_id in self._executing:
+            self._cancel_execution(run_id)
+        return record
+
+    def _cancel_execution(self, run_id: str) -> None:
+        scope, task = self._executing[run_id]
+        if not scope.cancelled:
+            logger.info(f"Cancelling run {run_id}")
+            scope.cancel()
+            task.cancel()
+
+    def _notify_finished(self, run_id: str) -> None:
+        if (finished := self._finished.get(run_id)) is not None:
+            finished.set()
+
+    async def wait(self, run_id: str) -> RunRecord | None:
+        """
+        Wait for a run to finish and return its final snapshot. Runs executed by other
+        processes are noticed by polling the backend.
+        """
+        record = await self.get(run_id)
+        while record is not None and not record.state.finished:
+            finished = self._finished.setdefault(run_id, asyncio.Event())
+            try:
+                await asyncio.wait_for(finished.wait(), timeout=self.poll_interval)
+            except TimeoutError:
+                pass
+            record = await self.get(run_id)
+
+        self._finished.pop(run_id, None)
+        return record
+
+    async def depth(self) -> int:
+        """Number of runs waiting for a worker."""
+        return await self._call(self.backend.depth)
+
+    async def running(self) -> int:
+        return await self._call(self.backend.running)
+
+    async def drain_rate(self, window_seconds: float = 900) -> float:
+        """Runs finished per second over the last `window_seconds`, across all workers."""
+        return await self._call(self.backend.finished_since, window_seconds) / window_seconds
+
+    async def worker_resources(self) -> list[tuple[str, int, float | None]]:
+        """(worker id, free disk bytes, memory percent) of every live worker."""
+        return await self._call(self.backend.worker_resources, self.lease_seconds)
+
+    async def _report_resources(self) -> None:
+        while True:
+            try:
+                free_disk = await asyncio.to_thread(free_disk_bytes, self.workspace_dir)
+                memory = await asyncio.to_thread(memory_usage_percent)
+                await self._call(self.backend.report_resources, self.worker_id, free_disk, memory)
+            except Exception as e:
+                logger.warning(f"Failed to report worker resources: {e}")
+            await asyncio.sleep(self.lease_seconds / 3)
+
+    async def _prune(self) -> None:
+        while True:
+            try:
+                pruned = await self._call(self.backend.prune, self.retention_seconds)
+                logger.debug(f"Pruned {pruned} finished run(s) from the queue")
+            except Exception as e:
+                logger.warning(f"Failed to prune finished runs: {e}")
+            await asyncio.sleep(3600)
+
+    def _publish(self, run_id: str, state: RunState, **data: Any) -> None:
+        if self.events is not None:
+            self.events.publish(run_id, state.value, **data)
+
+    async def _worker(self) -> None:
+        while True:
+            record = await self._call(self.backend.claim, self.worker_id, self.lease_seconds)
+            if record is not None:
+                await self._execute(record)
+                continue
+
+            for recovered in await self._call(self.backend.recover, self.max_attempts):
+                logger.warning(f"Run {recovered.run_id} lost its worker; now {recovered.state}")
+                self._publish(recovered.run_id, recovered.state, error=recovered.error)
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except TimeoutError:
+                pass
+
+    async def _supervise(self, record: RunRecord) -> None:
+        """Renew the run's lease and watch for cancellation requested elsewhere."""
+        renewed = asyncio.get_running_loop().time()
+        while True:
+            await asyncio.sleep(self.poll_interval)
+
+            if await self._call(self.backend.cancel_requested, record.run_id):
+                self._cancel_execution(record.run_id)
+
+            now = asyncio.get_running_loop().time()
+            if now - renewed >= self.lease_seconds / 3:
+                renewed = now
+                renewed_lease = await self._call(
+                    self.backend.heartbeat, record, self.worker_id, self.lease_seconds
+                )
+                if not renewed_lease:
+                    logger.warning(f"Run {record.run_id}: lease lost to another worker")
+
+    async def _execute(self, record: RunRecord) -> None:
+        run_id = record.run_id
+        logger.info(f"Run {run_id} started on {self.worker_id}")
+        self._publish(run_id, RunState.RUNNING, worker_id=self.worker_id)
+
+        # The task (and the threads it starts) inherit the scope, which lets
+        # run_safe_subprocess register the run's processes for cancellation
+        scope = CancelScope(run_id)
+        token = current_scope.set(scope)
+        try:
+            task = asyncio.create_task(self.runner(record), name=f"marcai-run-{run_id}")
+        finally:
+            current_scope.reset(token)
+        self._executing[run_id] = (scope, task)
+
+        supervisor = asyncio.create_task(self._supervise(record))
+        error = None
+        try:
+            await task
+        except (asyncio.CancelledError, RunCancelled):
+            if scope.interrupted or not scope.cancelled:
+                # Worker shutting down: hand the run to the next worker instead of losing it
+                await self._call(self.backend.release, record, self.worker_id)
+                logger.info(f"Run {run_id} interrupted and requeued")
+                self._publish(run_id, RunState.QUEUED)
+                raise
+        except Exception as e:
+            error = str(e)
+        finally:
+            supervisor.cancel()
+            del self._executing[run_id]
+
+        cancelled = scope.cancelled and not scope.interrupted
+        finished = await self._call(
+            self.backend.finish, record, self.worker_id, error, cancelled=cancelled
+        )
+        if not finished:
+            logger.warning(f"Run {run_id} finished after its lease was taken over")
+            return
+
+        if cancelled:
+            logger.info(f"Run {run_id} cancelled")
+            self._publish(run_id, RunState.CANCELLED)
+        elif error is not None:
+            logger.error(f"Run {run_id} failed: {error}")
+            self._publish(run_id, RunState.FAILED, error=error)
+        else:
+            logger.info(f"Run {run_id} completed")
+            self._publish(run_id, RunState.COMPLETED)
+
+        self._notify_finished(run_id)
+
+        current = asyncio.current_task()
+        if current is not None and current.cancelling():
+            raise asyncio.CancelledError  # the worker itself is being stopped
@@ -0,0 +1,259 @@
+import asyncio
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlsplit, urlunsplit
+
+from app.core.logger import logger
+from app.utils.sparse_checkout import prepare_checkout, size_filter
+from app.utils.subprocess_runner import run_async_subprocess
+
+GIT_ENV = {**os.environ, "GIT_TERMINAL_PROMPT": "0"}
+
+
+def partial_clone_config(blob_filter: str) -> dict[str, str]:
+    """Settings of a partial clone whose origin left out the blobs `blob_filter` matches."""
+    return {
+        "remote.origin.promisor": "true",
+        "remote.origin.partialclonefilter": blob_filter,
+        "extensions.partialClone": "origin",
+    }
+
+
+def normalize_repo_url(repo_url: str) -> str:
+    """
+    Normalize a repository URL so that equivalent spellings share one cache entry:
+    lower-case scheme and host, no credentials, no trailing slash or `.git` suffix.
+    """
+    url = repo_url.strip().rstrip("/")
+    if url.endswith(".git"):
+        url = url[: -len(".git")]
+
+    parts = urlsplit(url)
+    if not parts.scheme or not parts.netloc:
+        return url
+
+    host = parts.hostname or ""
+    if parts.port:
+        host = f"{host}:{parts.port}"
+    return urlunsplit((parts.scheme.lower(), host.lower(), parts.path, "", ""))
+
+
+class MirrorCacheError(Exception):
+    pass
+
+
+class MirrorCache:
+    """
+    Cache of bare repository mirrors keyed by normalized repo URL.
+
+    Each checkout fetches only the requested ref into the mirror (so repeat runs pay for
+    the delta only) and then makes a local clone into the run workspace, which hardlinks
+    the object files instead of copying them. With `max_file_bytes`, mirrors are partial
+    clones that leave out the blobs of larger files: workspaces leave those files out of
+    the checkout, and would fetch anything else they lack from the mirror, never from
+    upstream. Mirrors are evicted least-recently-used first once the cache exceeds its
+    disk budget.
+    """
+
+    def __init__(
+        self,
+        root: str | Path,
+        max_bytes: int,
+        fetch_timeout: int = 300,
+        max_file_bytes: int | None = None,
+    ):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.fetch_timeout = fetch_timeout
+        self.blob_filter = size_filter(max_file_bytes) if max_file_bytes is not None else None
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    def _key(self, repo_url: str) -> str:
+        return hashlib.sha256(normalize_repo_url(repo_url).encode()).hexdigest()[:32]
+
+    def _mirror_dir(self, key: str) -> Path:
+        return self.root / f"{key}.git"
+
+    def _meta_path(self, key: str) -> Path:
+        return self.root / f"{key}.json"
+
+    @asynccontextmanager
+    async def _lock(self, key: str, wait: bool = True) -> AsyncIterator[bool]:
+        """
+        Serialize access to one mirror: an asyncio lock within this process and an
+        flock across processes (uvicorn workers share the cache directory).
+        Yields False when `wait` is False and the mirror is busy.
+        """
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        if not wait and lock.locked():
+            yield False
+            return
+
+        async with lock:
+            self.root.mkdir(parents=True, exist_ok=True)
+            with open(self.root / f"{key}.lock", "w") as lock_file:
+                while True:
+                    try:
+                        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except BlockingIOError:
+                        if not wait:
+                            yield False
+                            return
+                        await asyncio.sleep(0.2)
+                try:
+                    yield True
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    async def _git(self, *args: str, timeout: int = 60) -> str:
+        result = await run_async_subprocess(["git", *args], timeout=timeout, env=GIT_ENV)
+        if result["returncode"] != 0:
+            raise MirrorCacheError(result["stderr"].strip() or f"git {args[0]} failed")
+        return result["stdout"].strip()
+
+    async def _ensure_mirror(self, key: str, repo_url: str) -> Path:
+        mirror = self._mirror_dir(key)
+        if (mirror / "HEAD").exists():
+            configured = await run_async_subprocess(
+                ["git", "-C", str(mirror), "config", "remote.origin.partialclonefilter"],
+                env=GIT_ENV,
+            )
+            blob_filter = configured["stdout"].strip() if configured["returncode"] == 0 else None
+            if blob_filter == self.blob_filter:
+                return mirror
+            # Fetches never backfill blobs an earlier filter left out
+            logger.info(f"Replacing mirror of {repo_url} filtered with {blob_filter}")
+
+        shutil.rmtree(mirror, ignore_errors=True)
+        await self._git("init", "--bare", "--quiet", str(mirror))
+        await self._git("-C", str(mirror), "remote", "add", "origin", repo_url)
+        # Eviction replaces garbage collection; avoid gc pauses in the middle of a fetch
+        await self._git("-C", str(mirror), "config", "gc.auto", "0")
+        if self.blob_filter is not None:
+            for name, value in partial_clone_config(self.blob_filter).items():
+                await self._git("-C", str(mirror), "config", name, value)
+        return mirror
+
+    async def _fetch(self, mirror: Path, ref: str) -> str:
+        """
+        Fetch a single ref into the mirror and return the commit SHA it resolves to.
+        The ref is stored under refs/marcai/ so later fetches can negotiate a delta.
+        """
+        source = ref or "HEAD"
+        local_ref = f"refs/marcai/{hashlib.sha1(source.encode()).hexdigest()}"
+        await self._git(
+            "-C",
+            str(mirror),
+            "fetch",
+            "--quiet",
+            "--force",
+            "--no-tags",
+            *([f"--filter={self.blob_filter}"] if self.blob_filter is not None else []),
+            "origin",
+            f"+{source}:{local_ref}",
+            timeout=self.fetch_timeout,
+        )
+        return await self._git("-C", str(mirror), "rev-parse", f"{local_ref}^{{commit}}")
+
+    def _mirror_size(self, mirror: Path) -> int:
+        total = 0
+        for root, _, files in os.walk(mirror):
+            for name in files:
+                try:
+                    total += os.lstat(os.path.join(root, name)).st_size
+                except OSError:
+                    continue
+        return total
+
+    def _write_meta(self, key: str, repo_url: str, mirror: Path) -> None:
+        meta = {
+            "repo_url": normalize_repo_url(repo_url),
+            "size": self._mirror_size(mirror),
+            "last_used": time.time(),
+        }
+        self._meta_path(key).write_text(json.dumps(meta))
+
+    def _read_meta(self) -> dict[str, dict[str, Any]]:
+        entries = {}
+        for meta_path in self.root.glob("*.json"):
+            try:
+                entries[meta_path.stem] = json.loads(meta_path.read_text())
+            except (OSError, ValueError):
+                continue
+        return entries
+
+    async def checkout(
+        self, repo_url: str, ref: str, dest: str | Path, sparse: bool = False
+    ) -> str:
+        """
+        Populate `dest` (an empty directory) with `ref` of `repo_url` and return the
+        checked-out commit SHA. With `sparse`, only analyzable files are written out.
+        """
+        key = self._key(repo_url)
+
+        async with self._lock(key):
+            mirror = await self._ensure_mirror(key, repo_url)
+            try:
+                sha = await self._fetch(mirror, ref)
+            except MirrorCacheError:
+                # A mirror that cannot fetch may be corrupt; drop it so the next run starts over
+                shutil.rmtree(mirror, ignore_errors=True)
+                self._meta_path(key).unlink(missing_ok=True)
+                raise
+
+            # The workspace's origin, and promisor, is the mirror
+            partial = (
+                [
+                    f"--config={name}={value}"
+                    for name, value in partial_clone_config(self.blob_filter).items()
+                ]
+                if self.blob_filter is not None
+                else []
+            )
+            await self._git(
+                "clone", "--quiet", "--local", "--no-checkout", *partial, str(mirror), str(dest)
+            )
+            oversized = await prepare_checkout(
+                self._git, dest, sha, sparse, size_filtered=self.blob_filter is not None
+            )
+            if oversized:
+                logger.info(f"Left {oversized} file(s) over the size limit out of the checkout")
+            await self._git(
+                "-C", str(dest), "-c", "advice.detachedHead=false", "checkout", "--detach", sha
+            )
+            await asyncio.to_thread(self._write_meta, key, repo_url, mirror)
+
+        logger.info(f"Checked out {repo_url}@{ref or 'HEAD'} ({sha[:12]}) from mirror cache")
+        await self.evict(keep=key)
+        return sha
+
+    async def evict(self, keep: str | None = None) -> None:
+        """Remove least-recently-used mirrors until the cache fits its disk budget."""
+        entries = await asyncio.to_thread(self._read_meta)
+        total = sum(meta.get("size", 0) for meta in entries.values())
+        if total <= self.max_bytes:
+            return
+
+        for key, meta in sorted(entries.items(), key=lambda item: item[1].get("last_used", 0)):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+
+            async with self._lock(key, wait=False) as acquired:
+                if not acquired:
+                    continue  # in use by another run
+                await asyncio.to_thread(shutil.rmtree, self._mirror_dir(key), True)
+                self._meta_path(key).unlink(missing_ok=True)
+
+            total -= meta.get("size", 0)
+            logger.info(f"Evicted mirror for {meta.get('repo_url')} ({meta.get('size', 0)} bytes)")
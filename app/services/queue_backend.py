@@ -0,0 +1,769 @@
+import asyncio
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from collections.abc import Callable
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, TypeVar
+
+from pydantic import TypeAdapter
+
+from app.models.jobs import BatchRecord, RunRecord, RunState
+from app.models.requests import RepoRequest
+from app.utils.sqlite import SQLiteDatabase, chunked, placeholders
+
+T = TypeVar("T")
+
+# Rate-limit buckets the in-memory backend keeps before forgetting the least recent
+MAX_RATE_LIMITED_CLIENTS = 10_000
+
+
+class QueueBackend(ABC):
+    """
+    Storage and hand-off of queued runs between the API (which enqueues) and the workers
+    (which claim and execute). Claims are leased: a worker renews its lease with
+    heartbeats, and runs whose lease expired are handed to another worker.
+    """
+
+    # Whether calls block on I/O; the job queue then makes them from a thread
+    blocking = True
+
+    @abstractmethod
+    def enqueue(self, record: RunRecord, key: str) -> tuple[RunRecord, bool]:
+        """
+        Append a run to the queue. When a run with the same dedup key is already queued
+        or running, its duplicate counter is bumped and it is returned instead.
+        Returns the run and whether it was created.
+        """
+
+    @abstractmethod
+    def in_flight(self, key: str) -> RunRecord | None:
+        """The queued or running run a submission with dedup key `key` would coalesce into."""
+
+    @abstractmethod
+    def get(self, run_id: str) -> RunRecord | None:
+        """Return a snapshot of the run, with its current queue position if still queued."""
+
+    @abstractmethod
+    def get_many(self, run_ids: list[str]) -> dict[str, RunRecord]:
+        """
+        Snapshots of many runs at once, by run id, without queue positions. Unknown run
+        ids are left out.
+        """
+
+    @abstractmethod
+    def claim(self, worker_id: str, lease_seconds: float) -> RunRecord | None:
+        """Mark the oldest queued run as running on `worker_id`, or return None."""
+
+    @abstractmethod
+    def heartbeat(self, record: RunRecord, worker_id: str, lease_seconds: float) -> bool:
+        """Persist the run's progress and renew the lease. False if the lease was lost."""
+
+    @abstractmethod
+    def finish(
+        self,
+        record: RunRecord,
+        worker_id: str,
+        error: str | None = None,
+        cancelled: bool = False,
+    ) -> bool:
+        """
+        Mark a claimed run as completed, failed with `error`, or cancelled.
+        False if the worker no longer holds the run.
+        """
+
+    @abstractmethod
+    def cancel(self, run_id: str) -> RunRecord | None:
+        """
+        Cancel a run. A queued run is cancelled at once; for a running run cancellation
+        is requested and carried out by the worker holding it. Returns the run's
+        snapshot, or None for an unknown run.
+        """
+
+    @abstractmethod
+    def cancel_requested(self, run_id: str) -> bool:
+        """Whether cancellation was requested for a running run."""
+
+    @abstractmethod
+    def release(self, record: RunRecord, worker_id: str) -> None:
+        """Put a claimed run back at the front of the queue, e.g. on worker shutdown."""
+
+    @abstractmethod
+    def recover(self, max_attempts: int) -> list[RunRecord]:
+        """
+        Requeue runs whose lease expired (their worker died), or fail them once they
+        have used up `max_attempts`. Returns the runs that changed.
+        """
+
+    @abstractmethod
+    def prune(self, older_than_seconds: float) -> int:
+        """Forget finished runs last updated more than `older_than_seconds` ago."""
+
+    @abstractmethod
+    def depth(self) -> int:
+        """Number of runs waiting for a worker."""
+
+    @abstractmethod
+    def running(self) -> int:
+        """Number of runs currently claimed by a worker."""
+
+    @abstractmethod
+    def finished_since(self, window_seconds: float) -> int:
+        """Number of runs that finished within the last `window_seconds`."""
+
+    @abstractmethod
+    def take_tokens(self, client: str, cost: float, rate: float, burst: int) -> float:
+        """
+        Take `cost` tokens from the client's bucket, refilled at `rate` tokens/second up
+        to `burst`. Returns 0 on success, otherwise the number of seconds until enough
+        tokens will be available (nothing is taken).
+        """
+
+    @abstractmethod
+    def report_resources(
+        self, worker_id: str, free_disk_bytes: int, memory_percent: float | None
+    ) -> None:
+        """Record the free disk space and memory usage a worker measured on its host."""
+
+    @abstractmethod
+    def worker_resources(self, max_age_seconds: float) -> list[tuple[str, int, float | None]]:
+        """
+        (worker id, free disk bytes, memory percent) of every worker that reported
+        within the last `max_age_seconds`.
+        """
+
+    @abstractmethod
+    def add_batch(
+        self,
+        record: BatchRecord,
+        requests: list[RepoRequest],
+        feeder_id: str,
+        lease_seconds: float,
+    ) -> None:
+        """Store a new batch, fed to the queue by `feeder_id` while it holds the lease."""
+
+    @abstractmethod
+    def get_batch(self, batch_id: str) -> BatchRecord | None:
+        """Return a snapshot of the batch."""
+
+    @abstractmethod
+    def update_batch(self, record: BatchRecord, feeder_id: str, lease_seconds: float) -> bool:
+        """Persist the batch's progress and renew the lease. False if the lease was lost."""
+
+    @abstractmethod
+    def claim_batch(
+        self, feeder_id: str, lease_seconds: float
+    ) -> tuple[BatchRecord, list[RepoRequest]] | None:
+        """
+        Take over an unfinished batch whose feeder stopped renewing its lease (its
+        process died), with the requests to resume it from. None if there is none.
+        """
+
+    @abstractmethod
+    def prune_batches(self, older_than_seconds: float) -> int:
+        """Forget finished batches last updated more than `older_than_seconds` ago."""
+
+
+async def call_backend(
+    backend: QueueBackend, method: Callable[..., T], *args: Any, **kwargs: Any
+) -> T:
+    """Call a method of `backend`, from a thread when the backend blocks on I/O."""
+    if backend.blocking:
+        return await asyncio.to_thread(method, *args, **kwargs)
+    return method(*args, **kwargs)
+
+
+def _take_tokens(
+    tokens: float, updated: float, now: float, cost: float, rate: float, burst: int
+) -> tuple[float, float]:
+    """Refill a bucket up to `now` and take `cost` from it: (tokens left, seconds to wait)."""
+    tokens = min(float(burst), tokens + (now - updated) * rate)
+    if tokens >= cost:
+        return tokens - cost, 0.0
+    return tokens, (cost - tokens) / rate
+
+
+def _mark_finished(record: RunRecord, error: str | None, cancelled: bool = False) -> None:
+    if cancelled:
+        record.state = RunState.CANCELLED
+    else:
+        record.state = RunState.FAILED if error is not None else RunState.COMPLETED
+    record.error = error
+    record.finished_at = datetime.now(UTC)
+
+
+def _mark_claimed(record: RunRecord, worker_id: str) -> None:
+    record.state = RunState.RUNNING
+    record.worker_id = worker_id
+    record.attempts += 1
+    record.started_at = datetime.now(UTC)
+
+
+class InMemoryQueueBackend(QueueBackend):
+    """
+    Queue held in the API process itself. Runs are lost on restart and can only be
+    executed by workers in the same process; leases never expire.
+    """
+
+    blocking = False
+
+    def __init__(self) -> None:
+        self._runs: dict[str, RunRecord] = {}
+        self._pending: deque[str] = deque()
+        self._inflight: dict[str, str] = {}  # dedup key -> run id
+        self._keys: dict[str, str] = {}  # run id -> dedup key, while in flight
+        self._cancel_requested: set[str] = set()
+        self._batches: dict[str, BatchRecord] = {}
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._resources: dict[str, tuple[int, float | None, float]] = {}
+
+    def enqueue(self, record: RunRecord, key: str) -> tuple[RunRecord, bool]:
+        if (existing := self._inflight.get(key)) is not None:
+            self._runs[existing].duplicates += 1
+            return self.get(existing), False  # type: ignore[return-value]
+
+        self._runs[record.run_id] = record
+        self._pending.append(record.run_id)
+        self._inflight[key] = record.run_id
+        self._keys[record.run_id] = key
+        return self.get(record.run_id), True  # type: ignore[return-value]
+
+    def in_flight(self, key: str) -> RunRecord | None:
+        run_id = self._inflight.get(key)
+        return self.get(run_id) if run_id is not None else None
+
+    def get(self, run_id: str) -> RunRecord | None:
+        record = self._runs.get(run_id)
+        if record is None:
+            return None
+
+        position = None
+        if record.state == RunState.QUEUED:
+            position = self._pending.index(run_id) + 1
+
+        return record.model_copy(update={"queue_position": position})
+
+    def get_many(self, run_ids: list[str]) -> dict[str, RunRecord]:
+        return {
+            run_id: record.model_copy()
+            for run_id in run_ids
+            if (record := self._runs.get(run_id)) is not None
+        }
+
+    def claim(self, worker_id: str, lease_seconds: float) -> RunRecord | None:
+        if not self._pending:
+            return None
+
+        # The stored record itself is handed out, so the runner's updates are live
+        record = self._runs[self._pending.popleft()]
+        _mark_claimed(record, worker_id)
+        return record
+
+    def heartbeat(self, record: RunRecord, worker_id: str, lease_seconds: float) -> bool:
+        return True
+
+    def finish(
+        self,
+        record: RunRecord,
+        worker_id: str,
+        error: str | None = None,
+        cancelled: bool = False,
+    ) -> bool:
+        _mark_finished(record, error, cancelled)
+        self._inflight.pop(self._keys.pop(record.run_id), None)
+        self._cancel_requested.discard(record.run_id)
+        return True
+
+    def cancel(self, run_id: str) -> RunRecord | None:
+        record = self._runs.get(run_id)
+        if record is None:
+            return None
+
+        if record.state == RunState.QUEUED:
+            self._pending.remove(run_id)
+            _mark_finished(record, None, cancelled=True)
+            self._inflight.pop(self._keys.pop(run_id), None)
+        elif record.state == RunState.RUNNING:
+            self._cancel_requested.add(run_id)
+        return self.get(run_id)
+
+    def cancel_requested(self, run_id: str) -> bool:
+        return run_id in self._cancel_requested
+
+    def release(self, record: RunRecord, worker_id: str) -> None:
+        record.state = RunState.QUEUED
+        record.worker_id = None
+        self._pending.appendleft(record.run_id)
+
+    def recover(self, max_attempts: int) -> list[RunRecord]:
+        return []
+
+    def prune(self, older_than_seconds: float) -> int:
+        cutoff = datetime.now(UTC).timestamp() - older_than_seconds
+        expired = [
+            run_id
+            for run_id, r in self._runs.items()
+            if r.finished_at is not None and r.finished_at.timestamp() < cutoff
+        ]
+        for run_id in expired:
+            del self._runs[run_id]
+        return len(expired)
+
+    def depth(self) -> int:
+        return len(self._pending)
+
+    def running(self) -> int:
+        return sum(1 for r in self._runs.values() if r.state == RunState.RUNNING)
+
+    def finished_since(self, window_seconds: float) -> int:
+        since = datetime.now(UTC).timestamp() - window_seconds
+        return sum(
+            1
+            for r in self._runs.values()
+            if r.finished_at is not None and r.finished_at.timestamp() >= since
+        )
+
+    def take_tokens(self, client: str, cost: float, rate: float, burst: int) -> float:
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(client, (float(burst), now))
+        tokens, wait = _take_tokens(tokens, updated, now, cost, rate, burst)
+        self._buckets[client] = (tokens, now)
+        # Forget the least recently seen clients; a fresh bucket starts full anyway
+        while len(self._buckets) > MAX_RATE_LIMITED_CLIENTS:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def report_resources(
+        self, worker_id: str, free_disk_bytes: int, memory_percent: float | None
+    ) -> None:
+        self._resources[worker_id] = (free_disk_bytes, memory_percent, time.monotonic())
+
+    def worker_resources(self, max_age_seconds: float) -> list[tuple[str, int, float | None]]:
+        since = time.monotonic() - max_age_seconds
+        return [
+            (worker_id, free_disk, memory)
+            for worker_id, (free_disk, memory, reported) in self._resources.items()
+            if reported >= since
+        ]
+
+    def add_batch(
+        self,
+        record: BatchRecord,
+        requests: list[RepoRequest],
+        feeder_id: str,
+        lease_seconds: float,
+    ) -> None:
+        self._batches[record.batch_id] = record
+
+    def get_batch(self, batch_id: str) -> BatchRecord | None:
+        return self._batches.get(batch_id)
+
+    def update_batch(self, record: BatchRecord, feeder_id: str, lease_seconds: float) -> bool:
+        return True  # the stored record is the feeder's own
+
+    def claim_batch(
+        self, feeder_id: str, lease_seconds: float
+    ) -> tuple[BatchRecord, list[RepoRequest]] | None:
+        return None  # batches die with the process that feeds them
+
+    def prune_batches(self, older_than_seconds: float) -> int:
+        since = datetime.now(UTC).timestamp() - older_than_seconds
+        expired = [
+            batch_id
+            for batch_id, batch in self._batches.items()
+            if batch.finished_at is not None and batch.finished_at.timestamp() < since
+        ]
+        for batch_id in expired:
+            del self._batches[batch_id]
+        return len(expired)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS queued_runs (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL UNIQUE,
+    dedup_key TEXT NOT NULL,
+    state TEXT NOT NULL,
+    worker_id TEXT,
+    lease_expires_at REAL,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_queued_runs_inflight
+    ON queued_runs (dedup_key) WHERE state IN ('queued', 'running');
+CREATE INDEX IF NOT EXISTS idx_queued_runs_state ON queued_runs (state, seq);
+CREATE INDEX IF NOT EXISTS idx_queued_runs_updated ON queued_runs (updated_at);
+CREATE TABLE IF NOT EXISTS batches (
+    batch_id TEXT PRIMARY KEY,
+    finished INTEGER NOT NULL DEFAULT 0,
+    feeder_id TEXT NOT NULL,
+    lease_expires_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    record TEXT NOT NULL,
+    requests TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_batches_unfinished ON batches (finished, lease_expires_at);
+CREATE TABLE IF NOT EXISTS rate_limits (
+    client TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_rate_limits_updated ON rate_limits (updated_at);
+CREATE TABLE IF NOT EXISTS worker_resources (
+    worker_id TEXT PRIMARY KEY,
+    free_disk_bytes INTEGER NOT NULL,
+    memory_percent REAL,
+    updated_at REAL NOT NULL
+);
+"""
+
+_REQUESTS = TypeAdapter(list[RepoRequest])
+
+
+class SQLiteQueueBackend(QueueBackend):
+    """
+    Queue stored in a SQLite file shared by the API and any number of worker processes
+    on the same host. Claims take the database write lock, so each run is handed to
+    exactly one worker; a worker that stops heartbeating loses its runs to the others.
+    """
+
+    def __init__(self, db_path: str | Path):
+        self.db = SQLiteDatabase(db_path, _SCHEMA)
+
+    @staticmethod
+    def _load(row: tuple[str] | None) -> RunRecord | None:
+        return RunRecord.model_validate_json(row[0]) if row is not None else None
+
+    @staticmethod
+    def _write(
+        conn: sqlite3.Connection, record: RunRecord, lease_expires_at: float | None = None
+    ) -> None:
+        conn.execute(
+            # The API may have counted more duplicates since the caller loaded the record
+            "UPDATE queued_runs SET state = ?, worker_id = ?, lease_expires_at = ?, "
+            "updated_at = ?, "
+            "record = json_set(?, '$.duplicates', json_extract(record, '$.duplicates')) "
+            "WHERE run_id = ?",
+            (
+                record.state.value,
+                record.worker_id,
+                lease_expires_at,
+                time.time(),
+                record.model_dump_json(exclude={"queue_position"}),
+                record.run_id,
+            ),
+        )
+
+    def enqueue(self, record: RunRecord, key: str) -> tuple[RunRecord, bool]:
+        with self.db.connect(immediate=True) as conn:
+            existing = self._load(
+                conn.execute(
+                    "SELECT record FROM queued_runs "
+                    "WHERE dedup_key = ? AND state IN ('queued', 'running')",
+                    (key,),
+                ).fetchone()
+            )
+            if existing is not None:
+                existing.duplicates += 1
+                conn.execute(
+                    "UPDATE queued_runs SET record = ? WHERE run_id = ?",
+                    (existing.model_dump_json(exclude={"queue_position"}), existing.run_id),
+                )
+                run_id, created = existing.run_id, False
+            else:
+                conn.execute(
+                    "INSERT INTO queued_runs (run_id, dedup_key, state, updated_at, record) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (record.run_id, key, record.state.value, time.time(), record.model_dump_json()),
+                )
+                run_id, created = record.run_id, True
+
+        return self.get(run_id), created  # type: ignore[return-value]
+
+    def in_flight(self, key: str) -> RunRecord | None:
+        with self.db.connect() as conn:
+            row = conn.execute(
+                "SELECT run_id FROM queued_runs "
+                "WHERE dedup_key = ? AND state IN ('queued', 'running')",
+                (key,),
+            ).fetchone()
+        return self.get(row[0]) if row is not None else None
+
+    def get(self, run_id: str) -> RunRecord | None:
+        with self.db.connect() as conn:
+            row = conn.execute(
+                "SELECT record, state, seq FROM queued_runs WHERE run_id = ?", (run_id,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            position = None
+            if row[1] == RunState.QUEUED.value:
+                position = conn.execute(
+                    "SELECT COUNT(*) FROM queued_runs WHERE state = 'queued' AND seq <= ?",
+                    (row[2],),
+                ).fetchone()[0]
+
+        record = RunRecord.model_validate_json(row[0])
+        return record.model_copy(update={"queue_position": position})
+
+    def get_many(self, run_ids: list[str]) -> dict[str, RunRecord]:
+        records = {}
+        with self.db.connect() as conn:
+            for chunk in chunked(run_ids):
+                rows = conn.execute(
+                    f"SELECT run_id, record FROM queued_runs WHERE run_id IN ({placeholders(chunk)})",
+                    chunk,
+                )
+                records.update(
+                    (run_id, RunRecord.model_validate_json(record)) for run_id, record in rows
+                )
+        return records
+
+    def claim(self, worker_id: str, lease_seconds: float) -> RunRecord | None:
+        with self.db.connect(immediate=True) as conn:
+            record = self._load(
+                conn.execute(
+                    "SELECT record FROM queued_runs WHERE state = 'queued' ORDER BY seq LIMIT 1"
+                ).fetchone()
+            )
+            if record is None:
+                return None
+
+            _mark_claimed(record, worker_id)
+            self._write(conn, record, time.time() + lease_seconds)
+        return record
+
+    def heartbeat(self, record: RunRecord, worker_id: str, lease_seconds: float) -> bool:
+        with self.db.connect(immediate=True) as conn:
+            if not self._holds(conn, record.run_id, worker_id):
+                return False
+            self._write(conn, record, time.time() + lease_seconds)
+        return True
+
+    def finish(
+        self,
+        record: RunRecord,
+        worker_id: str,
+        error: str | None = None,
+        cancelled: bool = False,
+    ) -> bool:
+        with self.db.connect(immediate=True) as conn:
+            if not self._holds(conn, record.run_id, worker_id):
+                return False
+            _mark_finished(record, error, cancelled)
+            self._write(conn, record)
+        return True
+
+    def cancel(self, run_id: str) -> RunRecord | None:
+        with self.db.connect(immediate=True) as conn:
+            record = self._load(
+                conn.execute(
+                    "SELECT record FROM queued_runs WHERE run_id = ?", (run_id,)
+                ).fetchone()
+            )
+            if record is None:
+                return None
+
+            if record.state == RunState.QUEUED:
+                _mark_finished(record, None, cancelled=True)
+                self._write(conn, record)
+            elif record.state == RunState.RUNNING:
+                conn.execute(
+                    "UPDATE queued_runs SET cancel_requested = 1 WHERE run_id = ?", (run_id,)
+                )
+        return self.get(run_id)
+
+    def cancel_requested(self, run_id: str) -> bool:
+        with self.db.connect() as conn:
+            row = conn.execute(
+                "SELECT cancel_requested FROM queued_runs WHERE run_id = ?", (run_id,)
+            ).fetchone()
+        return bool(row and row[0])
+
+    def release(self, record: RunRecord, worker_id: str) -> None:
+        with self.db.connect(immediate=True) as conn:
+            if not self._holds(conn, record.run_id, worker_id):
+                return
+            record.state = RunState.QUEUED
+            record.worker_id = None
+            self._write(conn, record)
+            # Move it ahead of everything still queued
+            first = conn.execute("SELECT MIN(seq) FROM queued_runs").fetchone()[0]
+            conn.execute(
+                "UPDATE queued_runs SET seq = ? WHERE run_id = ?", (first - 1, record.run_id)
+            )
+
+    @staticmethod
+    def _holds(conn: sqlite3.Connection, run_id: str, worker_id: str) -> bool:
+        row = conn.execute(
+            "SELECT 1 FROM queued_runs WHERE run_id = ? AND state = 'running' AND worker_id = ?",
+            (run_id, worker_id),
+        ).fetchone()
+        return row is not None
+
+    def recover(self, max_attempts: int) -> list[RunRecord]:
+        changed = []
+        with self.db.connect(immediate=True) as conn:
+            rows = conn.execute(
+                "SELECT record, cancel_requested FROM queued_runs "
+                "WHERE state = 'running' AND lease_expires_at < ?",
+                (time.time(),),
+            ).fetchall()
+            for row in rows:
+                record = RunRecord.model_validate_json(row[0])
+                if row[1]:
+                    _mark_finished(record, None, cancelled=True)
+                elif record.attempts >= max_attempts:
+                    _mark_finished(record, f"Worker {record.worker_id} stopped responding")
+                else:
+                    record.state = RunState.QUEUED
+                record.worker_id = None
+                self._write(conn, record)
+                changed.append(record)
+        return changed
+
+    def prune(self, older_than_seconds: float) -> int:
+        cutoff = time.time() - older_than_seconds
+        with self.db.connect() as conn:
+            conn.execute("DELETE FROM worker_resources WHERE updated_at < ?", (cutoff,))
+            return conn.execute(
+                "DELETE FROM queued_runs "
+                "WHERE state IN ('completed', 'failed', 'cancelled') AND updated_at < ?",
+                (cutoff,),
+            ).rowcount
+
+    def depth(self) -> int:
+        with self.db.connect() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM queued_runs WHERE state = 'queued'"
+            ).fetchone()[0]
+
+    def running(self) -> int:
+        with self.db.connect() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM queued_runs WHERE state = 'running'"
+            ).fetchone()[0]
+
+    def finished_since(self, window_seconds: float) -> int:
+        with self.db.connect() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM queued_runs "
+                "WHERE state IN ('completed', 'failed', 'cancelled') AND updated_at >= ?",
+                (time.time() - window_seconds,),
+            ).fetchone()[0]
+
+    def take_tokens(self, client: str, cost: float, rate: float, burst: int) -> float:
+        now = time.time()
+        with self.db.connect(immediate=True) as conn:
+            row = conn.execute(
+                "SELECT tokens, updated_at FROM rate_limits WHERE client = ?", (client,)
+            ).fetchone()
+            tokens, updated = row if row is not None else (float(burst), now)
+            tokens, wait = _take_tokens(tokens, updated, now, cost, rate, burst)
+            conn.execute(
+                "INSERT INTO rate_limits (client, tokens, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (client) DO UPDATE "
+                "SET tokens = excluded.tokens, updated_at = excluded.updated_at",
+                (client, tokens, now),
+            )
+            # Buckets idle long enough to be full again are the same as no bucket
+            conn.execute("DELETE FROM rate_limits WHERE updated_at < ?", (now - burst / rate,))
+        return wait
+
+    def report_resources(
+        self, worker_id: str, free_disk_bytes: int, memory_percent: float | None
+    ) -> None:
+        with self.db.connect() as conn:
+            conn.execute(
+                "INSERT INTO worker_resources "
+                "(worker_id, free_disk_bytes, memory_percent, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (worker_id) DO UPDATE SET free_disk_bytes = excluded.free_disk_bytes, "
+                "memory_percent = excluded.memory_percent, updated_at = excluded.updated_at",
+                (worker_id, free_disk_bytes, memory_percent, time.time()),
+            )
+
+    def worker_resources(self, max_age_seconds: float) -> list[tuple[str, int, float | None]]:
+        with self.db.connect() as conn:
+            return conn.execute(
+                "SELECT worker_id, free_disk_bytes, memory_percent FROM worker_resources "
+                "WHERE updated_at >= ?",
+                (time.time() - max_age_seconds,),
+            ).fetchall()
+
+    def add_batch(
+        self,
+        record: BatchRecord,
+        requests: list[RepoRequest],
+        feeder_id: str,
+        lease_seconds: float,
+    ) -> None:
+        now = time.time()
+        with self.db.connect() as conn:
+            conn.execute(
+                "INSERT INTO batches "
+                "(batch_id, feeder_id, lease_expires_at, updated_at, record, requests) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    record.batch_id,
+                    feeder_id,
+                    now + lease_seconds,
+                    now,
+                    record.model_dump_json(),
+                    _REQUESTS.dump_json(requests).decode(),
+                ),
+            )
+
+    def get_batch(self, batch_id: str) -> BatchRecord | None:
+        with self.db.connect() as conn:
+            row = conn.execute(
+                "SELECT record FROM batches WHERE batch_id = ?", (batch_id,)
+            ).fetchone()
+        return BatchRecord.model_validate_json(row[0]) if row is not None else None
+
+    def update_batch(self, record: BatchRecord, feeder_id: str, lease_seconds: float) -> bool:
+        now = time.time()
+        with self.db.connect() as conn:
+            return (
+                conn.execute(
+                    "UPDATE batches SET finished = ?, lease_expires_at = ?, updated_at = ?, "
+                    "record = ? WHERE batch_id = ? AND feeder_id = ?",
+                    (
+                        record.finished_at is not None,
+                        now + lease_seconds,
+                        now,
+                        record.model_dump_json(),
+                        record.batch_id,
+                        feeder_id,
+                    ),
+                ).rowcount
+                == 1
+            )
+
+    def claim_batch(
+        self, feeder_id: str, lease_seconds: float
+    ) -> tuple[BatchRecord, list[RepoRequest]] | None:
+        now = time.time()
+        with self.db.connect(immediate=True) as conn:
+            row = conn.execute(
+                "SELECT batch_id, record, requests FROM batches "
+                "WHERE finished = 0 AND lease_expires_at < ? ORDER BY updated_at LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE batches SET feeder_id = ?, lease_expires_at = ? WHERE batch_id = ?",
+                (feeder_id, now + lease_seconds, row[0]),
+            )
+        return BatchRecord.model_validate_json(row[1]), _REQUESTS.validate_json(row[2])
+
+    def prune_batches(self, older_than_seconds: float) -> int:
+        with self.db.connect() as conn:
+            return conn.execute(
+                "DELETE FROM batches WHERE finished = 1 AND updated_at < ?",
+                (time.time() - older_than_seconds,),
+            ).rowcount
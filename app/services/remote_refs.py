@@ -0,0 +1,110 @@
+import asyncio
+import re
+import time
+
+from app.core.logger import logger
+from app.services.mirror_cache import GIT_ENV, normalize_repo_url
+from app.utils.subprocess_runner import run_async_subprocess
+
+FULL_SHA = re.compile(r"^(?:[0-9a-f]{40}|[0-9a-f]{64})$")
+
+
+class RepositoryNotFoundError(Exception):
+    pass
+
+
+class RefNotFoundError(Exception):
+    pass
+
+
+class RemoteRefResolver:
+    """
+    Resolves branch/tag names to commit SHAs with `git ls-remote`, which doubles as the
+    repository existence check.
+
+    The advertised refs of a repository are cached for `ttl_seconds`, so existence checks
+    and ref resolution cost at most one round-trip per repository per window. Concurrent
+    lookups of the same repository share a single `ls-remote` call.
+    """
+
+    def __init__(self, ttl_seconds: int = 60, timeout: int = 30):
+        self.ttl_seconds = ttl_seconds
+        self.timeout = timeout
+        self._refs: dict[str, tuple[float, dict[str, str] | None]] = {}
+        self._inflight: dict[str, asyncio.Future[dict[str, str] | None]] = {}
+
+    async def _list_refs(self, repo_url: str) -> dict[str, str] | None:
+        """Return the repository's HEAD, branches and tags, or None if it does not exist."""
+        result = await run_async_subprocess(
+            ["git", "ls-remote", repo_url, "HEAD", "refs/heads/*", "refs/tags/*"],
+            timeout=self.timeout,
+            env=GIT_ENV,
+        )
+        if result["returncode"] != 0:
+            logger.info(f"ls-remote failed for {repo_url}: {result['stderr'].strip()}")
+            return None
+
+        refs = {}
+        for line in result["stdout"].splitlines():
+            sha, _, name = line.partition("\t")
+            if name:
+                refs[name] = sha
+        return refs
+
+    async def refs(self, repo_url: str) -> dict[str, str] | None:
+        key = normalize_repo_url(repo_url)
+
+        cached = self._refs.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+
+        if (pending := self._inflight.get(key)) is not None:
+            return await asyncio.shield(pending)
+
+        future: asyncio.Future[dict[str, str] | None] = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            refs = await self._list_refs(repo_url)
+            self._refs[key] = (time.monotonic() + self.ttl_seconds, refs)
+            future.set_result(refs)
+            return refs
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else is waiting
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def exists(self, repo_url: str) -> bool:
+        return await self.refs(repo_url) is not None
+
+    async def resolve(self, repo_url: str, ref: str | None) -> str:
+        """
+        Return the commit SHA `ref` points to (the default branch when empty).
+        Full SHAs are returned as-is; they cannot be checked without fetching.
+        """
+        refs = await self.refs(repo_url)
+        if refs is None:
+            raise RepositoryNotFoundError(f"Repository {repo_url} does not exist")
+
+        if not ref:
+            if "HEAD" not in refs:
+                raise RefNotFoundError(f"Repository {repo_url} has no default branch")
+            return refs["HEAD"]
+
+        if FULL_SHA.match(ref):
+            return ref
+
+        # Peeled tag entries (^{}) point at the commit rather than the tag object
+        candidates = [f"refs/heads/{ref}", f"refs/tags/{ref}^{{}}", f"refs/tags/{ref}"]
+        if ref.startswith("refs/"):
+            candidates = [f"{ref}^{{}}", ref]
+
+        for name in candidates:
+            if name in refs:
+                return refs[name]
+
+        raise RefNotFoundError(f"Ref '{ref}' not found in {repo_url}")
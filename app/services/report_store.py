@@ -0,0 +1,169 @@
+import json
+import sqlite3
+from collections.abc import Iterator
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from app.core.logger import logger
+from app.models.report import ConsolidatedReport
+from app.utils.sqlite import SQLiteDatabase, chunked, placeholders
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    run_id TEXT PRIMARY KEY,
+    repo_url TEXT NOT NULL,
+    ref TEXT,
+    commit_sha TEXT,
+    created_at TEXT NOT NULL,
+    header BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_reports_repo_commit
+    ON reports (repo_url, commit_sha, created_at);
+CREATE INDEX IF NOT EXISTS idx_reports_repo_created ON reports (repo_url, created_at);
+CREATE INDEX IF NOT EXISTS idx_reports_commit ON reports (commit_sha);
+
+CREATE TABLE IF NOT EXISTS agent_findings (
+    run_id TEXT NOT NULL REFERENCES reports (run_id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    agent TEXT NOT NULL,
+    body BLOB NOT NULL,
+    PRIMARY KEY (run_id, position)
+);
+"""
+
+
+class ReportStore:
+    """
+    SQLite-backed store for consolidated reports.
+
+    A report is split into a header row (everything except the findings) and one row per
+    agent finding, so a report can be streamed back chunk by chunk instead of being
+    materialized in memory. Rows are indexed by run id, repo URL and commit SHA.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, db_path: str | Path):
+        self.db = SQLiteDatabase(db_path, _SCHEMA)
+
+    def save(self, report: ConsolidatedReport) -> None:
+        """Persist a report, replacing any previous report stored under the same run id."""
+        header = report.model_dump_json(exclude={"findings"}).encode("utf-8")
+
+        with self.db.connect() as conn:
+            conn.execute("DELETE FROM reports WHERE run_id = ?", (report.run_id,))
+            conn.execute(
+                "INSERT INTO reports (run_id, repo_url, ref, commit_sha, created_at, header) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    report.run_id,
+                    report.repo_url,
+                    report.ref,
+                    report.commit_sha,
+                    datetime.now(UTC).isoformat(),
+                    header,
+                ),
+            )
+            conn.executemany(
+                "INSERT INTO agent_findings (run_id, position, agent, body) VALUES (?, ?, ?, ?)",
+                [
+                    (report.run_id, position, finding.agent, finding.model_dump_json().encode())
+                    for position, finding in enumerate(report.findings)
+                ],
+            )
+
+        logger.info(f"Stored report for run {report.run_id}")
+
+    def exists(self, run_id: str) -> bool:
+        with self.db.connect() as conn:
+            row = conn.execute("SELECT 1 FROM reports WHERE run_id = ?", (run_id,)).fetchone()
+        return row is not None
+
+    def header(self, run_id: str) -> dict[str, Any] | None:
+        """Return the report without its findings, or None for an unknown run id."""
+        with self.db.connect() as conn:
+            row = conn.execute("SELECT header FROM reports WHERE run_id = ?", (run_id,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def headers(self, run_ids: list[str]) -> dict[str, dict[str, Any]]:
+        """`header` of many runs at once, by run id; unknown run ids are left out."""
+        headers = {}
+        with self.db.connect() as conn:
+            for chunk in chunked(run_ids):
+                rows = conn.execute(
+                    f"SELECT run_id, header FROM reports WHERE run_id IN ({placeholders(chunk)})",
+                    chunk,
+                )
+                headers.update((run_id, json.loads(header)) for run_id, header in rows)
+        return headers
+
+    def load(self, run_id: str) -> ConsolidatedReport | None:
+        """Load a full report into memory. Prefer `stream` for serving large reports."""
+        if not self.exists(run_id):
+            return None
+        return ConsolidatedReport.model_validate_json(b"".join(self.stream(run_id)))
+
+    def stream(self, run_id: str) -> Iterator[bytes]:
+        """
+        Yield the report as JSON, reading header and findings with incremental blob I/O.
+        Nothing is yielded for an unknown run id.
+        """
+        with self.db.connect() as conn:
+            header = conn.execute(
+                "SELECT rowid FROM reports WHERE run_id = ?", (run_id,)
+            ).fetchone()
+            if header is None:
+                return
+
+            finding_rows = conn.execute(
+                "SELECT rowid FROM agent_findings WHERE run_id = ? ORDER BY position",
+                (run_id,),
+            ).fetchall()
+
+            # The header is a JSON object without "findings": drop its closing brace
+            # and splice the findings array in behind it.
+            yield from self._read_blob(conn, "reports", "header", header[0], trim=1)
+            yield b',"findings":['
+
+            for index, (rowid,) in enumerate(finding_rows):
+                if index:
+                    yield b","
+                yield from self._read_blob(conn, "agent_findings", "body", rowid)
+
+            yield b"]}"
+
+    def _read_blob(
+        self, conn: sqlite3.Connection, table: str, column: str, rowid: int, trim: int = 0
+    ) -> Iterator[bytes]:
+        with conn.blobopen(table, column, rowid, readonly=True) as blob:
+            remaining = len(blob) - trim
+            while remaining > 0:
+                chunk = blob.read(min(self.CHUNK_SIZE, remaining))
+                remaining -= len(chunk)
+                yield chunk
+
+    def find(
+        self, repo_url: str | None = None, commit_sha: str | None = None, limit: int = 50
+    ) -> list[dict[str, Any]]:
+        """Return report summaries, newest first, filtered by repo URL and/or commit."""
+        clauses, params = [], []
+        if repo_url:
+            clauses.append("repo_url = ?")
+            params.append(repo_url)
+        if commit_sha:
+            clauses.append("commit_sha = ?")
+            params.append(commit_sha)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self.db.connect() as conn:
+            rows = conn.execute(
+                "SELECT run_id, repo_url, ref, commit_sha, created_at FROM reports "
+                f"{where} ORDER BY created_at DESC LIMIT ?",
+                (*params, limit),
+            ).fetchall()
+
+        return [
+            {"run_id": r[0], "repo_url": r[1], "ref": r[2], "commit_sha": r[3], "created_at": r[4]}
+            for r in rows
+        ]
@@ -0,0 +1,92 @@
+import hashlib
+import sqlite3
+import time
+from pathlib import Path
+
+from app.core.logger import logger
+from app.services.mirror_cache import normalize_repo_url
+from app.utils.sqlite import SQLiteDatabase
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS result_cache (
+    cache_key TEXT PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_result_cache_created ON result_cache (created_at);
+CREATE INDEX IF NOT EXISTS idx_result_cache_access ON result_cache (last_access);
+"""
+
+
+def run_cache_key(repo_url: str, commit_sha: str, toolchain: str) -> str:
+    """Key identifying a run's result: same source, same analyzers, same settings."""
+    raw = f"{normalize_repo_url(repo_url)}\0{commit_sha}\0{toolchain}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    Maps a run cache key to the run whose stored report answers it.
+
+    Reports themselves live in the report store; the cache only decides which of them
+    may be reused. Entries expire after `ttl_seconds` (Semgrep registry rule packs are
+    unversioned, so a TTL bounds how stale a reused result can get) and the least
+    recently used entries are dropped beyond `max_entries`.
+    """
+
+    def __init__(self, db_path: str | Path, ttl_seconds: int, max_entries: int):
+        self.db = SQLiteDatabase(db_path, _SCHEMA)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+    def lookup(self, cache_key: str) -> str | None:
+        """Return the run id cached under the key, or None on a miss or expired entry."""
+        now = time.time()
+        with self.db.connect() as conn:
+            row = conn.execute(
+                "SELECT run_id, created_at FROM result_cache WHERE cache_key = ?", (cache_key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            run_id, created_at = row
+            if now - created_at > self.ttl_seconds:
+                conn.execute("DELETE FROM result_cache WHERE cache_key = ?", (cache_key,))
+                return None
+
+            conn.execute(
+                "UPDATE result_cache SET last_access = ? WHERE cache_key = ?", (now, cache_key)
+            )
+        return run_id
+
+    def store(self, cache_key: str, run_id: str) -> None:
+        now = time.time()
+        with self.db.connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO result_cache (cache_key, run_id, created_at, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                (cache_key, run_id, now, now),
+            )
+            self._evict(conn, now)
+
+    def invalidate(self, cache_key: str) -> None:
+        with self.db.connect() as conn:
+            conn.execute("DELETE FROM result_cache WHERE cache_key = ?", (cache_key,))
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        expired = conn.execute(
+            "DELETE FROM result_cache WHERE created_at < ?", (now - self.ttl_seconds,)
+        ).rowcount
+
+        overflow = conn.execute("SELECT COUNT(*) FROM result_cache").fetchone()[0]
+        overflow -= self.max_entries
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM result_cache WHERE cache_key IN ("
+                "SELECT cache_key FROM result_cache ORDER BY last_access LIMIT ?)",
+                (overflow,),
+            )
+
+        if expired or overflow > 0:
+            logger.debug(f"Result cache evicted {expired} expired, {max(overflow, 0)} LRU")
@@ -0,0 +1,143 @@
+import asyncio
+import json
+import threading
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterator
+from datetime import UTC, datetime
+from typing import Any, Protocol
+
+# Events after which a run produces no further progress
+TERMINAL_EVENTS = frozenset({"completed", "failed", "cancelled"})
+
+
+class EventPublisher(Protocol):
+    def publish(self, run_id: str, event: str, **data: Any) -> None: ...
+
+
+class _Subscriber:
+    def __init__(self, run_id: str | None, maxsize: int):
+        self.run_id = run_id
+        self.queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(maxsize=maxsize)
+
+    def push(self, event: dict[str, Any]) -> None:
+        # A stalled client must not grow memory without bound: drop its oldest event
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+
+class RunEventBus:
+    """
+    In-process pub/sub for run progress events.
+
+    Events may be published from any thread (the workflow runs in worker threads) and are
+    delivered on the event loop to Server-Sent Events subscribers. Each run keeps a short
+    history so late subscribers can replay what they missed.
+    """
+
+    def __init__(self, history_size: int = 256, max_tracked_runs: int = 1000):
+        self.history_size = history_size
+        self.max_tracked_runs = max_tracked_runs
+
+        self._history: OrderedDict[str, deque[dict[str, Any]]] = OrderedDict()
+        self._subscribers: set[_Subscriber] = set()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def attach_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Bind the bus to the loop that serves subscribers."""
+        self._loop = loop
+
+    def publish(self, run_id: str, event: str, **data: Any) -> None:
+        """Publish an event for a run. Safe to call from any thread."""
+        payload = {
+            "run_id": run_id,
+            "event": event,
+            "timestamp": datetime.now(UTC).isoformat(),
+            **data,
+        }
+
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            # Subscriber queues may only be touched from the loop that serves them; with
+            # none attached the event is kept for replay from the history only
+            self._record(payload)
+            return
+
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if running is loop:
+            self._dispatch(payload)
+        else:
+            loop.call_soon_threadsafe(self._dispatch, payload)
+
+    def _record(self, payload: dict[str, Any]) -> None:
+        run_id = payload["run_id"]
+
+        with self._lock:
+            # Ids are assigned in delivery order so subscribers can de-duplicate replays
+            self._sequence += 1
+            payload["id"] = self._sequence
+
+            history = self._history.get(run_id)
+            if history is None:
+                history = self._history[run_id] = deque(maxlen=self.history_size)
+                while len(self._history) > self.max_tracked_runs:
+                    self._history.popitem(last=False)
+            history.append(payload)
+
+    def _dispatch(self, payload: dict[str, Any]) -> None:
+        self._record(payload)
+        for subscriber in tuple(self._subscribers):
+            if subscriber.run_id is None or subscriber.run_id == payload["run_id"]:
+                subscriber.push(payload)
+
+    def history(self, run_id: str) -> list[dict[str, Any]]:
+        return list(self._history.get(run_id, ()))
+
+    async def subscribe(
+        self, run_id: str | None = None, keepalive: float = 15.0
+    ) -> AsyncIterator[dict[str, Any] | None]:
+        """
+        Yield events for one run (or every run when `run_id` is None).
+        A per-run subscription replays the run's history first and ends after its terminal
+        event. `None` is yielded whenever `keepalive` seconds pass without an event.
+        """
+        subscriber = _Subscriber(run_id, maxsize=self.history_size * 4)
+        self._subscribers.add(subscriber)
+        try:
+            seen = 0
+            if run_id is not None:
+                replay = self.history(run_id)
+                for event in replay:
+                    yield event
+                    if event["event"] in TERMINAL_EVENTS:
+                        return
+                if replay:
+                    seen = replay[-1]["id"]
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), timeout=keepalive)
+                except TimeoutError:
+                    yield None
+                    continue
+
+                if event["id"] <= seen:
+                    continue  # already replayed from history
+                yield event
+                if run_id is not None and event["event"] in TERMINAL_EVENTS:
+                    return
+        finally:
+            self._subscribers.discard(subscriber)
+
+
+def format_sse(event: dict[str, Any] | None) -> bytes:
+    """Encode an event as a Server-Sent Events frame (a comment frame for keepalives)."""
+    if event is None:
+        return b": keepalive\n\n"
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event)}\n\n".encode()
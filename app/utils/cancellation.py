@@ -0,0 +1,111 @@
+import asyncio
+import os
+import signal
+import subprocess
+import threading
+from collections.abc import Callable
+from contextvars import ContextVar
+from typing import Any, TypeVar
+
+from app.core.logger import logger
+
+T = TypeVar("T")
+
+
+class RunCancelled(BaseException):
+    """
+    Raised inside a cancelled run to unwind it. Like asyncio.CancelledError it is not an
+    Exception, so the agents' broad error handling does not swallow it.
+    """
+
+
+class CancelScope:
+    """
+    Cancellation state of one run, shared by the threads executing it: a flag checked
+    between workflow nodes and the subprocesses to kill when the run is cancelled.
+    """
+
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+        self._cancelled = threading.Event()
+        self.interrupted = False  # cancelled to be requeued, not to end the run
+        self._processes: set[subprocess.Popen] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self) -> None:
+        """Mark the run cancelled and kill the process groups of its subprocesses."""
+        with self._lock:
+            self._cancelled.set()
+            processes = tuple(self._processes)
+
+        for process in processes:
+            kill_process_group(process.pid)
+        if processes:
+            logger.info(f"Run {self.run_id}: killed {len(processes)} subprocess(es)")
+
+    def interrupt(self) -> None:
+        """Unwind the run like `cancel`, so that it can be put back in the queue."""
+        self.interrupted = True
+        self.cancel()
+
+    def check(self) -> None:
+        if self.cancelled:
+            raise RunCancelled(self.run_id)
+
+    def register(self, process: subprocess.Popen) -> None:
+        with self._lock:
+            self._processes.add(process)
+            cancelled = self.cancelled
+        if cancelled:
+            # Cancelled between the check and the spawn
+            kill_process_group(process.pid)
+
+    def unregister(self, process: subprocess.Popen) -> None:
+        with self._lock:
+            self._processes.discard(process)
+
+
+current_scope: ContextVar[CancelScope | None] = ContextVar("current_scope", default=None)
+
+
+def check_cancelled() -> None:
+    """Raise `RunCancelled` if the run executing in this context was cancelled."""
+    scope = current_scope.get()
+    if scope is not None:
+        scope.check()
+
+
+async def run_in_thread(func: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+    """
+    `asyncio.to_thread` that does not abandon the thread when the awaiting task is
+    cancelled: a thread cannot be stopped, so the cancellation only propagates once the
+    thread has returned. Cancel the run's scope as well, so that it unwinds promptly;
+    until then it may still be using the workspace and its tool slots.
+    """
+    future = asyncio.ensure_future(asyncio.to_thread(func, *args, **kwargs))
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        while not future.done():
+            try:
+                await asyncio.wait({future})
+            except asyncio.CancelledError:
+                pass
+        if not future.cancelled():
+            future.exception()  # Retrieved; the cancellation is what propagates
+        raise
+
+
+def kill_process_group(pid: int) -> None:
+    """
+    SIGKILL a process and everything it spawned. The process must have been started
+    with `start_new_session=True`, so its group contains only its own descendants.
+    """
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
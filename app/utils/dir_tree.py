@@ -0,0 +1,239 @@
+import os
+import threading
+import zlib
+from array import array
+from bisect import bisect_left
+from collections.abc import Collection, ItemsView, Iterator, Mapping
+from typing import NamedTuple
+
+ROOT = -1  # Parent index of the entries at the top of the tree
+
+_DIRECTORY = 0
+_FILE = 1
+_TYPES = ("directory", "file")
+
+# Blob ids are stored as raw SHA-1 digests; zeros (git's null id) stand for "none"
+_SHA_BYTES = 20
+_NO_SHA = bytes(_SHA_BYTES)
+
+
+class DirEntry(NamedTuple):
+    name: str
+    path: str  # Absolute, like every other path in the auditor's metadata
+    type: str  # "file" or "directory"
+    size: int | None = None  # Files only
+    sha: str | None = None  # Git blob id, when the entry comes from the index
+
+
+class DirTree:
+    """
+    The auditor's directory tree, one entry per file and directory, stored column by
+    column instead of as a dict per entry: each entry costs a parent index, the position
+    of its name, a size, a type byte and a 20-byte blob id in flat arrays. Names are kept
+    UTF-8 encoded in a single buffer, with directory names interned; paths are rebuilt
+    from the parent chain when entries are read, and looked up through a sorted array of
+    path checksums.
+
+    Entries are appended in walk order: a directory before anything inside it.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._prefix = os.path.join(root, "")
+        self._name_data = bytearray()
+        self._directory_names: dict[str, tuple[int, int]] = {}
+        self._parent = array("i")
+        self._name_start = array("I")
+        self._name_length = array("H")
+        self._size = array("q")
+        self._type = array("B")
+        self._sha = bytearray()
+        # Built on the first lookup; agents and their shard threads look paths up
+        # concurrently, so one thread builds it and publishes it whole
+        self._path_index: _PathIndex | None = None
+        self._path_index_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._type)
+
+    def _store_name(self, name: str) -> tuple[int, int]:
+        encoded = name.encode("utf-8", "surrogateescape")
+        start = len(self._name_data)
+        self._name_data += encoded
+        return start, len(encoded)
+
+    def _append(self, parent: int, name: str, kind: int, size: int, sha: str | None) -> int:
+        index = len(self._type)
+        if kind == _DIRECTORY:
+            stored = self._directory_names.get(name)
+            if stored is None:
+                stored = self._directory_names[name] = self._store_name(name)
+        else:
+            stored = self._store_name(name)
+        self._parent.append(parent)
+        self._name_start.append(stored[0])
+        self._name_length.append(stored[1])
+        self._size.append(size)
+        self._type.append(kind)
+        # Ids of SHA-256 repositories do not fit the column; their files are not cached
+        self._sha += bytes.fromhex(sha) if sha and len(sha) == 2 * _SHA_BYTES else _NO_SHA
+        self._path_index = None
+        return index
+
+    def add_directory(self, parent: int, name: str) -> int:
+        """Append directory `name` under the entry `parent` (or ROOT); returns its index."""
+        return self._append(parent, name, _DIRECTORY, -1, None)
+
+    def add_file(self, parent: int, name: str, size: int, sha: str | None = None) -> int:
+        """Append file `name` under the entry `parent` (or ROOT); returns its index."""
+        return self._append(parent, name, _FILE, size, sha)
+
+    def _name(self, index: int) -> str:
+        start = self._name_start[index]
+        data = self._name_data[start : start + self._name_length[index]]
+        return data.decode("utf-8", "surrogateescape")
+
+    def relative_path(self, index: int) -> str:
+        parts = []
+        while index != ROOT:
+            parts.append(self._name(index))
+            index = self._parent[index]
+        return "/".join(reversed(parts))
+
+    def sha(self, index: int) -> str | None:
+        """Blob id of the entry `index`, if it has one."""
+        digest = self._sha[index * _SHA_BYTES : (index + 1) * _SHA_BYTES]
+        return None if digest == _NO_SHA else digest.hex()
+
+    def _relative_paths(
+        self, directories: dict[int, str] | None = None
+    ) -> Iterator[tuple[int, str]]:
+        # Directories precede their contents, so each parent's path is known by then
+        if directories is None:
+            directories = {}
+        for index in range(len(self._type)):
+            parent = self._parent[index]
+            name = self._name(index)
+            relative = f"{directories[parent]}/{name}" if parent != ROOT else name
+            if self._type[index] == _DIRECTORY:
+                directories[index] = relative
+            yield index, relative
+
+    def file_paths(self, suffixes: Collection[str] | None = None) -> list[str]:
+        """Relative paths of the files, in tree order; only those ending in `suffixes`."""
+        return [
+            relative
+            for index, relative in self._relative_paths()
+            if self._type[index] == _FILE
+            and (suffixes is None or os.path.splitext(relative)[1] in suffixes)
+        ]
+
+    def file_shas(self) -> Iterator[tuple[str, str]]:
+        """(relative path, blob id) of the files that have one, in tree order."""
+        for index, relative in self._relative_paths():
+            if self._type[index] == _FILE and (sha := self.sha(index)) is not None:
+                yield relative, sha
+
+    @property
+    def blob_shas(self) -> "BlobShas":
+        return BlobShas(self)
+
+    def _entry(self, index: int, name: str, relative: str) -> DirEntry:
+        kind = self._type[index]
+        return DirEntry(
+            name=name,
+            path=self._prefix + relative,
+            type=_TYPES[kind],
+            size=self._size[index] if kind == _FILE else None,
+            sha=self.sha(index),
+        )
+
+    def __getitem__(self, index: int) -> DirEntry:
+        return self._entry(index, self._name(index), self.relative_path(index))
+
+    def __iter__(self) -> Iterator[DirEntry]:
+        for index, relative in self._relative_paths():
+            yield self._entry(index, relative.rpartition("/")[2], relative)
+
+    def index(self, relative: str) -> int:
+        """Index of the entry at `relative` ("/"-separated, from the root), or ROOT."""
+        path_index = self._path_index
+        if path_index is None:
+            path_index = self._build_path_index()
+        crcs, entries, directory_paths = path_index
+        crc = _crc(relative)
+        position = bisect_left(crcs, crc)
+        # Checksums can collide, so each candidate's path is compared
+        directory, _, name = relative.rpartition("/")
+        while position < len(crcs) and crcs[position] == crc:
+            index = entries[position]
+            parent = self._parent[index]
+            if self._name(index) == name and (
+                directory_paths[parent] == directory if parent != ROOT else not directory
+            ):
+                return index
+            position += 1
+        return ROOT
+
+    def _build_path_index(self) -> "_PathIndex":
+        with self._path_index_lock:
+            if self._path_index is None:
+                directory_paths: dict[int, str] = {}
+                pairs = sorted(
+                    (_crc(relative), index)
+                    for index, relative in self._relative_paths(directory_paths)
+                )
+                self._path_index = _PathIndex(
+                    array("I", (crc for crc, _ in pairs)),
+                    array("i", (index for _, index in pairs)),
+                    directory_paths,
+                )
+            return self._path_index
+
+    def find(self, relative: str) -> DirEntry | None:
+        """The entry at `relative`, or None."""
+        index = self.index(relative)
+        if index == ROOT:
+            return None
+        return self._entry(index, relative.rpartition("/")[2], relative)
+
+
+class _PathIndex(NamedTuple):
+    # CRC-32 of every entry's relative path, sorted, and the entry each belongs to
+    crcs: array
+    entries: array
+    # Relative path of each directory
+    directory_paths: dict[int, str]
+
+
+def _crc(relative: str) -> int:
+    return zlib.crc32(relative.encode("utf-8", "surrogateescape"))
+
+
+class BlobShas(Mapping[str, str]):
+    """Read-only {relative path: blob id} view of the files of a DirTree that have one."""
+
+    def __init__(self, tree: DirTree):
+        self.tree = tree
+
+    def __getitem__(self, relative: str) -> str:
+        index = self.tree.index(relative)
+        sha = self.tree.sha(index) if index != ROOT else None
+        if sha is None:
+            raise KeyError(relative)
+        return sha
+
+    def __iter__(self) -> Iterator[str]:
+        return (relative for relative, _ in self.tree.file_shas())
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.tree.file_shas())
+
+    def items(self) -> ItemsView[str, str]:
+        return _BlobShaItems(self)
+
+
+class _BlobShaItems(ItemsView[str, str]):
+    # One pass over the tree instead of a lookup per path
+    def __iter__(self) -> Iterator[tuple[str, str]]:
+        return self._mapping.tree.file_shas()
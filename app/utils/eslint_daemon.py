@@ -0,0 +1,327 @@
+import atexit
+import itertools
+import json
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.utils.cancellation import check_cancelled, kill_process_group
+from app.utils.tool_limits import ToolUsage, limited_command, limits_for, record_usage
+from app.utils.tool_scheduler import CANCEL_POLL_SECONDS, get_tool_scheduler
+
+WORKER_SCRIPT = Path(__file__).with_name("eslint_worker.js")
+
+# Replies to health checks must come back within this long
+PING_TIMEOUT_SECONDS = 10
+
+
+class EslintDaemonError(Exception):
+    """A worker died, stopped answering or could not be started."""
+
+
+class EslintWorker:
+    """
+    One `node eslint_worker.js` process with ESLint kept loaded: requests are written to
+    its stdin, replies read from its stdout by a thread. Its V8 heap is capped at the
+    daemon's RSS cap, so runaway growth crashes the worker rather than the host, and it
+    runs under the limits of an eslint process (see TOOL_LIMITS).
+    """
+
+    def __init__(self, toolchain: Path, max_rss_bytes: int):
+        heap_mib = max(64, max_rss_bytes // 1024**2)
+        command = ["node", f"--max-old-space-size={heap_mib}", str(WORKER_SCRIPT)]
+        self.process = subprocess.Popen(
+            limited_command(command, limits_for(["eslint"])),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env={**os.environ, "NODE_PATH": str(toolchain / "node_modules")},
+            start_new_session=True,
+        )
+        self.requests = 0
+        self.rss = 0
+        self.cpu_seconds = 0.0
+        self.last_used = time.monotonic()
+        self._ids = itertools.count(1)
+        self._replies: queue.Queue[dict[str, Any] | None] = queue.Queue()
+        self._stderr: deque[str] = deque(maxlen=20)
+        threading.Thread(target=self._read_replies, daemon=True).start()
+        threading.Thread(target=self._read_stderr, daemon=True).start()
+
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def _read_replies(self) -> None:
+        for line in self.process.stdout:
+            try:
+                self._replies.put(json.loads(line))
+            except ValueError:
+                logger.warning(f"ESLint worker {self.process.pid}: unexpected output {line!r}")
+        self._replies.put(None)  # Exited
+
+    def _read_stderr(self) -> None:
+        for line in self.process.stderr:
+            self._stderr.append(line.decode("utf-8", "replace").rstrip())
+
+    def request(self, payload: dict[str, Any], timeout: float) -> dict[str, Any]:
+        """
+        Send one request and wait for its reply.
+
+        Raises:
+            EslintDaemonError: the worker exited or did not reply within `timeout`
+            RunCancelled: the run was cancelled while waiting
+        """
+        request_id = next(self._ids)
+        try:
+            self.process.stdin.write(json.dumps({"id": request_id, **payload}).encode() + b"\n")
+            self.process.stdin.flush()
+        except OSError as e:
+            raise EslintDaemonError(f"worker {self.process.pid} is gone: {e}") from e
+
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise EslintDaemonError(f"worker {self.process.pid}: no reply in {timeout}s")
+            try:
+                reply = self._replies.get(timeout=min(remaining, CANCEL_POLL_SECONDS))
+            except queue.Empty:
+                check_cancelled()
+                continue
+            if reply is None:
+                self._replies.put(None)
+                stderr = "\n".join(self._stderr)
+                raise EslintDaemonError(f"worker {self.process.pid} exited: {stderr}")
+            if reply.get("id") == request_id:
+                break
+
+        self.requests += 1
+        self.rss = reply.get("rss", 0)
+        self.cpu_seconds += reply.get("user_cpu_seconds", 0) + reply.get("system_cpu_seconds", 0)
+        self.last_used = time.monotonic()
+        return reply
+
+    def stop(self, kill: bool = False) -> None:
+        """Ask the worker to exit (closing its stdin), or kill it if it does not or `kill`."""
+        if not kill:
+            try:
+                self.process.stdin.close()
+                self.process.wait(timeout=5)
+                return
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+        kill_process_group(self.process.pid)
+        self.process.wait()
+
+
+class EslintDaemon:
+    """
+    Pool of long-lived ESLint workers shared by every run in the process, sparing each
+    batch of files the Node startup and the loading of ESLint, the parser and the plugin.
+    Workers only ever load the toolchain's fallback config: a repository's own config is
+    code from the repository, which must not run in a process later runs share, so such
+    repositories are linted by a throwaway eslint process instead.
+
+    Workers are started on demand, up to `max_workers`, and each lints one batch at a
+    time. A worker is replaced when it dies, fails a health check (a ping, sent when it
+    has been idle for `health_check_seconds`), misses the request timeout, belongs to a
+    cancelled run, has grown past `max_rss_bytes`, or has used half of its CPU time limit
+    (so that a batch is not killed by a limit earlier batches used up).
+    """
+
+    def __init__(
+        self,
+        toolchain: Path,
+        max_workers: int,
+        max_rss_bytes: int,
+        request_timeout: float,
+        health_check_seconds: float,
+    ):
+        self.toolchain = toolchain
+        self.max_workers = max(1, max_workers)
+        self.max_rss_bytes = max_rss_bytes
+        self.request_timeout = request_timeout
+        self.health_check_seconds = health_check_seconds
+        self._idle: list[EslintWorker] = []
+        self._workers = 0
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def _healthy(self, worker: EslintWorker) -> bool:
+        if not worker.alive:
+            return False
+        if time.monotonic() - worker.last_used < self.health_check_seconds:
+            return True
+        try:
+            return worker.request({"ping": True}, PING_TIMEOUT_SECONDS)["ok"]
+        except EslintDaemonError:
+            return False
+
+    def _acquire(self) -> EslintWorker:
+        while True:
+            with self._cond:
+                while not self._idle and self._workers >= self.max_workers:
+                    if self._closed:
+                        raise EslintDaemonError("daemon is shut down")
+                    self._cond.wait(timeout=CANCEL_POLL_SECONDS)
+                    check_cancelled()
+                if self._closed:
+                    raise EslintDaemonError("daemon is shut down")
+                worker = self._idle.pop() if self._idle else None
+                if worker is None:
+                    self._workers += 1
+
+            if worker is None:
+                try:
+                    worker = EslintWorker(self.toolchain, self.max_rss_bytes)
+                except OSError as e:
+                    self._discard(None)
+                    raise EslintDaemonError(f"cannot start a worker: {e}") from e
+                logger.info(f"Started ESLint worker {worker.process.pid}")
+                return worker
+            try:
+                healthy = self._healthy(worker)
+            except BaseException:
+                self._discard(worker, kill=True)
+                raise
+            if healthy:
+                return worker
+            logger.warning(f"ESLint worker {worker.process.pid} failed its health check")
+            self._discard(worker, kill=True)
+
+    def _release(self, worker: EslintWorker) -> None:
+        cpu_limit = limits_for(["eslint"]).cpu_seconds
+        if worker.rss > self.max_rss_bytes or (
+            cpu_limit is not None and worker.cpu_seconds > cpu_limit / 2
+        ):
+            logger.info(
+                f"Restarting ESLint worker {worker.process.pid}: "
+                f"{worker.rss // 1024**2} MiB RSS, {worker.cpu_seconds:.0f}s CPU "
+                f"after {worker.requests} batch(es)"
+            )
+            self._discard(worker)
+            return
+        with self._cond:
+            if not self._closed:
+                self._idle.append(worker)
+                self._cond.notify()
+                return
+        self._discard(worker)
+
+    def _discard(self, worker: EslintWorker | None, kill: bool = False) -> None:
+        if worker is not None:
+            worker.stop(kill)
+        with self._cond:
+            self._workers -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def _worker(self) -> Iterator[EslintWorker]:
+        worker = self._acquire()
+        try:
+            yield worker
+        except BaseException:
+            # Mid-request: its reply, if any ever comes, belongs to nobody
+            self._discard(worker, kill=True)
+            raise
+        self._release(worker)
+
+    def _request(self, payload: dict[str, Any]) -> dict[str, Any]:
+        """Send `payload` to a worker; a worker that dies on it is replaced once."""
+        for attempt in range(2):
+            try:
+                with self._worker() as worker:
+                    return worker.request(payload, self.request_timeout)
+            except EslintDaemonError as e:
+                if attempt:
+                    raise
+                logger.warning(f"Retrying ESLint batch on a new worker: {e}")
+        raise AssertionError("unreachable")
+
+    @contextmanager
+    def lint(self, cwd: str, files: list[str], config: Path) -> Iterator[dict[str, Any]]:
+        """
+        Lint `files` (relative to `cwd`) with `config`, the toolchain's fallback config.
+        Yields a result shaped like `run_spooled_subprocess`'s: the json-with-metadata
+        report in the "stdout" temporary file, ESLint's error (if any) as "stderr".
+
+        Raises:
+            EslintDaemonError: no worker could lint the batch
+        """
+        with tempfile.NamedTemporaryFile(prefix="eslint-", suffix=".json") as output:
+            # Holds its CPU slot like an eslint process would
+            with get_tool_scheduler().reserve("eslint"):
+                started = time.monotonic()
+                reply = self._request(
+                    {
+                        "cwd": cwd,
+                        "files": files,
+                        "config": str(config),
+                        "output": output.name,
+                    }
+                )
+            returncode = 0 if reply["ok"] else 2
+            record_usage(
+                ToolUsage(
+                    tool="eslint",
+                    returncode=returncode,
+                    wall_seconds=round(time.monotonic() - started, 3),
+                    user_cpu_seconds=round(reply.get("user_cpu_seconds", 0), 3),
+                    system_cpu_seconds=round(reply.get("system_cpu_seconds", 0), 3),
+                    max_rss_bytes=reply.get("rss", 0),
+                )
+            )
+            output.seek(0)
+            yield {"stdout": output, "stderr": reply.get("error", ""), "returncode": returncode}
+
+    def close(self) -> None:
+        """Stop the idle workers; busy ones are stopped when their batch is done."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for worker in idle:
+            self._discard(worker)
+
+
+_daemon: EslintDaemon | None = None
+_daemon_lock = threading.Lock()
+
+
+def get_eslint_daemon(toolchain: Path) -> EslintDaemon | None:
+    """The process-wide ESLint daemon, or None when it is disabled or Node is missing."""
+    global _daemon
+    if not settings.ESLINT_DAEMON_ENABLED or shutil.which("node") is None:
+        return None
+    with _daemon_lock:
+        if _daemon is None:
+            _daemon = EslintDaemon(
+                toolchain,
+                max_workers=settings.ESLINT_DAEMON_WORKERS,
+                max_rss_bytes=settings.ESLINT_DAEMON_MAX_RSS_BYTES,
+                request_timeout=settings.ESLINT_DAEMON_REQUEST_TIMEOUT_SECONDS,
+                health_check_seconds=settings.ESLINT_DAEMON_HEALTH_CHECK_SECONDS,
+            )
+        return _daemon
+
+
+@atexit.register
+def shutdown_eslint_daemon() -> None:
+    """Stop the daemon's workers. They also exit by themselves once this process is gone."""
+    global _daemon
+    with _daemon_lock:
+        if _daemon is not None:
+            _daemon.close()
+            _daemon = None
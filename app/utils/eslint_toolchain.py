@@ -0,0 +1,124 @@
+import fcntl
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.utils.subprocess_runner import run_safe_subprocess
+
+# ESLint, its TypeScript parser and plugin, pinned by the service's own lockfile
+PACKAGE_DIR = Path(__file__).resolve().parents[2]
+PACKAGE_FILES = ["package.json", "package-lock.json"]
+
+# Written into the toolchain, so its requires resolve to the toolchain's node_modules.
+# Used when the repository has no eslint.config.js of its own
+FALLBACK_CONFIG_NAME = "fallback.eslint.config.js"
+FALLBACK_ESLINT_CONFIG = """
+const tsParser = require("@typescript-eslint/parser");
+const tsPlugin = require("@typescript-eslint/eslint-plugin");
+
+module.exports = [
+    {
+        files: ["**/*.js", "**/*.jsx", "**/*.ts", "**/*.tsx"],
+        languageOptions: {
+            ecmaVersion: "latest",
+            sourceType: "module",
+            parser: tsParser,
+            parserOptions: {
+                ecmaFeatures: {
+                    jsx: true
+                }
+            }
+        },
+        plugins: {
+            "@typescript-eslint": tsPlugin
+        },
+        rules: {
+            "no-unused-vars": "warn",
+            "no-undef": "warn",
+            "semi": "warn",
+            "@typescript-eslint/no-unused-vars": "warn",
+            "@typescript-eslint/no-explicit-any": "warn"
+        }
+    }
+];
+"""
+
+# Toolchains known to be installed, checked once per process
+_ready: set[Path] = set()
+
+
+def toolchain_version(package_dir: Path = PACKAGE_DIR) -> str:
+    """Hash of the package files and fallback config the toolchain is installed from."""
+    digest = hashlib.sha256(FALLBACK_ESLINT_CONFIG.encode())
+    for name in PACKAGE_FILES:
+        try:
+            digest.update((package_dir / name).read_bytes())
+        except OSError:
+            digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+def eslint_bin(toolchain: Path) -> Path:
+    return toolchain / "node_modules" / ".bin" / "eslint"
+
+
+def ensure_eslint_toolchain(
+    root: str | Path | None = None, package_dir: Path = PACKAGE_DIR
+) -> Path | None:
+    """
+    The shared ESLint toolchain: `<ESLINT_TOOLCHAIN_DIR>/<version>`, holding the
+    locked packages and the fallback config. Installed with `npm ci` on first use
+    (or at image build, `marc-ai eslint-toolchain`) and reused by every later run;
+    each lockfile change gets a directory of its own. None if it cannot be installed.
+    """
+    root = Path(root or settings.ESLINT_TOOLCHAIN_DIR).expanduser()
+    version = toolchain_version(package_dir)
+    target = root / version
+    if target in _ready:
+        return target
+
+    try:
+        root.mkdir(parents=True, exist_ok=True)
+        # Workers of every process share the directory; one of them installs
+        with open(root / f"{version}.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                if not eslint_bin(target).exists():
+                    _install(root, target, package_dir)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    except OSError as e:
+        logger.error(f"Failed to install the ESLint toolchain in {target}: {e}")
+        return None
+
+    if not eslint_bin(target).exists():
+        return None
+    _ready.add(target)
+    return target
+
+
+def _install(root: Path, target: Path, package_dir: Path) -> None:
+    """npm ci into a staging directory, renamed into place only once complete."""
+    logger.info(f"Installing the ESLint toolchain in {target}...")
+    staging = Path(tempfile.mkdtemp(prefix=f".{target.name}-", dir=root))
+    try:
+        for name in PACKAGE_FILES:
+            shutil.copyfile(package_dir / name, staging / name)
+        result = run_safe_subprocess(
+            ["npm", "ci", "--omit=dev", "--no-audit", "--no-fund"],
+            cwd=staging,
+            timeout=600,
+        )
+        # npm can exit 0 after an aborted install, so check for the binary as well
+        if result["returncode"] != 0 or not eslint_bin(staging).exists():
+            logger.error(f"Failed to install the ESLint toolchain: {result['stderr']}")
+            return
+        (staging / FALLBACK_CONFIG_NAME).write_text(FALLBACK_ESLINT_CONFIG)
+        shutil.rmtree(target, ignore_errors=True)
+        os.rename(staging, target)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
@@ -0,0 +1,69 @@
+// Long-lived ESLint worker, managed by app/utils/eslint_daemon.py.
+//
+// Reads one JSON request per line on stdin and answers each with one JSON line on stdout,
+// in order:
+//   {"id": 1, "cwd": "/repo", "files": ["src/a.ts"], "config": "/path/config.js",
+//    "output": "/tmp/eslint-x.json"}
+//     -> {"id": 1, "ok": true, ...}  (the json-with-metadata report is written to `output`)
+//   {"id": 2, "ping": true}  -> {"id": 2, "ok": true, ...}
+// Every reply carries the CPU time spent on the request and the worker's RSS.
+//
+// ESLint, the parser and the plugin stay loaded between requests; they are resolved from
+// the shared toolchain through NODE_PATH. Only the toolchain's config is ever loaded, never
+// one from the linted repository, since the worker is shared by every run. The worker
+// exits when its stdin closes.
+"use strict";
+
+const fs = require("fs");
+const readline = require("readline");
+
+// stdout carries the replies; anything rules or plugins print goes to stderr
+console.log = console.info = console.warn = console.error;
+
+let eslintClass = null;
+
+async function lint(request) {
+    if (!request.config) {
+        throw new Error("a config file is required");
+    }
+    if (eslintClass === null) {
+        eslintClass = await require("eslint").loadESLint({ useFlatConfig: true });
+    }
+    const eslint = new eslintClass({
+        cwd: request.cwd,
+        overrideConfigFile: request.config,
+        errorOnUnmatchedPattern: false,
+    });
+    const results = await eslint.lintFiles(request.files);
+    const formatter = await eslint.loadFormatter("json-with-metadata");
+    fs.writeFileSync(request.output, await formatter.format(results));
+}
+
+async function handle(line) {
+    const started = process.cpuUsage();
+    const reply = { id: null, ok: true };
+    try {
+        const request = JSON.parse(line);
+        reply.id = request.id;
+        if (!request.ping) {
+            await lint(request);
+        }
+    } catch (error) {
+        reply.ok = false;
+        reply.error = String((error && error.stack) || error);
+    }
+    const cpu = process.cpuUsage(started);
+    reply.user_cpu_seconds = cpu.user / 1e6;
+    reply.system_cpu_seconds = cpu.system / 1e6;
+    reply.rss = process.memoryUsage().rss;
+    process.stdout.write(JSON.stringify(reply) + "\n");
+}
+
+let pending = Promise.resolve();
+const input = readline.createInterface({ input: process.stdin, crlfDelay: Infinity });
+input.on("line", (line) => {
+    pending = pending.then(() => handle(line));
+});
+input.on("close", () => {
+    pending.then(() => process.exit(0));
+});
@@ -0,0 +1,228 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable, Mapping
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any
+
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.utils.sqlite import SQLiteDatabase
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS finding_cache (
+    tool_key TEXT NOT NULL,
+    path TEXT NOT NULL,
+    blob_sha TEXT NOT NULL,
+    result TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    PRIMARY KEY (tool_key, path, blob_sha)
+);
+CREATE INDEX IF NOT EXISTS idx_finding_cache_access ON finding_cache (last_access);
+"""
+
+# SQLite limits the number of bound parameters of one statement
+_LOOKUP_BATCH = 500
+
+# Fixed per-row overhead counted against the size budget besides the stored JSON
+_ROW_OVERHEAD = 128
+
+
+class FindingCacheStats(BaseModel):
+    hits: int = 0
+    misses: int = 0
+
+
+# Hit/miss counters per tool of the run executing in this context (set by the runner)
+finding_cache_stats: ContextVar[dict[str, FindingCacheStats] | None] = ContextVar(
+    "finding_cache_stats", default=None
+)
+
+
+def tool_key(
+    tool: str,
+    version: str,
+    command: list[str],
+    config: Iterable[tuple[str, str]] = (),
+    extra: str = "",
+) -> str:
+    """
+    Key of one analyzer configuration: the tool, its version, the command it is run with
+    and the (path, blob id) of every repository file that configures it.
+    """
+    raw = json.dumps([tool, version, command, sorted(config), extra])
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class FindingCache:
+    """
+    Per-file analyzer results, content-addressed by (configuration key, path, blob id).
+
+    A re-scan of a repository only runs its analyzers on files whose contents changed
+    since a cached run. The path is part of the key because rules and per-file ignores
+    select files by path. Entries expire after `ttl_seconds` (Semgrep registry rule packs
+    and the ESLint packages are unversioned) and the least recently used ones are
+    dropped once the stored results exceed `max_bytes`.
+    """
+
+    def __init__(self, db_path: str | Path, max_bytes: int, ttl_seconds: int):
+        self.db = SQLiteDatabase(db_path, _SCHEMA)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+    def lookup(self, key: str, files: dict[str, str]) -> dict[str, Any]:
+        """Cached results of the `files` (path -> blob id) that have one."""
+        now = time.time()
+        paths = list(files)
+        found: dict[str, Any] = {}
+        with self.db.connect() as conn:
+            for start in range(0, len(paths), _LOOKUP_BATCH):
+                batch = paths[start : start + _LOOKUP_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    "SELECT path, blob_sha, result FROM finding_cache "
+                    f"WHERE tool_key = ? AND created_at >= ? AND path IN ({placeholders})",
+                    (key, now - self.ttl_seconds, *batch),
+                ).fetchall()
+                for path, sha, result in rows:
+                    if files[path] == sha:
+                        found[path] = json.loads(result)
+                conn.executemany(
+                    "UPDATE finding_cache SET last_access = ? "
+                    "WHERE tool_key = ? AND path = ? AND blob_sha = ?",
+                    [(now, key, path, files[path]) for path in batch if path in found],
+                )
+        return found
+
+    def store(self, key: str, results: dict[str, tuple[str, Any]]) -> None:
+        """Store `results` (path -> (blob id, result))."""
+        if not results:
+            return
+        now = time.time()
+        rows = []
+        for path, (sha, result) in results.items():
+            encoded = json.dumps(result, separators=(",", ":"))
+            rows.append((key, path, sha, encoded, len(encoded) + _ROW_OVERHEAD, now, now))
+        with self.db.connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO finding_cache "
+                "(tool_key, path, blob_sha, result, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        expired = conn.execute(
+            "DELETE FROM finding_cache WHERE created_at < ?", (now - self.ttl_seconds,)
+        ).rowcount
+
+        overflow = conn.execute("SELECT COALESCE(SUM(size), 0) FROM finding_cache").fetchone()[0]
+        overflow -= self.max_bytes
+        evicted = 0
+        if overflow > 0:
+            # Oldest entries first, until the bytes freed cover the overflow
+            evicted = conn.execute(
+                "DELETE FROM finding_cache WHERE rowid IN ("
+                "SELECT rowid FROM (SELECT rowid, size, "
+                "SUM(size) OVER (ORDER BY last_access, rowid) AS freed FROM finding_cache) "
+                "WHERE freed - size < ?)",
+                (overflow,),
+            ).rowcount
+
+        if expired or evicted:
+            logger.debug(f"Finding cache evicted {expired} expired, {evicted} LRU")
+
+
+class ToolCache:
+    """
+    The cached results of one analyzer configuration for the files of one run. Files
+    without a blob id (not read from a git index) are never cached.
+    """
+
+    def __init__(self, cache: FindingCache | None, tool: str, key: str, shas: Mapping[str, str]):
+        self.cache = cache
+        self.tool = tool
+        self.key = key
+        self.shas = shas
+
+    def lookup(self, paths: list[str]) -> tuple[dict[str, Any], list[str]]:
+        """
+        Split `paths` into cached results (in the order of `paths`) and the files the tool
+        still has to analyze.
+        """
+        cached: dict[str, Any] = {}
+        files = {path: sha for path in paths if (sha := self.shas.get(path)) is not None}
+        if self.cache is not None and files:
+            try:
+                found = self.cache.lookup(self.key, files)
+                cached = {path: found[path] for path in paths if path in found}
+            except sqlite3.Error as e:
+                logger.warning(f"Finding cache lookup failed for {self.tool}: {e}")
+        misses = [path for path in paths if path not in cached]
+
+        stats = finding_cache_stats.get()
+        if stats is not None:
+            counters = stats.setdefault(self.tool, FindingCacheStats())
+            counters.hits += len(cached)
+            counters.misses += len(misses)
+        logger.info(f"{self.tool}: {len(cached)} cached file(s), {len(misses)} to analyze")
+        return cached, misses
+
+    def store(self, results: dict[str, Any]) -> None:
+        """Cache the fresh per-file results of this run."""
+        if self.cache is None:
+            return
+        entries = {
+            path: (sha, result)
+            for path, result in results.items()
+            if (sha := self.shas.get(path)) is not None
+        }
+        try:
+            self.cache.store(self.key, entries)
+        except sqlite3.Error as e:
+            logger.warning(f"Finding cache store failed for {self.tool}: {e}")
+
+
+def config_files(shas: Mapping[str, str], names: Iterable[str]) -> list[tuple[str, str]]:
+    """(path, blob id) of the files in the manifest named like a tool's config files."""
+    names = frozenset(names)
+    return [(path, sha) for path, sha in shas.items() if path.rpartition("/")[2] in names]
+
+
+_finding_cache: FindingCache | None = None
+_finding_cache_lock = threading.Lock()
+
+
+def get_finding_cache() -> FindingCache | None:
+    global _finding_cache
+    if not settings.FINDING_CACHE_ENABLED:
+        return None
+    with _finding_cache_lock:
+        if _finding_cache is None:
+            _finding_cache = FindingCache(
+                settings.FINDING_CACHE_PATH,
+                max_bytes=settings.FINDING_CACHE_MAX_BYTES,
+                ttl_seconds=settings.FINDING_CACHE_TTL_SECONDS,
+            )
+        return _finding_cache
+
+
+def open_tool_cache(
+    tool: str,
+    version: str,
+    command: list[str],
+    shas: Mapping[str, str],
+    config_names: Iterable[str] = (),
+    extra: str = "",
+) -> ToolCache:
+    """Cache of `tool` run as `command` over the files of a run (path -> blob id)."""
+    key = tool_key(tool, version, command, config_files(shas, config_names), extra)
+    return ToolCache(get_finding_cache(), tool, key, shas)
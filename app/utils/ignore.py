@@ -0,0 +1,198 @@
+import fnmatch
+import os
+import re
+from collections.abc import Iterable
+from pathlib import Path
+
+_WILDCARDS = frozenset("*?[")
+
+
+def _compile_globs(patterns: Iterable[str]) -> re.Pattern[str] | None:
+    """One regex matching any of the fnmatch `patterns`, or None if there are none."""
+    translated = [f"(?:{fnmatch.translate(p)})" for p in patterns]
+    return re.compile("|".join(translated)) if translated else None
+
+
+class IgnoreMatcher:
+    """
+    The auditor's built-in ignore lists compiled once per walk: exact names, extensions
+    and `*.ext` globs go into frozensets, every remaining glob into a single regex, so
+    checking an entry costs a couple of hash lookups instead of a loop over patterns.
+    """
+
+    def __init__(
+        self,
+        ignore_dirs: Iterable[str],
+        ignore_files: Iterable[str],
+        ignore_patterns: Iterable[str] = (),
+        ignore_extensions: Iterable[str] = (),
+    ):
+        patterns = list(ignore_patterns)
+
+        dir_entries = [*ignore_dirs, *patterns]
+        self._dir_names = frozenset(d for d in dir_entries if not _WILDCARDS & set(d))
+        self._dir_globs = _compile_globs(d for d in dir_entries if _WILDCARDS & set(d))
+
+        names, suffixes, globs = set(), set(), []
+        for entry in [*ignore_files, *patterns]:
+            if not _WILDCARDS & set(entry):
+                names.add(entry)
+            elif entry.startswith("*.") and not (_WILDCARDS | {"."}) & set(entry[2:]):
+                # "*.ext" matches exactly the names whose last suffix is ".ext"; "*.min.js"
+                # is more than a suffix and stays a glob
+                suffixes.add(entry[1:])
+            else:
+                globs.append(entry)
+        self._file_names = frozenset(names)
+        self._suffixes = frozenset(suffixes)
+        self._extensions = frozenset(e.lower() for e in ignore_extensions)
+        self._file_globs = _compile_globs(globs)
+
+    def ignore_dir(self, name: str) -> bool:
+        # Hidden directories are skipped wholesale
+        if name in self._dir_names or name.startswith("."):
+            return True
+        return self._dir_globs is not None and self._dir_globs.match(name) is not None
+
+    def ignore_file(self, name: str) -> bool:
+        if name in self._file_names:
+            return True
+        dot = name.rfind(".")
+        if dot >= 0:
+            suffix = name[dot:]
+            # Like the glob, "*.swp" matches ".swp"; a name starting with a dot has no
+            # extension though
+            if suffix in self._suffixes or (dot > 0 and suffix.lower() in self._extensions):
+                return True
+        return self._file_globs is not None and self._file_globs.match(name) is not None
+
+
+def _gitignore_regex(pattern: str) -> str:
+    """Translate one .gitignore pattern (without `!` or trailing `/`) to a regex."""
+    # A slash anywhere but at the end anchors the pattern to the .gitignore's directory
+    anchored = "/" in pattern
+    pattern = pattern.removeprefix("/")
+
+    out: list[str] = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            if pattern.startswith("**", i) and (i == 0 or pattern[i - 1] == "/"):
+                if i + 2 == n:
+                    out.append(".*")  # "foo/**": everything inside
+                    i += 2
+                    continue
+                if pattern[i + 2] == "/":
+                    out.append("(?:.*/)?")  # "**/" matches zero or more directories
+                    i += 3
+                    continue
+            while i < n and pattern[i] == "*":
+                i += 1
+            out.append("[^/]*")
+            continue
+        if c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            j = i + 1
+            if j < n and pattern[j] in "!^":
+                j += 1
+            if j < n and pattern[j] == "]":
+                j += 1
+            while j < n and pattern[j] != "]":
+                j += 1
+            if j >= n:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1 : j].replace("\\", "\\\\")
+                if body[0] in "!^":
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                i = j
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+
+    regex = "".join(out)
+    return (regex if anchored else f"(?:.*/)?{regex}") + r"\Z"
+
+
+class GitIgnore:
+    """
+    Rules of one .gitignore file. Paths are matched relative to the directory holding
+    it; as in git, the last matching rule wins and `!` re-includes.
+    """
+
+    def __init__(self, lines: Iterable[str]):
+        self._rules: list[tuple[re.Pattern[str], bool, bool]] = []
+        for line in lines:
+            line = line.rstrip("\n")
+            # Trailing spaces are ignored unless escaped
+            if not line.endswith("\\ "):
+                line = line.rstrip(" ")
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            if line:
+                self._rules.append((re.compile(_gitignore_regex(line)), negate, dir_only))
+
+    @classmethod
+    def load(cls, path: str | Path) -> "GitIgnore":
+        try:
+            with open(path, encoding="utf-8", errors="ignore") as f:
+                return cls(f)
+        except OSError:
+            return cls([])
+
+    def __bool__(self) -> bool:
+        return bool(self._rules)
+
+    def match(self, rel_path: str, is_dir: bool) -> bool | None:
+        """True if ignored, False if re-included, None if no rule applies."""
+        for regex, negate, dir_only in reversed(self._rules):
+            if dir_only and not is_dir:
+                continue
+            if regex.match(rel_path):
+                return not negate
+        return None
+
+
+class GitIgnoreStack:
+    """
+    The .gitignore files in effect for one directory of a walk, deepest last, each with
+    the directory's path relative to that file. Deeper files take precedence.
+    """
+
+    def __init__(self, entries: tuple[tuple[GitIgnore, str], ...] = ()):
+        self._entries = entries
+
+    def child(self, name: str) -> "GitIgnoreStack":
+        """Stack inherited by subdirectory `name`."""
+        return GitIgnoreStack(
+            tuple((g, f"{prefix}/{name}" if prefix else name) for g, prefix in self._entries)
+        )
+
+    def with_gitignore(self, gitignore: GitIgnore | None) -> "GitIgnoreStack":
+        """This stack plus the .gitignore of the directory itself, if it has rules."""
+        return GitIgnoreStack((*self._entries, (gitignore, ""))) if gitignore else self
+
+    def ignored(self, name: str, is_dir: bool) -> bool:
+        for gitignore, prefix in reversed(self._entries):
+            result = gitignore.match(f"{prefix}/{name}" if prefix else name, is_dir)
+            if result is not None:
+                return result
+        return False
+
+
+def load_gitignore(directory: str, files: Iterable[str]) -> GitIgnore | None:
+    """The .gitignore of `directory`, given the names of the files in it."""
+    if ".gitignore" not in files:
+        return None
+    return GitIgnore.load(os.path.join(directory, ".gitignore"))
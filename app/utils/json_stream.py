@@ -0,0 +1,133 @@
+import codecs
+import json
+from collections.abc import Container, Iterator
+from typing import IO, Any
+
+CHUNK_SIZE = 64 * 1024
+_WHITESPACE = " \t\n\r"
+_NUMBER_CHARS = "0123456789.eE+-"
+
+
+class _JsonReader:
+    """
+    Pull parser over a binary stream holding one JSON document. Only the structural
+    characters of the outer object/array are handled here; every member value is decoded
+    with the stdlib decoder, so the buffer never holds much more than the largest item.
+    """
+
+    def __init__(self, stream: IO[bytes], chunk_size: int = CHUNK_SIZE):
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._utf8 = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self, size: int) -> bool:
+        """Read up to `size` more bytes into the buffer; False at end of input."""
+        if self._eof:
+            return False
+        chunk = self._stream.read(size)
+        self._eof = not chunk
+        self._buffer = self._buffer[self._pos :] + self._utf8.decode(chunk, final=self._eof)
+        self._pos = 0
+        return not self._eof
+
+    def peek(self) -> str:
+        """Next non-whitespace character, or "" at end of input."""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill(self._chunk_size):
+                return ""
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise json.JSONDecodeError(f"Expecting {char!r}", self._buffer, self._pos)
+        self._pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                # Incomplete value: read as much again as is buffered, so a large value is
+                # re-scanned a logarithmic rather than linear number of times
+                if not self._fill(max(self._chunk_size, len(self._buffer) - self._pos)):
+                    raise
+                continue
+            # A number cut off by the end of the buffer ("1" of "1.5", or "1." itself)
+            # decodes as a shorter number; it is only complete once a delimiter follows
+            if (
+                isinstance(value, int | float)
+                and (end == len(self._buffer) or self._buffer[end] in _NUMBER_CHARS)
+                and self._fill(self._chunk_size)
+            ):
+                continue
+            self._pos = end
+            return value
+
+    def array_items(self) -> Iterator[Any]:
+        """Yield the items of an array whose opening bracket was just consumed."""
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.peek() == ",":
+                self._pos += 1
+                continue
+            self.expect("]")
+            return
+
+
+def iter_json_array(stream: IO[bytes], chunk_size: int = CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Yield the items of a top-level JSON array one at a time (Ruff, ESLint `json`).
+    Empty input yields nothing.
+    """
+    reader = _JsonReader(stream, chunk_size)
+    if reader.peek() == "":
+        return
+    reader.expect("[")
+    yield from reader.array_items()
+
+
+def iter_json_object(
+    stream: IO[bytes],
+    expand: Container[str] = (),
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[tuple[str, Any]]:
+    """
+    Yield `(key, value)` for each member of a top-level JSON object. Members named in
+    `expand` whose value is an array are yielded item by item as `(key, item)` instead,
+    so e.g. Semgrep's `results` never has to fit in memory at once. Empty input yields
+    nothing.
+    """
+    reader = _JsonReader(stream, chunk_size)
+    if reader.peek() == "":
+        return
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.value()
+        if not isinstance(key, str):
+            raise json.JSONDecodeError("Expecting property name", "", 0)
+        reader.expect(":")
+        if key in expand and reader.peek() == "[":
+            reader.expect("[")
+            for item in reader.array_items():
+                yield key, item
+        else:
+            yield key, reader.value()
+
+        if reader.peek() == ",":
+            reader.expect(",")
+            continue
+        reader.expect("}")
+        return
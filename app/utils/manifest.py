@@ -0,0 +1,91 @@
+import os
+from collections.abc import Iterator
+from pathlib import Path
+from typing import IO, NamedTuple
+
+from app.core.logger import logger
+from app.utils.subprocess_runner import run_safe_subprocess, run_spooled_subprocess
+
+# `git ls-files -z -s -t` prints, per index entry, "<tag> <mode> <sha> <stage>\t<path>\0".
+# Sizes come from lstat: the size cached in the index is only 32 bits (files of 4 GiB or
+# more wrap around) and is only printed by --debug, whose format is not stable
+
+GITLINK_MODE = b"160000"  # Submodule commit, not a file in this checkout
+SKIP_WORKTREE_TAG = b"S"  # Excluded by the sparse checkout or removed afterwards
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class FileEntry(NamedTuple):
+    path: str  # Relative to the repository root, "/"-separated
+    size: int
+    sha: str | None = None  # Git blob id, when the entry comes from the index
+
+
+def parse_ls_files(stream: IO[bytes], repo_path: str | Path) -> Iterator[FileEntry]:
+    """Checked-out files from the output of `git ls-files -z -s -t` run in `repo_path`."""
+    root = os.fsencode(repo_path)
+    buffer = b""
+    while chunk := stream.read(CHUNK_SIZE):
+        # The last piece is the incomplete record at the end of the chunk
+        *records, buffer = (buffer + chunk).split(b"\0")
+        for record in records:
+            info, _, path = record.partition(b"\t")
+            tag, mode, sha, _ = info.split(b" ")
+            if tag == SKIP_WORKTREE_TAG or mode == GITLINK_MODE:
+                continue
+            try:
+                size = os.lstat(os.path.join(root, path)).st_size
+            except OSError:
+                continue  # Deleted from the checkout without telling the index
+            yield FileEntry(os.fsdecode(path), size, sha.decode("ascii"))
+
+
+def git_manifest(repo_path: str | Path) -> list[FileEntry] | None:
+    """
+    Files of a git checkout, read from the index in a single `git ls-files` call: paths
+    and blob ids, with sizes from an lstat of each checked-out file. No object is read,
+    so a blobless partial clone never fetches anything, and there is no directory walk.
+    Returns None if `repo_path` is not the root of a git checkout.
+    """
+    if not os.path.exists(os.path.join(repo_path, ".git")):
+        return None
+
+    command = ["git", "-C", str(repo_path), "ls-files", "-z", "-s", "-t"]
+    with run_spooled_subprocess(command, timeout=120) as result:
+        if result["returncode"] != 0:
+            logger.warning(f"git ls-files failed, walking the checkout: {result['stderr']}")
+            return None
+        return list(parse_ls_files(result["stdout"], repo_path))
+
+
+def scan_manifest(repo_path: str | Path) -> Iterator[FileEntry]:
+    """Files under `repo_path` from a `scandir` walk (for inputs that are not git checkouts)."""
+    root = str(repo_path)
+    pending = [""]
+    while pending:
+        relative = pending.pop()
+        try:
+            entries = os.scandir(os.path.join(root, relative) if relative else root)
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                path = f"{relative}/{entry.name}" if relative else entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name != ".git":
+                            pending.append(path)
+                    elif entry.is_file():
+                        yield FileEntry(path, entry.stat().st_size)
+                except OSError:
+                    continue
+
+
+def skip_worktree(repo_path: str | Path, paths: list[str], batch: int = 1000) -> None:
+    """Mark files removed from a checkout as skip-worktree, so the index agrees with it."""
+    for start in range(0, len(paths), batch):
+        command = ["git", "-C", str(repo_path), "update-index", "--skip-worktree", "--"]
+        result = run_safe_subprocess(command + paths[start : start + batch], timeout=120)
+        if result["returncode"] != 0:
+            logger.warning(f"git update-index --skip-worktree failed: {result['stderr']}")
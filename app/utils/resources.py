@@ -0,0 +1,81 @@
+import math
+import os
+import shutil
+from pathlib import Path
+
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+
+
+def free_disk_bytes(path: str | Path) -> int:
+    """Bytes available to unprivileged users on the filesystem holding `path`."""
+    return shutil.disk_usage(path).free
+
+
+def _read_int(path: Path) -> int | None:
+    try:
+        value = path.read_text().strip()
+    except OSError:
+        return None
+    return int(value) if value.isdigit() else None  # "max" means no limit
+
+
+def _meminfo() -> dict[str, int]:
+    info = {}
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                name, _, rest = line.partition(":")
+                info[name] = int(rest.split()[0]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return info
+
+
+def _cpu_quota() -> float | None:
+    """CPUs granted by the cgroup CPU quota (v2 `cpu.max`, then v1 CFS), if one is set."""
+    try:
+        quota, period = (CGROUP_ROOT / "cpu.max").read_text().split()[:2]
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    quota = _read_int(CGROUP_ROOT / "cpu" / "cpu.cfs_quota_us")  # -1 (no quota) is not read
+    period = _read_int(CGROUP_ROOT / "cpu" / "cpu.cfs_period_us")
+    if quota and period:
+        return quota / period
+    return None
+
+
+def cpu_budget() -> int:
+    """
+    Number of CPUs this process can actually keep busy: the CPUs it may run on, capped by
+    the container's CPU quota (rounded up).
+    """
+    if hasattr(os, "sched_getaffinity"):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+    quota = _cpu_quota()
+    if quota is not None:
+        cpus = min(cpus, max(1, math.ceil(quota)))
+    return cpus
+
+
+def memory_usage_percent() -> float | None:
+    """
+    Memory in use as a percentage of the container limit (cgroup v2, then v1), or of the
+    host's memory when no limit is set. None if it cannot be determined.
+    """
+    for usage_file, limit_file in (
+        ("memory.current", "memory.max"),
+        ("memory/memory.usage_in_bytes", "memory/memory.limit_in_bytes"),
+    ):
+        usage = _read_int(CGROUP_ROOT / usage_file)
+        limit = _read_int(CGROUP_ROOT / limit_file)
+        # cgroup v1 reports "no limit" as a huge number rather than "max"
+        if usage is not None and limit is not None and limit < 1 << 60:
+            return 100.0 * usage / limit
+
+    info = _meminfo()
+    if "MemTotal" in info and "MemAvailable" in info:
+        return 100.0 * (1 - info["MemAvailable"] / info["MemTotal"])
+    return None
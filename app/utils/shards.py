@@ -0,0 +1,81 @@
+import contextvars
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import TypeVar
+
+from app.core.config import settings
+from app.utils.tool_scheduler import get_tool_scheduler
+
+T = TypeVar("T")
+
+# Files of which a directory holding one is a package of its own
+PACKAGE_MANIFESTS = frozenset(["package.json", "pyproject.toml", "requirements.txt"])
+
+
+def package_roots(manifests: Iterable[str]) -> list[str]:
+    """
+    Package directories of a repository (relative, "" for the root) given the paths of
+    its package manifests. The root is always one, for files outside any package.
+    """
+    roots = {path.rpartition("/")[0] for path in manifests}
+    roots.add("")
+    return sorted(roots)
+
+
+def shard_paths(
+    paths: list[str], packages: list[str], max_files: int | None = None
+) -> list[list[str]]:
+    """
+    Split `paths` into shards: the files of each package (the deepest package directory
+    above them), and packages with more than `max_files` files into chunks of that
+    size. Shards come in package order and keep the order of `paths` within each.
+    """
+    max_files = max_files or settings.SHARD_MAX_FILES
+    roots = set(packages)
+    owners: dict[str, str] = {}
+
+    def owner(directory: str) -> str:
+        found = owners.get(directory)
+        if found is None:
+            found = directory if directory in roots or not directory else None
+            if found is None:
+                found = owner(directory.rpartition("/")[0])
+            owners[directory] = found
+        return found
+
+    groups: dict[str, list[str]] = {}
+    for path in paths:
+        groups.setdefault(owner(path.rpartition("/")[0]), []).append(path)
+
+    return [
+        group[start : start + max_files]
+        for _, group in sorted(groups.items())
+        for start in range(0, len(group), max_files)
+    ]
+
+
+def run_shards(fn: Callable[[list[str]], T], shards: list[list[str]]) -> list[T]:
+    """
+    Call `fn` on every shard, in parallel threads, each driving its own analyzer
+    subprocesses; the tool scheduler bounds how many of them actually run at once.
+    Results come back in shard order. Each call runs in a copy of the caller's
+    context, so cancellation, resource accounting and cache statistics follow the run.
+    """
+    if len(shards) <= 1:
+        return [fn(shard) for shard in shards]
+
+    workers = min(len(shards), get_tool_scheduler().slots)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="shard") as pool:
+        futures = [pool.submit(contextvars.copy_context().run, fn, shard) for shard in shards]
+        return [future.result() for future in futures]
+
+
+def in_path_order(results: dict[str, T], paths: list[str]) -> Iterator[tuple[str, T]]:
+    """Per-file `results` in the order of `paths`, then any results for other paths."""
+    for path in paths:
+        if path in results:
+            yield path, results[path]
+    listed = set(paths)
+    for path, result in results.items():
+        if path not in listed:
+            yield path, result
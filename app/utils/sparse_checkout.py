@@ -0,0 +1,165 @@
+import os
+import re
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+
+from app.utils.manifest import git_manifest, scan_manifest, skip_worktree
+
+# Files the agents analyze: sources for Ruff/ESLint/Bandit/Radon/Semgrep, manifests and
+# lockfiles for dependency rules, Dockerfiles, and plain-text config Semgrep scans for
+# secrets. Patterns without a slash match at any depth (gitignore syntax).
+SPARSE_CHECKOUT_INCLUDE = [
+    # Sources
+    "*.py",
+    "*.js",
+    "*.jsx",
+    "*.mjs",
+    "*.cjs",
+    "*.ts",
+    "*.tsx",
+    # Manifests and lockfiles
+    "package.json",
+    "package-lock.json",
+    "yarn.lock",
+    "pnpm-lock.yaml",
+    "requirements*.txt",
+    "pyproject.toml",
+    "setup.cfg",
+    "Pipfile",
+    "Pipfile.lock",
+    "poetry.lock",
+    "tsconfig*.json",
+    # Dockerfiles
+    "Dockerfile",
+    "Dockerfile.*",
+    "*.dockerfile",
+    # Config (secrets scanning) and analyzer settings
+    "*.yml",
+    "*.yaml",
+    "*.toml",
+    "*.cfg",
+    "*.ini",
+    ".env*",
+    ".eslintrc*",
+    "eslint.config.*",
+    ".gitignore",
+    ".semgrepignore",
+    "README*",
+    "readme*",
+]
+
+# Dependency, build and bundle output the auditor skips anyway; often the bulk of a repo
+SPARSE_CHECKOUT_EXCLUDE = [
+    "!*.min.js",
+    "!*.bundle.js",
+    *(
+        f"!**/{name}/**"
+        for name in (
+            "node_modules",
+            "bower_components",
+            "venv",
+            ".venv",
+            "dist",
+            "build",
+            "out",
+            "target",
+            ".next",
+            ".nuxt",
+            "__pycache__",
+            ".tox",
+        )
+    ),
+]
+
+SPARSE_CHECKOUT_PATTERNS = SPARSE_CHECKOUT_INCLUDE + SPARSE_CHECKOUT_EXCLUDE
+
+
+def sparse_checkout_command(repo_path: str | Path) -> list[str]:
+    """`git sparse-checkout set` command restricting a clone to analyzable files."""
+    return [
+        "git",
+        "-C",
+        str(repo_path),
+        "sparse-checkout",
+        "set",
+        "--no-cone",
+        *SPARSE_CHECKOUT_PATTERNS,
+    ]
+
+
+def size_filter(max_file_bytes: int) -> str:
+    """Partial-clone filter leaving out the blobs of files over `max_file_bytes`."""
+    # blob:limit=<n> omits blobs of n bytes or more
+    return f"blob:limit={max_file_bytes + 1}"
+
+
+def exclusion_pattern(path: str) -> str:
+    """Sparse-checkout pattern excluding exactly `path`."""
+    return "!/" + re.sub(r"([\\*?\[!# ])", r"\\\1", path)
+
+
+async def prepare_checkout(
+    git: Callable[..., Awaitable[str]],
+    repo_path: str | Path,
+    commit: str,
+    sparse: bool,
+    size_filtered: bool,
+) -> int:
+    """
+    Set up the sparse checkout of `commit` in a clone made with `--no-checkout`: only the
+    analyzable files if `sparse`, and, if the clone was made with a `size_filter`, none of
+    the files whose blobs it left out, so that checking out never downloads them. `git`
+    runs a git command (the arguments after "git") and returns its stdout. Returns the
+    number of files left out for their size.
+    """
+    repo = str(repo_path)
+    oversized = []
+    if size_filtered:
+        listed = await git(
+            "-C", repo, "rev-list", "--objects", "--no-walk", "--missing=print", commit
+        )
+        missing = {line[1:] for line in listed.splitlines() if line.startswith("?")}
+        if missing:
+            tree = await git("-C", repo, "ls-tree", "-r", "-z", "--full-tree", commit)
+            for record in tree.split("\0"):
+                info, _, path = record.partition("\t")
+                if info and info.split(" ")[2] in missing:
+                    oversized.append(path)
+
+    if sparse or oversized:
+        patterns = SPARSE_CHECKOUT_PATTERNS if sparse else ["/*"]
+        await git("-C", repo, "sparse-checkout", "set", "--no-cone", *patterns)
+        if oversized:
+            # Appended to the file: there can be more of them than fit on a command line
+            info = Path(await git("-C", repo, "rev-parse", "--git-path", "info/sparse-checkout"))
+            with open(info if info.is_absolute() else Path(repo, info), "a") as patterns_file:
+                patterns_file.writelines(f"{exclusion_pattern(path)}\n" for path in oversized)
+    return len(oversized)
+
+
+def remove_large_files(repo_path: str | Path, max_bytes: int) -> int:
+    """
+    Delete working-tree files larger than `max_bytes` (generated or vendored blobs the
+    analyzers would only choke on). Returns the number of files removed.
+
+    Clones leave such files out of the checkout already (see `prepare_checkout`); this is
+    the backstop for the ones they could not. Sizes come from the git index when
+    `repo_path` is a checkout; removed files are then marked skip-worktree so the index
+    keeps describing the workspace.
+    """
+    manifest = git_manifest(repo_path)
+    entries = manifest if manifest is not None else scan_manifest(repo_path)
+
+    removed = []
+    for entry in entries:
+        if entry.size <= max_bytes:
+            continue
+        try:
+            os.unlink(os.path.join(repo_path, entry.path))
+        except OSError:
+            continue
+        removed.append(entry.path)
+
+    if manifest is not None:
+        skip_worktree(repo_path, removed)
+    return len(removed)
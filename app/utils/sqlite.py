@@ -0,0 +1,64 @@
+import sqlite3
+import threading
+from collections.abc import Iterator, Sequence
+from contextlib import closing, contextmanager
+from pathlib import Path
+from typing import TypeVar
+
+T = TypeVar("T")
+
+# "?" parameters bound per statement; SQLite builds before 3.32 allow at most 999
+MAX_PARAMETERS = 500
+
+
+def chunked(values: Sequence[T], size: int = MAX_PARAMETERS) -> Iterator[Sequence[T]]:
+    """Split `values` for `WHERE ... IN (...)` queries of at most `size` parameters."""
+    for start in range(0, len(values), size):
+        yield values[start : start + size]
+
+
+def placeholders(values: Sequence[object]) -> str:
+    return ", ".join("?" * len(values))
+
+
+class SQLiteDatabase:
+    """
+    Lazily initialized SQLite database file.
+
+    Every operation opens its own short-lived connection, which keeps callers safe to use
+    from the event loop, worker threads and streaming response iterators alike. The
+    schema is applied on first use so constructing the object never touches the disk.
+    """
+
+    def __init__(self, db_path: str | Path, schema: str):
+        self.db_path = Path(db_path)
+        self.schema = schema
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    def _initialize(self) -> None:
+        with self._init_lock:
+            if self._initialized:
+                return
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            with closing(sqlite3.connect(self.db_path, timeout=30)) as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(self.schema)
+            self._initialized = True
+
+    @contextmanager
+    def connect(self, immediate: bool = False) -> Iterator[sqlite3.Connection]:
+        """
+        Yield a connection inside a transaction that commits on success. With `immediate`
+        the write lock is taken up front, for read-then-write transactions that must not
+        interleave with other writers.
+        """
+        if not self._initialized:
+            self._initialize()
+
+        with closing(sqlite3.connect(self.db_path, timeout=30)) as conn:
+            conn.execute("PRAGMA foreign_keys=ON")
+            with conn:
+                if immediate:
+                    conn.execute("BEGIN IMMEDIATE")
+                yield conn
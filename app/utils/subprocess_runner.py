@@ -1,8 +1,27 @@
+import asyncio
+import os
+import signal
 import subprocess
+import tempfile
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from functools import cache
 from pathlib import Path
-from typing import Any
+from typing import IO, Any
 
 from app.core.logger import logger
+from app.utils.cancellation import current_scope, kill_process_group
+from app.utils.tool_limits import (
+    ToolLimits,
+    ToolUsage,
+    limited_command,
+    limits_for,
+    record_usage,
+    tool_name,
+)
+from app.utils.tool_scheduler import apply_threads, get_tool_scheduler
 
 
 def run_safe_subprocess(
@@ -10,53 +29,279 @@ def run_safe_subprocess(
     cwd: str | Path | None = None,
     timeout: int = 300,
     env: dict[str, str] | None = None,
+    limits: ToolLimits | None = None,
+    schedule: bool = True,
 ) -> dict[str, Any]:
     """
-    Execute a subprocess safely with proper isolation and timeouts.
+    Execute a subprocess safely with proper isolation, timeouts and resource limits.
+
+    The process runs in its own session, so a timeout or a cancellation of the run
+    executing this call kills everything it spawned as well. Its wall time, CPU time
+    and peak RSS are recorded in the usage of the run executing this call.
 
     Args:
         command: Command as list (never use shell=True)
         cwd: Working directory
         timeout: Timeout in seconds
         env: Environment variables
+        limits: Resource limits; defaults to the profile of the tool in `TOOL_LIMITS`
+        schedule: Wait for CPU slots in the tool scheduler and size the tool's threads
+            to them. Off for quick probes such as `--version`, which must not queue
+            behind running analyzers
 
     Returns:
         Dict with stdout, stderr, returncode
+
+    Raises:
+        RunCancelled: the run this call belongs to was cancelled
+    """
+    returncode, stdout, stderr = _run(
+        command, cwd, timeout, env, limits, subprocess.PIPE, schedule=schedule
+    )
+    return {
+        "stdout": stdout.decode("utf-8", errors="ignore"),
+        "stderr": stderr.decode("utf-8", errors="ignore"),
+        "returncode": returncode,
+    }
+
+
+@cache
+def tool_version(tool: str) -> str:
+    """
+    Return the `--version` output of an analyzer, or "unavailable" if it cannot be run.
+    Cached for the lifetime of the process.
+    """
+    result = run_safe_subprocess([tool, "--version"], timeout=60, schedule=False)
+    if result["returncode"] != 0:
+        return "unavailable"
+    return (result["stdout"] or result["stderr"]).strip()
+
+
+@contextmanager
+def run_spooled_subprocess(
+    command: list[str],
+    cwd: str | Path | None = None,
+    timeout: int = 300,
+    env: dict[str, str] | None = None,
+    limits: ToolLimits | None = None,
+) -> Iterator[dict[str, Any]]:
+    """
+    `run_safe_subprocess` for tools with large output. Stdout is written by the child
+    straight into an anonymous temporary file instead of a pipe, so none of it is held
+    in memory; parse it incrementally with `app.utils.json_stream`.
+
+    Yields:
+        Dict with stdout (binary file positioned at the start), stderr, returncode
+    """
+    with tempfile.TemporaryFile() as out:
+        returncode, _, stderr = _run(command, cwd, timeout, env, limits, out)
+        out.seek(0)
+        yield {
+            "stdout": out,
+            "stderr": stderr.decode("utf-8", errors="ignore"),
+            "returncode": returncode,
+        }
+
+
+class _PipeReader(threading.Thread):
+    """Reads one of the child's pipes to EOF, so the child never blocks on a full pipe."""
+
+    def __init__(self, pipe: IO[bytes]):
+        super().__init__(daemon=True)
+        self.pipe = pipe
+        self.data = b""
+
+    def run(self) -> None:
+        with self.pipe:
+            self.data = self.pipe.read()
+
+
+def _communicate(
+    process: subprocess.Popen, readers: list[_PipeReader], timeout: float | None
+) -> Any:
+    """
+    Wait for the child to close its pipes and exit, then reap it with `wait4`, which
+    also yields its resource usage (Popen's own wait discards it); sets `returncode`.
+    Raises TimeoutExpired after `timeout` seconds. Returns the resource usage, or None
+    if the child was reaped elsewhere.
     """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    for reader in readers:
+        reader.join(None if deadline is None else max(deadline - time.monotonic(), 0))
+        if reader.is_alive():
+            raise subprocess.TimeoutExpired(process.args, timeout)  # type: ignore[arg-type]
+
+    # The pipes are closed, so the child is normally gone or about to be
+    flags = 0 if deadline is None else os.WNOHANG
+    delay = 0.0005
+    while True:
+        try:
+            pid, status, rusage = os.wait4(process.pid, flags)
+        except ChildProcessError:
+            # Same fallback as Popen: the child was reaped elsewhere, status unknown
+            process.returncode = 0
+            return None
+        if pid == process.pid:
+            process.returncode = os.waitstatus_to_exitcode(status)
+            return rusage
+        assert deadline is not None
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise subprocess.TimeoutExpired(process.args, timeout)  # type: ignore[arg-type]
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, 0.05)
+
+
+def _account(command: list[str], returncode: int | None, rusage: Any, started: float) -> None:
+    if rusage is None or returncode is None:
+        return
+    tool = tool_name(command)
+    if returncode == -signal.SIGXCPU:
+        logger.warning(f"{tool} exceeded its CPU time limit")
+    record_usage(
+        ToolUsage(
+            tool=tool,
+            returncode=returncode,
+            wall_seconds=round(time.monotonic() - started, 3),
+            user_cpu_seconds=round(rusage.ru_utime, 3),
+            system_cpu_seconds=round(rusage.ru_stime, 3),
+            max_rss_bytes=rusage.ru_maxrss * 1024,  # KiB on Linux
+        )
+    )
+
+
+def _run(
+    command: list[str],
+    cwd: str | Path | None,
+    timeout: int,
+    env: dict[str, str] | None,
+    limits: ToolLimits | None,
+    stdout: int | IO[bytes],
+    schedule: bool = True,
+) -> tuple[int, bytes, bytes]:
+    if not schedule:
+        return _spawn(command, cwd, timeout, env, limits, stdout)
+
+    # Analyzers wait here for CPU slots shared with every other run in the process
+    tool = tool_name(command)
+    with get_tool_scheduler().reserve(tool) as threads:
+        command, env = apply_threads(command, env, tool, threads)
+        return _spawn(command, cwd, timeout, env, limits, stdout)
+
+
+def _spawn(
+    command: list[str],
+    cwd: str | Path | None,
+    timeout: int,
+    env: dict[str, str] | None,
+    limits: ToolLimits | None,
+    stdout: int | IO[bytes],
+) -> tuple[int, bytes, bytes]:
+    scope = current_scope.get()
+    if scope is not None:
+        scope.check()
+
+    started = time.monotonic()
     try:
-        result = subprocess.run(
-            command,
-            check=False,
+        process = subprocess.Popen(
+            limited_command(command, limits or limits_for(command)),
             env=env,
             cwd=cwd,
-            capture_output=True,
-            timeout=timeout,
+            stdout=stdout,
+            stderr=subprocess.PIPE,
             shell=False,
+            start_new_session=True,
         )
+    except Exception as e:
+        logger.error(f"Error running command {' '.join(command)}: {e}")
+        return -1, b"", str(e).encode()
 
-        logger.debug(f"Command: {' '.join(command)}")
-        logger.debug(f"Return code: {result.returncode}")
+    if scope is not None:
+        scope.register(process)
+    readers = [_PipeReader(pipe) for pipe in (process.stdout, process.stderr) if pipe]
+    for reader in readers:
+        reader.start()
+    rusage = None
+    try:
+        rusage = _communicate(process, readers, timeout)
+    except subprocess.TimeoutExpired:
+        kill_process_group(process.pid)
+        rusage = _communicate(process, readers, None)
+        logger.warning(f"Command timed out after {timeout}s: {' '.join(command)}")
+        return -1, b"", f"Command timed out after {timeout} seconds".encode()
+    except BaseException:
+        # Never leave the process group behind
+        kill_process_group(process.pid)
+        _communicate(process, readers, None)
+        raise
+    finally:
+        if scope is not None:
+            scope.unregister(process)
+        _account(command, process.returncode, rusage, started)
+    stdout = readers[0].data if process.stdout else b""
+    stderr = readers[-1].data
 
-        output: dict[str, Any] = {
-            "stdout": result.stdout.decode("utf-8", errors="ignore"),
-            "stderr": result.stderr.decode("utf-8", errors="ignore"),
-            "returncode": result.returncode,
-        }
+    if scope is not None:
+        scope.check()
 
-        return output
+    logger.debug(f"Command: {' '.join(command)}")
+    logger.debug(f"Return code: {process.returncode}")
 
-    except subprocess.TimeoutExpired:
-        logger.warning(f"Command timed out after {timeout}s: {' '.join(command)}")
-        return {
-            "stdout": "",
-            "stderr": f"Command timed out after {timeout} seconds",
-            "returncode": -1,
-        }
+    return process.returncode, stdout or b"", stderr
+
+
+async def run_async_subprocess(
+    command: list[str],
+    cwd: str | Path | None = None,
+    timeout: int = 300,
+    env: dict[str, str] | None = None,
+) -> dict[str, Any]:
+    """
+    Asyncio counterpart of `run_safe_subprocess` for use on the event loop.
 
+    Args:
+        command: Command as list (never use shell=True)
+        cwd: Working directory
+        timeout: Timeout in seconds
+        env: Environment variables
+
+    Returns:
+        Dict with stdout, stderr, returncode
+    """
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            cwd=cwd,
+            env=env,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True,
+        )
     except Exception as e:
         logger.error(f"Error running command {' '.join(command)}: {e}")
+        return {"stdout": "", "stderr": str(e), "returncode": -1}
+
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+    except TimeoutError:
+        kill_process_group(process.pid)
+        await process.wait()
+        logger.warning(f"Command timed out after {timeout}s: {' '.join(command)}")
         return {
             "stdout": "",
-            "stderr": str(e),
+            "stderr": f"Command timed out after {timeout} seconds",
             "returncode": -1,
         }
+    except asyncio.CancelledError:
+        kill_process_group(process.pid)
+        await process.wait()
+        raise
+
+    logger.debug(f"Command: {' '.join(command)}")
+    logger.debug(f"Return code: {process.returncode}")
+
+    return {
+        "stdout": stdout.decode("utf-8", errors="ignore"),
+        "stderr": stderr.decode("utf-8", errors="ignore"),
+        "returncode": process.returncode,
+    }
@@ -0,0 +1,46 @@
+import os
+from collections.abc import Iterator
+
+# Bytes argv may use: ARG_MAX also covers the environment, and each argument costs a
+# pointer besides its characters. Half of what is left keeps well clear of E2BIG.
+POINTER_BYTES = 8
+
+
+def arg_budget() -> int:
+    try:
+        arg_max = os.sysconf("SC_ARG_MAX")
+    except (ValueError, OSError):
+        arg_max = 128 * 1024
+    environ = sum(len(k) + len(v) + 2 + POINTER_BYTES for k, v in os.environ.items())
+    return max(16 * 1024, (arg_max - environ) // 2)
+
+
+def _arg_bytes(arg: str) -> int:
+    return len(os.fsencode(arg)) + 1 + POINTER_BYTES
+
+
+def target_commands(
+    command: list[str], targets: list[str], budget: int | None = None
+) -> Iterator[list[str]]:
+    """
+    `command` followed by the explicit file `targets`, split into as few invocations as
+    fit in the argv limit. None of the analyzers reads argument files, so a long list
+    means several runs whose outputs the caller merges. No targets, no invocation.
+    """
+    budget = budget if budget is not None else arg_budget()
+    base = sum(_arg_bytes(arg) for arg in command)
+
+    chunk: list[str] = []
+    size = base
+    for target in targets:
+        # A file named like an option must not be read as one
+        if target.startswith("-"):
+            target = f"./{target}"
+        cost = _arg_bytes(target)
+        if chunk and size + cost > budget:
+            yield [*command, *chunk]
+            chunk, size = [], base
+        chunk.append(target)
+        size += cost
+    if chunk:
+        yield [*command, *chunk]
@@ -0,0 +1,101 @@
+import shutil
+from contextvars import ContextVar
+from functools import cache
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from app.core.logger import logger
+
+GiB = 1024**3
+
+
+class ToolLimits(BaseModel):
+    """Resource limits applied to one analyzer invocation; None means unlimited."""
+
+    memory_bytes: int | None = None  # RLIMIT_AS
+    cpu_seconds: int | None = None  # RLIMIT_CPU; the process is killed once exceeded
+    open_files: int | None = 4096  # RLIMIT_NOFILE
+    nice: int = 10  # Keep the API and the other runs responsive
+
+
+class ToolUsage(BaseModel):
+    """Resources one subprocess consumed, from `wait4`."""
+
+    tool: str
+    returncode: int
+    wall_seconds: float
+    user_cpu_seconds: float
+    system_cpu_seconds: float
+    max_rss_bytes: int
+
+
+# Node (ESLint, npm) reserves far more address space than it ever touches, so an
+# RLIMIT_AS would only break it; it is bounded by CPU time and open files instead.
+TOOL_LIMITS: dict[str, ToolLimits] = {
+    "semgrep": ToolLimits(memory_bytes=6 * GiB, cpu_seconds=3600),
+    "bandit": ToolLimits(memory_bytes=2 * GiB, cpu_seconds=900),
+    "radon": ToolLimits(memory_bytes=2 * GiB, cpu_seconds=600),
+    "xenon": ToolLimits(memory_bytes=2 * GiB, cpu_seconds=600),
+    "ruff": ToolLimits(memory_bytes=4 * GiB, cpu_seconds=600),
+    "eslint": ToolLimits(cpu_seconds=1200),
+    "npm": ToolLimits(cpu_seconds=600),
+}
+DEFAULT_LIMITS = ToolLimits()
+
+# Usage of every subprocess of the run executing in this context (set by the runner)
+tool_usage: ContextVar[list[ToolUsage] | None] = ContextVar("tool_usage", default=None)
+
+
+def tool_name(command: list[str]) -> str:
+    """Name of the tool a command runs: `npx eslint ...` is "eslint"."""
+    name = Path(command[0]).name
+    if name == "npx" and len(command) > 1:
+        return command[1]
+    return name
+
+
+def limits_for(command: list[str]) -> ToolLimits:
+    return TOOL_LIMITS.get(tool_name(command), DEFAULT_LIMITS)
+
+
+@cache
+def _prlimit() -> str | None:
+    path = shutil.which("prlimit")
+    if path is None:
+        logger.warning("prlimit not found; analyzer subprocesses run without resource limits")
+    return path
+
+
+def limited_command(command: list[str], limits: ToolLimits) -> list[str]:
+    """
+    Prefix `command` with `prlimit` and `nice`. Both exec the command in place, so the
+    pid, process group and exit status are the command's own. Limits are applied by
+    wrappers rather than a `preexec_fn`, which is unsafe in the threaded agents.
+    """
+    rlimits = []
+    if limits.memory_bytes is not None:
+        rlimits.append(f"--as={limits.memory_bytes}")
+    if limits.cpu_seconds is not None:
+        rlimits.append(f"--cpu={limits.cpu_seconds}")
+    if limits.open_files is not None:
+        rlimits.append(f"--nofile={limits.open_files}")
+
+    prefix: list[str] = []
+    prlimit = _prlimit() if rlimits else None
+    if prlimit is not None:
+        prefix += [prlimit, *rlimits, "--"]
+    if limits.nice and shutil.which("nice"):
+        prefix += ["nice", "-n", str(limits.nice)]
+    return prefix + command
+
+
+def record_usage(usage: ToolUsage) -> None:
+    logger.debug(
+        f"{usage.tool}: {usage.wall_seconds:.1f}s wall, "
+        f"{usage.user_cpu_seconds + usage.system_cpu_seconds:.1f}s CPU, "
+        f"{usage.max_rss_bytes // 1024**2} MiB max RSS"
+    )
+    usages = tool_usage.get()
+    if usages is not None:
+        usages.append(usage)
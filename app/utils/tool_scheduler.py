@@ -0,0 +1,127 @@
+import os
+import threading
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.utils.cancellation import check_cancelled
+from app.utils.resources import cpu_budget
+
+# How often a waiting tool re-checks whether its run was cancelled
+CANCEL_POLL_SECONDS = 0.5
+
+
+class ToolCost(BaseModel):
+    """
+    CPU slots an analyzer occupies. Multi-threaded tools take between `min_slots` and
+    `max_slots` depending on what is free and are told how many threads to use, either
+    through a command-line option or an environment variable.
+    """
+
+    min_slots: int = 1
+    max_slots: int = 1
+    threads_option: str | None = None
+    threads_env: str | None = None
+
+
+# Tools not listed (git, `--version` probes) are cheap and bypass the scheduler
+TOOL_COSTS: dict[str, ToolCost] = {
+    "semgrep": ToolCost(max_slots=4, threads_option="--jobs"),
+    "ruff": ToolCost(max_slots=2, threads_env="RAYON_NUM_THREADS"),
+    "eslint": ToolCost(),
+    "bandit": ToolCost(),
+    "radon": ToolCost(),
+    "xenon": ToolCost(),
+    "npm": ToolCost(),
+}
+
+
+class ToolScheduler:
+    """
+    Process-wide budget of CPU slots shared by the analyzer subprocesses of every
+    concurrent run, so that N runs do not start N x (Semgrep jobs + Ruff threads + ...)
+    processes on a handful of cores. Tools are admitted in FIFO order; a tool takes as
+    many slots as it can use while nobody is queued behind it, and only its minimum
+    otherwise.
+    """
+
+    def __init__(self, slots: int):
+        self.slots = max(1, slots)
+        self._free = self.slots
+        self._cond = threading.Condition()
+        self._waiting: deque[object] = deque()
+
+    @property
+    def free(self) -> int:
+        with self._cond:
+            return self._free
+
+    @contextmanager
+    def reserve(self, tool: str) -> Iterator[int]:
+        """
+        Hold CPU slots for one invocation of `tool`; yields the thread count it may use
+        (0 for tools the scheduler does not track).
+
+        Raises:
+            RunCancelled: the run was cancelled while waiting for slots
+        """
+        cost = TOOL_COSTS.get(tool)
+        if cost is None:
+            yield 0
+            return
+
+        granted = self._acquire(cost)
+        try:
+            yield granted
+        finally:
+            with self._cond:
+                self._free += granted
+                self._cond.notify_all()
+
+    def _acquire(self, cost: ToolCost) -> int:
+        minimum = min(cost.min_slots, self.slots)
+        ticket = object()
+        with self._cond:
+            self._waiting.append(ticket)
+            try:
+                while self._waiting[0] is not ticket or self._free < minimum:
+                    self._cond.wait(timeout=CANCEL_POLL_SECONDS)
+                    check_cancelled()
+                contended = len(self._waiting) > 1
+                granted = minimum if contended else min(cost.max_slots, self._free)
+                self._free -= granted
+                return granted
+            finally:
+                self._waiting.remove(ticket)
+                self._cond.notify_all()
+
+
+def apply_threads(
+    command: list[str], env: dict[str, str] | None, tool: str, threads: int
+) -> tuple[list[str], dict[str, str] | None]:
+    """Tell a multi-threaded tool how many threads it was granted."""
+    cost = TOOL_COSTS.get(tool)
+    if cost is None:
+        return command, env
+    if cost.threads_option is not None:
+        command = [*command, cost.threads_option, str(threads)]
+    if cost.threads_env is not None:
+        env = {**(env if env is not None else os.environ), cost.threads_env: str(threads)}
+    return command, env
+
+
+_scheduler: ToolScheduler | None = None
+_scheduler_lock = threading.Lock()
+
+
+def get_tool_scheduler() -> ToolScheduler:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = ToolScheduler(settings.TOOL_CPU_SLOTS or cpu_budget())
+            logger.info(f"Analyzer scheduler: {_scheduler.slots} CPU slot(s)")
+        return _scheduler
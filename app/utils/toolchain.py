@@ -0,0 +1,44 @@
+import hashlib
+import json
+from functools import cache
+
+from app.core.config import settings
+from app.utils.eslint_toolchain import toolchain_version
+from app.utils.sparse_checkout import SPARSE_CHECKOUT_PATTERNS
+from app.utils.subprocess_runner import tool_version
+
+# Analyzers whose version changes the findings of a run
+ANALYZERS = ["ruff", "bandit", "semgrep", "radon", "xenon"]
+
+# Semgrep registry rule packs used for every scan
+SEMGREP_RULE_PACKS = [
+    "p/security-audit",
+    "p/owasp-top-ten",
+    "p/secrets",
+    "p/supply-chain",
+    "p/dockerfile",
+]
+
+
+@cache
+def toolchain_fingerprint() -> str:
+    """
+    Hash of everything besides the source code that determines a run's report:
+    analyzer versions, rule packs, which files are checked out and the LLM settings
+    used to explain findings.
+    """
+    parts = {
+        "analyzers": {tool: tool_version(tool) for tool in ANALYZERS},
+        # package.json, package-lock.json and the fallback config of the ESLint toolchain
+        "eslint": toolchain_version(),
+        "semgrep_rule_packs": SEMGREP_RULE_PACKS,
+        "checkout": {
+            "sparse_patterns": SPARSE_CHECKOUT_PATTERNS if settings.SPARSE_CLONE_ENABLED else None,
+            "max_file_bytes": settings.CLONE_MAX_FILE_BYTES,
+        },
+        "llm": {
+            "deployment": settings.AZURE_OPENAI_DEPLOYMENT,
+            "api_version": settings.AZURE_OPENAI_API_VERSION,
+        },
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
@@ -1,4 +1,7 @@
-import shutil
+import time
+from collections.abc import Callable
+from functools import wraps
+from typing import Any
 
 from langgraph.graph import END, StateGraph
 from langgraph.graph.state import CompiledStateGraph
@@ -9,6 +12,7 @@ from app.agents.performance_agent import PerformanceAgent
 from app.agents.security_agent import SecurityAgent
 from app.agents.style_agent import StyleAgent
 from app.core.logger import logger
+from app.utils.cancellation import check_cancelled
 from app.workflows.state import RepoAnalysisState
 
 
@@ -36,10 +40,14 @@ def style_agent(state: RepoAnalysisState):
         js_ts_files=state["files"].js_ts_files,
         py_files=state["files"].py_files,
         log_all_audits=state["log_all_audits"],
+        js_ts_paths=state["files"].js_ts_paths,
+        py_paths=state["files"].py_paths,
+        blob_shas=state["files"].blob_shas,
+        packages=state["files"].packages,
     )
     result = styler.run()
 
-    return {"style_findings": result}
+    return {"style_findings": result, "tool_failures": styler.failures}
 
 
 def security_agent(state: RepoAnalysisState):
@@ -50,21 +58,30 @@ def security_agent(state: RepoAnalysisState):
         js_ts_files=state["files"].js_ts_files,
         py_files=state["files"].py_files,
         log_all_audits=state["log_all_audits"],
+        all_paths=state["files"].all_paths,
+        py_paths=state["files"].py_paths,
+        blob_shas=state["files"].blob_shas,
+        packages=state["files"].packages,
     )
     result = securer.run()
 
-    return {"security_findings": result}
+    return {"security_findings": result, "tool_failures": securer.failures}
 
 
 def performance_agent(state: RepoAnalysisState):
     logger.info("Performance Agent: running Radon and Xenon.")
 
     performer = PerformanceAgent(
-        repo_path=state["repo_path"], py_files=state["files"].py_files, log_all_audits=True
+        repo_path=state["repo_path"],
+        py_files=state["files"].py_files,
+        log_all_audits=True,
+        py_paths=state["files"].py_paths,
+        blob_shas=state["files"].blob_shas,
+        packages=state["files"].packages,
     )
     result = performer.run()
 
-    return {"performance_findings": result}
+    return {"performance_findings": result, "tool_failures": performer.failures}
 
 
 def conflict_resolver(state: RepoAnalysisState):
@@ -84,11 +101,74 @@ def explainer_agent(state: RepoAnalysisState):
 
     explainer = ExplainerAgent(findings=state["merged_findings"], llm=state["llm"])
 
-    explainer.run()
+    markdown = explainer.run()
+
+    return {"markdown_report": markdown}
+
+
+def count_findings(result: dict[str, Any]) -> int | None:
+    """
+    Count the findings an agent node produced, for progress reporting.
+    Returns None for nodes that do not produce findings.
+    """
+    if "style_findings" in result:
+        total = 0
+        for finding in result["style_findings"]:
+            output = finding.get("output")
+            if isinstance(output, list):
+                total += len(output)
+            elif isinstance(output, dict):
+                total += sum(len(r.get("messages", [])) for r in output.get("results", []))
+        return total
+
+    if "security_findings" in result:
+        security = result["security_findings"]
+        return len(security.Bandit.results) + len(security.Semgrep.results)
+
+    if "performance_findings" in result:
+        performance = result["performance_findings"]
+        complex_blocks = sum(len(cc_list) for cc_list in performance.radon.cc.values())
+        return complex_blocks + len(performance.xenon_violations)
+
+    return None
+
+
+def track_progress(name: str, node: Callable[[RepoAnalysisState], Any]):
+    """
+    Wrap a workflow node so it reports start/finish transitions, timings and
+    findings counts through the run's progress callback. A cancelled run stops at the
+    next node boundary, so the remaining nodes are skipped.
+    """
 
-    logger.info(f"Cleaning up tmpdir: {state['repo_path']}")
-    shutil.rmtree(state["repo_path"], ignore_errors=True)
-    # return {"markdown_report": f"### Code Review Report\n{markdown}"}
+    @wraps(node)
+    def wrapper(state: RepoAnalysisState):
+        check_cancelled()
+        progress = state.get("progress")
+        if progress is None:
+            result = node(state)
+            check_cancelled()
+            return result
+
+        progress("node_started", node=name)
+        started = time.perf_counter()
+        try:
+            result = node(state)
+        except Exception as e:
+            progress("node_failed", node=name, error=str(e))
+            raise
+        check_cancelled()
+
+        event: dict[str, Any] = {
+            "node": name,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+        if isinstance(result, dict) and (findings := count_findings(result)) is not None:
+            event["findings"] = findings
+        progress("node_finished", **event)
+
+        return result
+
+    return wrapper
 
 
 def build_workflow() -> CompiledStateGraph:
@@ -97,12 +177,12 @@ def build_workflow() -> CompiledStateGraph:
     """
     workflow = StateGraph(RepoAnalysisState)
 
-    workflow.add_node("auditor", auditor_agent)
-    workflow.add_node("style", style_agent)
-    workflow.add_node("security", security_agent)
-    workflow.add_node("performance", performance_agent)
-    workflow.add_node("resolver", conflict_resolver)
-    workflow.add_node("explainer", explainer_agent)
+    workflow.add_node("auditor", track_progress("auditor", auditor_agent))
+    workflow.add_node("style", track_progress("style", style_agent))
+    workflow.add_node("security", track_progress("security", security_agent))
+    workflow.add_node("performance", track_progress("performance", performance_agent))
+    workflow.add_node("resolver", track_progress("resolver", conflict_resolver))
+    workflow.add_node("explainer", track_progress("explainer", explainer_agent))
 
     workflow.set_entry_point("auditor")
     workflow.add_edge("auditor", "style")
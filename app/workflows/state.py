@@ -1,4 +1,5 @@
 import operator
+from collections.abc import Callable
 from typing import Annotated, TypedDict, Any
 
 from app.agents.auditor_agent import Files
@@ -9,10 +10,14 @@ from langchain_openai import AzureChatOpenAI
 
 class RepoAnalysisState(TypedDict):
     llm: AzureChatOpenAI
+    progress: Callable[..., None] | None
     log_all_audits: bool
     repo_path: str
     files: Files
     style_findings: Annotated[list[dict], operator.add]
+    # "<tool>: <reason>" for every analyzer that failed or was skipped; the report of such
+    # a run is incomplete, so it is not reused for later runs of the same commit
+    tool_failures: Annotated[list[str], operator.add]
     security_findings: SecurityFindings
     performance_findings: PerformanceFindings
     merged_findings: list[dict[str, Any]] | None
@@ -0,0 +1,97 @@
+"""
+Walk rate of AuditorAgent.generate_dir_metadata in files/sec.
+
+    python -m benchmarks.auditor_walk                  # synthetic 200k-file monorepo
+    python -m benchmarks.auditor_walk --files 50000
+    python -m benchmarks.auditor_walk --git            # synthetic tree committed to git
+    python -m benchmarks.auditor_walk --path ~/src/some-checkout
+
+A bare os.walk over the same tree is timed as well, as the floor the auditor's own
+per-entry work is measured against.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from app.agents.auditor_agent import AuditorAgent
+
+EXTENSIONS = [".py", ".ts", ".js", ".json", ".md", ".png", ".pyc", ".gen.ts", ".log"]
+
+
+def build_tree(root: Path, files: int, per_dir: int = 50) -> None:
+    """A monorepo-shaped tree: packages of nested dirs, .gitignores and vendored deps."""
+    (root / ".gitignore").write_text("*.log\ncoverage/\n/generated/\n")
+    for i in range(files):
+        package, rest = divmod(i, per_dir * 20)
+        directory = root / f"packages/pkg{package}/src/mod{rest // per_dir}"
+        if i % per_dir == 0:
+            directory.mkdir(parents=True, exist_ok=True)
+        if rest == 0:
+            (root / f"packages/pkg{package}/.gitignore").write_text("*.gen.ts\n!index.gen.ts\n")
+            (root / f"packages/pkg{package}/node_modules/dep").mkdir(parents=True)
+        (directory / f"file{i}{EXTENSIONS[i % len(EXTENSIONS)]}").touch()
+
+
+def commit_tree(root: Path) -> None:
+    """Make the tree a git checkout, so the auditor reads the index instead of walking."""
+    for args in (["init", "-q"], ["add", "-A"], ["commit", "-qm", "bench"]):
+        subprocess.run(
+            ["git", "-c", "user.name=bench", "-c", "user.email=bench@localhost", *args],
+            cwd=root,
+            check=True,
+        )
+
+
+def count_files(path: Path) -> int:
+    return sum(len(files) for _, _, files in os.walk(path))
+
+
+def bench(path: Path, repeat: int) -> None:
+    total = count_files(path)
+
+    walk = min(_timed(lambda: sum(1 for _ in os.walk(path))) for _ in range(repeat))
+
+    def audit():
+        with contextlib.redirect_stdout(io.StringIO()):
+            AuditorAgent(str(path)).generate_dir_metadata()
+
+    auditor = min(_timed(audit) for _ in range(repeat))
+
+    print(f"{total} files under {path}")
+    print(f"os.walk:            {walk:7.3f}s  {total / walk:>12,.0f} files/sec")
+    print(f"AuditorAgent walk:  {auditor:7.3f}s  {total / auditor:>12,.0f} files/sec")
+
+
+def _timed(fn) -> float:
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--path", type=Path, help="benchmark an existing checkout instead")
+    parser.add_argument("--files", type=int, default=200_000, help="size of the synthetic tree")
+    parser.add_argument("--git", action="store_true", help="commit the synthetic tree to git")
+    parser.add_argument("--repeat", type=int, default=3, help="best of N runs")
+    args = parser.parse_args()
+
+    if args.path is not None:
+        bench(args.path, args.repeat)
+        return
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        build_tree(Path(tmpdir), args.files)
+        if args.git:
+            commit_tree(Path(tmpdir))
+        bench(Path(tmpdir), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Memory held by the auditor's Files, the old lists and dicts against the DirTree columns.
+
+    python -m benchmarks.dir_tree_memory                  # synthetic 300k-entry monorepo
+    python -m benchmarks.dir_tree_memory --entries 1000000
+    python -m benchmarks.dir_tree_memory --path ~/src/some-checkout
+
+Both layouts are built from the same manifest and measured whole: the directory tree,
+the analyzers' path lists and the path -> blob id lookup, with the path index the first
+lookup builds.
+"""
+
+import argparse
+import gc
+import os
+import time
+import tracemalloc
+from pathlib import Path
+
+from app.agents.auditor_agent import JS_TS_SUFFIXES, PY_SUFFIXES, AuditorAgent, Files
+from app.utils.manifest import FileEntry, git_manifest, scan_manifest
+
+ROOT_PATH = "/tmp/marcai-workspace/repo"
+
+
+def synthetic_manifest(entries: int, per_dir: int = 50) -> list[FileEntry]:
+    """Files of a monorepo-shaped tree: packages of nested modules, git-style blob ids."""
+    extensions = [".py", ".ts", ".tsx", ".js", ".json", ".md"]
+    manifest = []
+    for i in range(entries):
+        package, rest = divmod(i, per_dir * 20)
+        path = f"packages/pkg{package}/src/mod{rest // per_dir}/file{i}{extensions[i % 6]}"
+        manifest.append(FileEntry(path, 1000 + i % 5000, f"{i + 1:040x}"))
+    return manifest
+
+
+def build_old_files(root: str, manifest: list[FileEntry]) -> dict:
+    """
+    What the auditor used to keep in the workflow state: a list of dicts for the tree, the
+    path lists handed to the analyzers and the path -> blob id dict.
+    """
+    tree: list[dict] = []
+    all_paths: list[str] = []
+    js_ts_paths: list[str] = []
+    py_paths: list[str] = []
+    blob_shas: dict[str, str] = {}
+    seen = {""}
+    for entry in manifest:
+        directory, _, name = entry.path.rpartition("/")
+        missing = []
+        while directory not in seen:
+            seen.add(directory)
+            missing.append(directory)
+            directory = directory.rpartition("/")[0]
+        for path in reversed(missing):
+            tree.append(
+                {
+                    "name": path.rpartition("/")[2],
+                    "path": os.path.join(root, path),
+                    "type": "directory",
+                }
+            )
+        tree.append(
+            {
+                "name": name,
+                "path": os.path.join(root, entry.path),
+                "size": entry.size,
+                "type": "file",
+                "sha": entry.sha,
+            }
+        )
+        all_paths.append(entry.path)
+        suffix = os.path.splitext(name)[1]
+        if suffix in JS_TS_SUFFIXES:
+            js_ts_paths.append(entry.path)
+        elif suffix in PY_SUFFIXES:
+            py_paths.append(entry.path)
+        if entry.sha is not None:
+            blob_shas[entry.path] = entry.sha
+    return {
+        "dir_tree": tree,
+        "all_paths": all_paths,
+        "js_ts_paths": js_ts_paths,
+        "py_paths": py_paths,
+        "blob_shas": blob_shas,
+    }
+
+
+def build_files(root: str, manifest: list[FileEntry]) -> Files:
+    auditor = AuditorAgent(root)
+    auditor._load_index(manifest)
+    files = auditor.files
+    # The analyzers' first blob id lookup builds the tree's path index
+    files.blob_shas.get(manifest[0].path)
+    return files
+
+
+def measure(build, root: str, load_manifest) -> tuple[object, int]:
+    """
+    The structure and the bytes it holds once built. The manifest is
+    loaded inside the measurement and dropped afterwards, as in the auditor, so strings
+    the structure keeps from it are counted.
+    """
+    gc.collect()
+    tracemalloc.start()
+    manifest = load_manifest()
+    structure = build(root, manifest)
+    del manifest
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return structure, held
+
+
+def bench(root: str, load_manifest) -> None:
+    old, old_bytes = measure(build_old_files, root, load_manifest)
+    files, new_bytes = measure(build_files, root, load_manifest)
+    assert len(old["dir_tree"]) == len(files.dir_tree)
+    assert old["py_paths"] == files.py_paths
+
+    shas = files.blob_shas
+    assert all(shas.get(path) == sha for path, sha in old["blob_shas"].items())
+
+    started = time.perf_counter()
+    paths = files.all_paths
+    for path in paths:
+        shas.get(path)
+    lookups = time.perf_counter() - started
+
+    print(f"{len(paths)} files, {len(files.dir_tree)} entries")
+    print(f"lists and dicts: {old_bytes / 1024**2:8.1f} MiB")
+    print(f"Files (DirTree): {new_bytes / 1024**2:8.1f} MiB, {old_bytes / new_bytes:.1f}x smaller")
+    print(f"all_paths and a blob id lookup per file: {lookups:.2f}s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--path", type=Path, help="use the files of an existing checkout")
+    parser.add_argument("--entries", type=int, default=300_000, help="files in the synthetic tree")
+    args = parser.parse_args()
+
+    if args.path is not None:
+        bench(
+            str(args.path),
+            lambda: git_manifest(args.path) or list(scan_manifest(args.path)),
+        )
+    else:
+        bench(ROOT_PATH, lambda: synthetic_manifest(args.entries))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import subprocess
+
+import pytest
+
+
+def git(*args, cwd=None):
+    return subprocess.run(
+        ["git", *args], cwd=cwd, check=True, capture_output=True, text=True
+    ).stdout.strip()
+
+
+def commit_files(repo, files, message="commit"):
+    """Write `files` ({path: content}) into `repo` and commit them; returns the new HEAD."""
+    for name, content in files.items():
+        (repo / name).parent.mkdir(parents=True, exist_ok=True)
+        (repo / name).write_text(content)
+    git("add", "-A", cwd=repo)
+    git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", message, cwd=repo)
+    return git("rev-parse", "HEAD", cwd=repo)
+
+
+def init_repo(path, files):
+    """A repository at `path` with `files` committed on main; partial clones may filter it."""
+    path.mkdir(parents=True, exist_ok=True)
+    git("init", "-q", "-b", "main", cwd=path)
+    git("config", "uploadpack.allowFilter", "true", cwd=path)
+    return commit_files(path, files, "init")
+
+
+@pytest.fixture
+def origin(tmp_path):
+    repo = tmp_path / "origin"
+    init_repo(repo, {"app.py": "print('v1')\n"})
+    return repo
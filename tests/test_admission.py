@@ -0,0 +1,108 @@
+import pytest
+
+from app.models.jobs import RunRecord
+from app.models.requests import RepoRequest
+from app.services.admission import AdmissionController, AdmissionRejectedError, TokenBucket
+from app.services.job_queue import JobQueue
+from app.services.queue_backend import SQLiteQueueBackend
+
+
+async def noop(record: RunRecord) -> None:
+    pass
+
+
+async def submit(queue: JobQueue, name: str, admit=None) -> RunRecord:
+    record, _ = await queue.submit(
+        RepoRequest.model_validate({"repo_url": f"https://github.com/acme/{name}.git"}),
+        admit=admit,
+    )
+    return record
+
+
+def test_token_bucket_limits_each_client_separately():
+    bucket = TokenBucket(rate=0.5, burst=2)
+
+    assert bucket.take("a") == 0
+    assert bucket.take("a") == 0
+    assert bucket.take("a") == pytest.approx(2.0, abs=0.01)
+    assert bucket.take("b") == 0
+
+
+async def test_rejects_when_queue_is_full_with_drain_based_retry_after():
+    queue = JobQueue(runner=noop)
+    controller = AdmissionController(queue, max_queue_depth=2)
+
+    await controller.admit("client")
+    await submit(queue, "a")
+    await submit(queue, "b")
+
+    with pytest.raises(AdmissionRejectedError) as rejected:
+        await controller.admit("client")
+    assert rejected.value.retry_after == AdmissionController.DEFAULT_RETRY_AFTER
+
+    # Two runs finished in the last 15 minutes: one slot frees up every 450s
+    for _ in range(2):
+        record = queue.backend.claim("w", lease_seconds=60)
+        queue.backend.finish(record, "w")
+    await submit(queue, "c")
+    await submit(queue, "d")
+
+    with pytest.raises(AdmissionRejectedError) as rejected:
+        await controller.admit("client", runs=2)
+    assert rejected.value.retry_after == 900
+
+
+async def test_rate_limit_and_resource_watermarks():
+    queue = JobQueue(runner=noop)
+
+    limited = AdmissionController(queue, max_queue_depth=10, rate_limit=TokenBucket(1, 1))
+    await limited.admit("client")
+    with pytest.raises(AdmissionRejectedError, match="Rate limit"):
+        await limited.admit("client")
+
+    low_disk = AdmissionController(queue, max_queue_depth=10, min_free_disk_bytes=1 << 62)
+    with pytest.raises(AdmissionRejectedError, match="disk"):
+        await low_disk.admit("client")
+
+
+def test_token_buckets_are_shared_through_the_backend(tmp_path, monkeypatch):
+    # Two API processes with the same queue database enforce one limit. The clock is
+    # frozen so no tokens are refilled between the takes
+    monkeypatch.setattr("app.services.queue_backend.time.time", lambda: 1_000_000.0)
+    first = TokenBucket(rate=0.5, burst=2, backend=SQLiteQueueBackend(tmp_path / "q.sqlite3"))
+    second = TokenBucket(rate=0.5, burst=2, backend=SQLiteQueueBackend(tmp_path / "q.sqlite3"))
+
+    assert first.take("a") == 0
+    assert second.take("a") == 0
+    assert first.take("a") == 2.0
+    assert second.take("b") == 0
+
+
+async def test_watermarks_apply_to_the_workers_reports():
+    queue = JobQueue(runner=noop)
+    controller = AdmissionController(queue, max_queue_depth=10, min_free_disk_bytes=1 << 30)
+
+    queue.backend.report_resources("worker-1", 4 << 30, 50.0)
+    await controller.admit("client")
+
+    queue.backend.report_resources("worker-2", 1 << 20, 50.0)
+    with pytest.raises(AdmissionRejectedError, match="disk"):
+        await controller.admit("client")
+
+
+async def test_coalesced_submissions_skip_admission():
+    queue = JobQueue(runner=noop)
+    controller = AdmissionController(queue, max_queue_depth=1)
+
+    async def admit() -> None:
+        await controller.admit("client")
+
+    request = RepoRequest.model_validate({"repo_url": "https://github.com/acme/a.git"})
+    first, created = await queue.submit(request, admit=admit)
+    assert created
+
+    # The queue is full, but a duplicate adds nothing to it
+    duplicate, created = await queue.submit(request, admit=admit)
+    assert not created and duplicate.run_id == first.run_id
+    with pytest.raises(AdmissionRejectedError, match="Queue is full"):
+        await submit(queue, "b", admit)
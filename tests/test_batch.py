@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+
+from app.models.jobs import RunRecord
+from app.models.report import ConsolidatedReport
+from app.models.requests import BatchRequest
+from app.services.batch_service import BatchScheduler
+from app.services.job_queue import JobQueue
+from app.services.queue_backend import SQLiteQueueBackend
+from app.services.report_store import ReportStore
+
+
+@pytest.mark.asyncio
+async def test_batch_respects_parallelism_and_summarizes(tmp_path):
+    store = ReportStore(tmp_path / "reports.sqlite3")
+    release = asyncio.Event()
+    running = 0
+    peak = 0
+
+    async def runner(record: RunRecord) -> None:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await release.wait()
+        running -= 1
+        if record.repo_url.endswith("broken.git"):
+            raise RuntimeError("clone failed")
+        store.save(
+            ConsolidatedReport(
+                run_id=record.run_id,
+                repo_url=record.repo_url,
+                metadata={"findings_count": {"style": 2, "security": 1}},
+            )
+        )
+
+    queue = JobQueue(runner=runner, max_concurrent_runs=4)
+    scheduler = BatchScheduler(queue, store, max_parallelism=8)
+    await queue.start()
+    try:
+        names = ["a", "b", "c", "broken", "d"]
+        batch = await scheduler.submit(
+            BatchRequest.model_validate(
+                {
+                    "requests": [{"repo_url": f"https://github.com/acme/{n}.git"} for n in names],
+                    "parallelism": 2,
+                }
+            )
+        )
+        await asyncio.sleep(0.01)
+
+        progress = await scheduler.progress(batch)
+        assert progress["states"]["running"] == 2
+        assert progress["states"]["pending"] == 3
+
+        release.set()
+        for _ in range(50):
+            await asyncio.sleep(0.01)
+            if batch.finished_at is not None:
+                break
+
+        assert peak == 2
+        summary = await scheduler.summary(batch)
+        assert summary["progress"] == 1
+        assert summary["states"]["completed"] == 4
+        assert summary["states"]["failed"] == 1
+        assert summary["findings_count"] == {"style": 8, "security": 4}
+        assert summary["runs"][3]["error"] == "clone failed"
+    finally:
+        await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_batch_is_shared_and_resumed_by_another_process(tmp_path):
+    db_path = tmp_path / "queue.sqlite3"
+    store = ReportStore(tmp_path / "reports.sqlite3")
+    executed: list[str] = []
+
+    async def runner(record: RunRecord) -> None:
+        executed.append(record.repo_url)
+        await asyncio.sleep(0.05)
+
+    worker = JobQueue(runner, backend=SQLiteQueueBackend(db_path), poll_interval=0.02)
+    first_api = BatchScheduler(
+        JobQueue(runner, backend=SQLiteQueueBackend(db_path), poll_interval=0.02),
+        store,
+        max_parallelism=1,
+        lease_seconds=0.3,
+    )
+    second_api = BatchScheduler(
+        JobQueue(runner, backend=SQLiteQueueBackend(db_path), poll_interval=0.02),
+        store,
+        max_parallelism=1,
+        lease_seconds=0.3,
+    )
+    second_api.feeder_id = "second"
+
+    names = ["a", "b", "c"]
+    await worker.start()
+    try:
+        batch = await first_api.submit(
+            BatchRequest.model_validate(
+                {"requests": [{"repo_url": f"https://github.com/acme/{n}.git"} for n in names]}
+            )
+        )
+        assert (await second_api.get(batch.batch_id)).total == 3
+
+        # The first API process goes away mid-batch; the second one picks the batch up
+        await asyncio.sleep(0.01)
+        await first_api.stop()
+        await second_api.start()
+        for _ in range(200):
+            await asyncio.sleep(0.02)
+            stored = await second_api.get(batch.batch_id)
+            if stored.finished_at is not None:
+                break
+
+        assert stored.finished_at is not None
+        assert sorted(executed) == [f"https://github.com/acme/{n}.git" for n in names]
+        assert (await second_api.progress(stored))["states"]["completed"] == 3
+    finally:
+        await second_api.stop()
+        await worker.stop()
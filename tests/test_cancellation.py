@@ -0,0 +1,145 @@
+import asyncio
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from app.models.jobs import RunRecord, RunState
+from app.models.requests import RepoRequest
+from app.services.job_queue import JobQueue
+from app.utils.cancellation import (
+    CancelScope,
+    RunCancelled,
+    check_cancelled,
+    current_scope,
+    run_in_thread,
+)
+from app.utils.subprocess_runner import run_safe_subprocess
+
+
+def is_alive(pid: int) -> bool:
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text()
+    except FileNotFoundError:
+        return False
+    return stat.rsplit(")", 1)[1].split()[0] != "Z"
+
+
+def make_request(name: str) -> RepoRequest:
+    return RepoRequest.model_validate({"repo_url": f"https://github.com/acme/{name}.git"})
+
+
+def test_cancel_kills_the_whole_process_group(tmp_path):
+    pid_file = tmp_path / "child.pid"
+    scope = CancelScope("run_1")
+    outcome: list[object] = []
+
+    def target():
+        current_scope.set(scope)
+        try:
+            run_safe_subprocess(["sh", "-c", f"sleep 30 & echo $! > {pid_file}; wait"])
+        except RunCancelled as e:
+            outcome.append(e)
+
+    thread = threading.Thread(target=target)
+    started = time.monotonic()
+    thread.start()
+    while not pid_file.exists() or not pid_file.read_text().strip():
+        time.sleep(0.01)
+
+    scope.cancel()
+    thread.join(timeout=5)
+
+    assert time.monotonic() - started < 5
+    assert isinstance(outcome[0], RunCancelled)
+    assert not is_alive(int(pid_file.read_text()))
+
+
+@pytest.mark.asyncio
+async def test_cancel_running_and_queued_runs(tmp_path):
+    workspace_removed = asyncio.Event()
+    spawned = asyncio.Event()
+
+    async def runner(record: RunRecord) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+            loop.call_later(0.05, spawned.set)
+            await asyncio.to_thread(run_safe_subprocess, ["sleep", "30"])
+        finally:
+            workspace_removed.set()
+
+    queue = JobQueue(runner=runner, max_concurrent_runs=1)
+    await queue.start()
+    try:
+        running, _ = await queue.submit(make_request("a"))
+        queued, _ = await queue.submit(make_request("b"))
+        await spawned.wait()
+
+        assert (await queue.cancel(queued.run_id)).state == RunState.CANCELLED
+        assert (await queue.get(running.run_id)).state == RunState.RUNNING
+
+        await queue.cancel(running.run_id)
+        final = await asyncio.wait_for(queue.wait(running.run_id), timeout=5)
+
+        assert final.state == RunState.CANCELLED
+        assert workspace_removed.is_set()
+        assert (await queue.get(queued.run_id)).state == RunState.CANCELLED
+    finally:
+        await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_run_ends_only_once_its_thread_has_unwound():
+    thread_done = threading.Event()
+    started = threading.Event()
+
+    def analyze() -> None:
+        # Python code between cancellation checks keeps running after the task is cancelled
+        started.set()
+        try:
+            while True:
+                time.sleep(0.05)
+                check_cancelled()
+        finally:
+            time.sleep(0.1)
+            thread_done.set()
+
+    async def runner(record: RunRecord) -> None:
+        await run_in_thread(analyze)
+
+    queue = JobQueue(runner=runner, max_concurrent_runs=1)
+    await queue.start()
+    try:
+        running, _ = await queue.submit(make_request("a"))
+        await asyncio.to_thread(started.wait, 5)
+
+        await queue.cancel(running.run_id)
+        final = await asyncio.wait_for(queue.wait(running.run_id), timeout=5)
+
+        assert final.state == RunState.CANCELLED
+        assert thread_done.is_set()
+    finally:
+        await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_stopping_the_queue_requeues_runs_after_they_unwind():
+    started = threading.Event()
+
+    def analyze() -> None:
+        started.set()
+        while True:
+            time.sleep(0.05)
+            check_cancelled()
+
+    async def runner(record: RunRecord) -> None:
+        await run_in_thread(analyze)
+
+    queue = JobQueue(runner=runner, max_concurrent_runs=1)
+    await queue.start()
+    running, _ = await queue.submit(make_request("a"))
+    await asyncio.to_thread(started.wait, 5)
+
+    await asyncio.wait_for(queue.stop(), timeout=5)
+    assert (await queue.get(running.run_id)).state == RunState.QUEUED
@@ -0,0 +1,91 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+
+from app.utils.dir_tree import ROOT, DirEntry, DirTree
+
+
+def test_entries_are_rebuilt_from_the_columns():
+    tree = DirTree("/repo")
+    src = tree.add_directory(ROOT, "src")
+    tree.add_file(ROOT, "README.md", 10)
+    pkg = tree.add_directory(src, "pkg")
+    tree.add_file(pkg, "__init__.py", 0, "e69de29bb2d1d6434b8b29ae775ad8c2e48c5391")
+    tree.add_file(src, "__init__.py", 3)
+
+    assert len(tree) == 5
+    assert [(e.path, e.type, e.size) for e in tree] == [
+        ("/repo/src", "directory", None),
+        ("/repo/README.md", "file", 10),
+        ("/repo/src/pkg", "directory", None),
+        ("/repo/src/pkg/__init__.py", "file", 0),
+        ("/repo/src/__init__.py", "file", 3),
+    ]
+    assert tree[3] == DirEntry(
+        "__init__.py",
+        "/repo/src/pkg/__init__.py",
+        "file",
+        0,
+        "e69de29bb2d1d6434b8b29ae775ad8c2e48c5391",
+    )
+
+
+def test_find_by_relative_path():
+    tree = DirTree("/repo")
+    web = tree.add_directory(ROOT, "web")
+    tree.add_file(web, "index.ts", 42)
+
+    assert tree.find("web/index.ts").size == 42
+    assert tree.find("web").type == "directory"
+    assert tree.find("index.ts") is None
+    assert tree.find("web/missing.ts") is None
+
+    # Entries appended after the first lookup are found as well
+    tree.add_file(ROOT, "index.ts", 7)
+    assert tree.find("index.ts").path == "/repo/index.ts"
+
+
+def test_file_paths_and_blob_shas_come_from_the_columns():
+    tree = DirTree("/repo")
+    src = tree.add_directory(ROOT, "src")
+    tree.add_file(src, "app.py", 5, "a" * 40)
+    tree.add_file(src, "ui.ts", 6, "b" * 40)
+    tree.add_file(ROOT, "notes.txt", 7)  # Scanned, not read from the index
+
+    assert tree.file_paths() == ["src/app.py", "src/ui.ts", "notes.txt"]
+    assert tree.file_paths({".py"}) == ["src/app.py"]
+
+    shas = tree.blob_shas
+    assert shas["src/app.py"] == "a" * 40
+    assert shas.get("notes.txt") is None
+    assert shas.get("src") is None
+    assert dict(shas.items()) == {"src/app.py": "a" * 40, "src/ui.ts": "b" * 40}
+
+
+def test_lookup_survives_checksum_collisions():
+    # "plumless" and "buckeroo" have the same CRC-32
+    tree = DirTree("/repo")
+    tree.add_file(ROOT, "plumless", 1)
+    tree.add_file(ROOT, "buckeroo", 2)
+
+    assert tree.find("plumless").size == 1
+    assert tree.find("buckeroo").size == 2
+
+
+def test_concurrent_first_lookups_see_a_complete_index():
+    tree = DirTree("/repo")
+    for i in range(2000):
+        directory = tree.add_directory(ROOT, f"pkg{i}")
+        tree.add_file(directory, "mod.py", i, f"{i + 1:040x}")
+    # Every thread hits the still-unbuilt index at once, like the agents after the audit
+    barrier = Barrier(8)
+
+    def look_up(worker: int) -> list[str | None]:
+        barrier.wait()
+        shas = tree.blob_shas
+        return [shas.get(f"pkg{i}/mod.py") for i in range(worker, 2000, 8)]
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(look_up, range(8)))
+
+    for worker, shas in enumerate(results):
+        assert shas == [f"{i + 1:040x}" for i in range(worker, 2000, 8)]
@@ -0,0 +1,76 @@
+import sys
+
+from app.agents import style_agent
+from app.agents.style_agent import StyleAgent
+from app.utils.eslint_daemon import EslintDaemonError
+from app.utils.eslint_toolchain import FALLBACK_CONFIG_NAME, eslint_bin
+
+# Stands in for ESLint: a config that imports ESM fails to load, like under NODE_PATH;
+# each result names the config the file was linted with
+FAKE_ESLINT = """#!{python}
+import json, os, sys
+
+args = sys.argv[1:]
+config = args[args.index("--config") + 1] if "--config" in args else None
+if config is None and "import " in open("eslint.config.js").read():
+    sys.exit("SyntaxError: Cannot use import statement outside a module")
+if "--print-config" in args:
+    print("{{}}")
+    sys.exit(0)
+files = [arg for arg in args if arg.endswith(".js") and arg != config]
+results = [
+    {{"filePath": os.path.abspath(f), "messages": [], "source": config or "own"}}
+    for f in files
+]
+print(json.dumps({{"results": results, "metadata": {{}}}}))
+"""
+
+
+def lint(tmp_path, monkeypatch, config_source):
+    toolchain = tmp_path / "toolchain"
+    eslint = eslint_bin(toolchain)
+    eslint.parent.mkdir(parents=True)
+    eslint.write_text(FAKE_ESLINT.format(python=sys.executable))
+    eslint.chmod(0o755)
+    monkeypatch.setattr(style_agent, "ensure_eslint_toolchain", lambda: toolchain)
+    # Counts the batches offered to the daemon, then lets eslint run directly
+    daemon_batches = []
+
+    class Daemon:
+        def lint(self, cwd, files, config):
+            daemon_batches.append(files)
+            raise EslintDaemonError("stopped")
+
+    monkeypatch.setattr(style_agent, "get_eslint_daemon", lambda toolchain: Daemon())
+    monkeypatch.setattr("app.utils.finding_cache.settings.FINDING_CACHE_ENABLED", False)
+
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "eslint.config.js").write_text(config_source)
+    (repo / "index.js").write_text("let x = 1\n")
+    findings = StyleAgent(str(repo), js_ts_files=1, py_files=0, js_ts_paths=["index.js"]).run()
+    (result,) = findings[0]["output"]["results"]
+    return result["source"], toolchain, daemon_batches
+
+
+def test_own_config_is_used_when_it_loads(tmp_path, monkeypatch):
+    source, _, daemon_batches = lint(
+        tmp_path, monkeypatch, 'module.exports = [require("globals")];\n'
+    )
+    assert source == "own"
+    # Code from the repository never runs in the shared workers
+    assert daemon_batches == []
+
+
+def test_esm_config_falls_back_to_the_toolchain_config(tmp_path, monkeypatch):
+    config = 'import tsParser from "@typescript-eslint/parser";\nexport default [];\n'
+    source, toolchain, daemon_batches = lint(tmp_path, monkeypatch, config)
+    assert source == str(toolchain / FALLBACK_CONFIG_NAME)
+    assert daemon_batches == [["index.js"]]
+
+
+def test_missing_toolchain_is_recorded_as_a_failure(tmp_path, monkeypatch):
+    monkeypatch.setattr(style_agent, "ensure_eslint_toolchain", lambda: None)
+    agent = StyleAgent(str(tmp_path), js_ts_files=1, py_files=0, js_ts_paths=["index.js"])
+    assert agent.run() == []
+    assert agent.failures == ["eslint: toolchain unavailable"]
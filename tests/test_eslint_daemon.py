@@ -0,0 +1,71 @@
+import os
+import re
+import signal
+from pathlib import Path
+
+from app.utils.eslint_daemon import EslintDaemon
+from app.utils.tool_limits import limits_for
+
+
+def make_daemon(tmp_path, max_rss_bytes=1024**3):
+    # A toolchain without ESLint: the workers start and answer, every lint fails
+    return EslintDaemon(
+        tmp_path / "toolchain",
+        max_workers=1,
+        max_rss_bytes=max_rss_bytes,
+        request_timeout=30,
+        health_check_seconds=0,
+    )
+
+
+def lint(daemon, tmp_path):
+    with daemon.lint(str(tmp_path), ["a.js"], tmp_path / "eslint.config.js") as result:
+        return result["returncode"], result["stderr"], result["stdout"].read()
+
+
+def test_lint_errors_come_back_like_eslint_stderr(tmp_path):
+    daemon = make_daemon(tmp_path)
+    try:
+        returncode, stderr, stdout = lint(daemon, tmp_path)
+        assert returncode == 2
+        assert "Cannot find module 'eslint'" in stderr
+        assert stdout == b""
+        # The worker passed its health check and was reused
+        lint(daemon, tmp_path)
+        assert [worker.requests for worker in daemon._idle] == [3]
+    finally:
+        daemon.close()
+
+
+def test_dead_and_oversized_workers_are_replaced(tmp_path):
+    daemon = make_daemon(tmp_path)
+    try:
+        lint(daemon, tmp_path)
+        (worker,) = daemon._idle
+        os.kill(worker.process.pid, signal.SIGKILL)
+        worker.process.wait()
+
+        assert lint(daemon, tmp_path)[0] == 2
+        (replacement,) = daemon._idle
+        assert replacement.process.pid != worker.process.pid
+
+        # Past the RSS cap a worker is retired once its batch is done
+        daemon.max_rss_bytes = 1
+        lint(daemon, tmp_path)
+        assert daemon._idle == []
+        assert replacement.process.poll() is not None
+    finally:
+        daemon.close()
+
+
+def test_workers_run_under_the_eslint_limits(tmp_path):
+    daemon = make_daemon(tmp_path)
+    try:
+        lint(daemon, tmp_path)
+        (worker,) = daemon._idle
+        limits = Path(f"/proc/{worker.process.pid}/limits").read_text()
+        cpu_seconds = limits_for(["eslint"]).cpu_seconds
+        assert re.search(rf"Max cpu time\s+{cpu_seconds}\s", limits)
+        assert os.getpriority(os.PRIO_PROCESS, worker.process.pid) >= 10
+    finally:
+        daemon.close()
@@ -0,0 +1,32 @@
+from app.utils.eslint_toolchain import ensure_eslint_toolchain, eslint_bin, toolchain_version
+
+
+def test_prewarmed_toolchain_is_reused_per_lockfile(tmp_path):
+    package_dir = tmp_path / "service"
+    package_dir.mkdir()
+    (package_dir / "package.json").write_text('{"dependencies": {"eslint": "^8.57.0"}}')
+    (package_dir / "package-lock.json").write_text('{"lockfileVersion": 3}')
+
+    root = tmp_path / "toolchains"
+    version = toolchain_version(package_dir)
+    prewarmed = eslint_bin(root / version)
+    prewarmed.parent.mkdir(parents=True)
+    prewarmed.touch()
+
+    assert ensure_eslint_toolchain(root, package_dir) == root / version
+
+    # A lockfile change gets a directory of its own
+    (package_dir / "package-lock.json").write_text('{"lockfileVersion": 3, "packages": {}}')
+    assert toolchain_version(package_dir) != version
+
+
+def test_failed_install_leaves_nothing_behind(tmp_path):
+    # Without a lockfile `npm ci` refuses to install
+    package_dir = tmp_path / "service"
+    package_dir.mkdir()
+    (package_dir / "package.json").write_text("{}")
+    (package_dir / "package-lock.json").write_text("")
+
+    root = tmp_path / "toolchains"
+    assert ensure_eslint_toolchain(root, package_dir) is None
+    assert [path.name for path in root.iterdir()] == [f"{toolchain_version(package_dir)}.lock"]
@@ -0,0 +1,79 @@
+import subprocess
+
+from app.agents.auditor_agent import AuditorAgent
+from app.agents.style_agent import StyleAgent
+from app.utils import finding_cache
+from app.utils.finding_cache import FindingCache, finding_cache_stats
+
+
+def test_lookup_requires_same_blob(tmp_path):
+    cache = FindingCache(tmp_path / "findings.sqlite3", max_bytes=1024**2, ttl_seconds=3600)
+    cache.store("ruff", {"a.py": ("sha-a", [{"code": "F401"}]), "b.py": ("sha-b", [])})
+
+    assert cache.lookup("ruff", {"a.py": "sha-a", "b.py": "sha-b2", "c.py": "sha-c"}) == {
+        "a.py": [{"code": "F401"}]
+    }
+    assert cache.lookup("bandit", {"a.py": "sha-a"}) == {}
+
+
+def test_least_recently_used_results_are_evicted(tmp_path):
+    cache = FindingCache(tmp_path / "findings.sqlite3", max_bytes=700, ttl_seconds=3600)
+    for name in ["a", "b", "c"]:
+        cache.store("ruff", {f"{name}.py": (name, "x" * 100)})
+    cache.lookup("ruff", {"a.py": "a"})
+    cache.store("ruff", {"d.py": ("d", "x" * 100)})
+
+    remaining = cache.lookup("ruff", {f"{n}.py": n for n in "abcd"})
+    assert sorted(remaining) == ["a.py", "c.py", "d.py"]
+
+
+def test_rescan_only_lints_changed_files(tmp_path, monkeypatch):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "a.py").write_text("import os\n")
+    (repo / "b.py").write_text("import sys\n")
+
+    def commit():
+        for args in (
+            ["add", "-A"],
+            ["-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", "c"],
+        ):
+            subprocess.run(["git", *args], cwd=repo, check=True)
+
+    subprocess.run(["git", "init", "-q"], cwd=repo, check=True)
+    commit()
+    monkeypatch.setattr(
+        finding_cache,
+        "_finding_cache",
+        FindingCache(tmp_path / "findings.sqlite3", max_bytes=1024**2, ttl_seconds=3600),
+    )
+
+    def lint():
+        files = AuditorAgent(str(repo)).generate_dir_metadata()
+        stats = {}
+        token = finding_cache_stats.set(stats)
+        try:
+            findings = StyleAgent(
+                str(repo),
+                js_ts_files=0,
+                py_files=files.py_files,
+                py_paths=files.py_paths,
+                blob_shas=files.blob_shas,
+            ).run()
+        finally:
+            finding_cache_stats.reset(token)
+        issues = sorted((i["filename"], i["code"]) for i in findings[0]["output"])
+        return issues, stats["ruff"]
+
+    issues, stats = lint()
+    assert (stats.hits, stats.misses) == (0, 2)
+
+    (repo / "b.py").write_text("import sys\nimport json\n")
+    commit()
+    rescanned, stats = lint()
+    assert (stats.hits, stats.misses) == (1, 1)
+    assert len(rescanned) > len(issues)
+
+    monkeypatch.setattr(finding_cache.settings, "FINDING_CACHE_ENABLED", False)
+    uncached, stats = lint()
+    assert rescanned == uncached
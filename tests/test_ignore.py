@@ -0,0 +1,94 @@
+import fnmatch
+
+from app.agents.auditor_agent import AuditorAgent
+from app.utils.ignore import GitIgnore, IgnoreMatcher
+
+
+def test_builtin_lists_compile_to_equivalent_matcher():
+    matcher = IgnoreMatcher(
+        ignore_dirs=["node_modules", "*.egg-info"],
+        ignore_files=[".DS_Store", "*~"],
+        ignore_patterns=["*.pyc", "__pycache__"],
+        ignore_extensions=[".png"],
+    )
+
+    assert matcher.ignore_dir("node_modules") and matcher.ignore_dir("pkg.egg-info")
+    assert matcher.ignore_dir(".github") and matcher.ignore_dir("__pycache__")
+    assert not matcher.ignore_dir("src")
+
+    assert matcher.ignore_file(".DS_Store") and matcher.ignore_file("main.py~")
+    assert matcher.ignore_file("mod.pyc") and matcher.ignore_file("LOGO.PNG")
+    assert not matcher.ignore_file("main.py") and not matcher.ignore_file(".png")
+
+
+def test_gitignore_semantics():
+    gitignore = GitIgnore(
+        [
+            "# comment",
+            "*.gen.ts",
+            "/secrets.py",
+            "docs/build/",
+            "vendor/**",
+            "**/fixtures/*.json",
+            "!keep.gen.ts",
+        ]
+    )
+
+    assert gitignore.match("a.gen.ts", is_dir=False)
+    assert gitignore.match("src/deep/a.gen.ts", is_dir=False)
+    assert gitignore.match("keep.gen.ts", is_dir=False) is False
+    assert gitignore.match("secrets.py", is_dir=False)
+    assert gitignore.match("src/secrets.py", is_dir=False) is None
+    assert gitignore.match("docs/build", is_dir=True)
+    assert gitignore.match("docs/build", is_dir=False) is None
+    assert gitignore.match("vendor/lib/x.py", is_dir=False)
+    assert gitignore.match("fixtures/a.json", is_dir=False)
+    assert gitignore.match("tests/fixtures/a.json", is_dir=False)
+    assert gitignore.match("main.py", is_dir=False) is None
+
+
+def test_auditor_honors_nested_gitignores(tmp_path):
+    files = {
+        ".gitignore": "generated/\n*.gen.py\n",
+        "app/main.py": "",
+        "app/schema.gen.py": "",
+        "generated/models.py": "",
+        "web/.gitignore": "*.js\n!keep.js\n",
+        "web/index.js": "",
+        "web/keep.js": "",
+        "web/app.ts": "",
+        "node_modules/x/index.js": "",
+    }
+    for name, content in files.items():
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_text(content)
+
+    metadata = AuditorAgent(str(tmp_path)).generate_dir_metadata()
+
+    walked = sorted(
+        entry.path.removeprefix(f"{tmp_path}/")
+        for entry in metadata.dir_tree
+        if entry.type == "file"
+    )
+    assert walked == [".gitignore", "app/main.py", "web/.gitignore", "web/app.ts", "web/keep.js"]
+    assert metadata.py_files == 1 and metadata.js_ts_files == 2
+
+
+def test_glob_patterns_match_like_fnmatch():
+    patterns = ["*.min.js", "*.py", "*~"]
+    matcher = IgnoreMatcher(ignore_dirs=[], ignore_files=[], ignore_patterns=patterns)
+
+    names = ["vendor.min.js", "app.js", "min.js", "main.py", "MAIN.PY", ".py", "a.py~", "py"]
+    for name in names:
+        expected = any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)
+        assert matcher.ignore_file(name) == expected, name
+
+
+def test_auditor_ignore_files_are_globs():
+    # "*~", "*.bak" and "*.swp" match editor backups and swap files by pattern, where
+    # they used to be compared as literal file names
+    matcher = AuditorAgent("/nonexistent").matcher
+
+    assert matcher.ignore_file("main.py~") and matcher.ignore_file("main.py.bak")
+    assert matcher.ignore_file(".main.py.swp") and matcher.ignore_file(".swp")
+    assert not matcher.ignore_file("main.py")
@@ -0,0 +1,173 @@
+import asyncio
+import time
+
+import pytest
+
+from app.models.jobs import RunRecord, RunState
+from app.models.requests import RepoRequest
+from app.services.job_queue import JobQueue
+from app.services.mirror_cache import normalize_repo_url
+from app.services.remote_refs import RemoteRefResolver
+
+
+def make_request(name: str = "repo") -> RepoRequest:
+    return RepoRequest.model_validate({"repo_url": f"https://github.com/acme/{name}.git"})
+
+
+@pytest.mark.asyncio
+async def test_runs_are_bounded_and_fifo():
+    release = asyncio.Event()
+    started: list[str] = []
+
+    async def runner(record: RunRecord) -> None:
+        started.append(record.run_id)
+        await release.wait()
+
+    queue = JobQueue(runner=runner, max_concurrent_runs=1)
+    await queue.start()
+    try:
+        first, _ = await queue.submit(make_request("a"))
+        second, _ = await queue.submit(make_request("b"))
+        third, _ = await queue.submit(make_request("c"))
+        await asyncio.sleep(0.01)
+
+        assert started == [first.run_id]
+        assert (await queue.get(first.run_id)).state == RunState.RUNNING
+        assert (await queue.get(second.run_id)).queue_position == 1
+        assert (await queue.get(third.run_id)).queue_position == 2
+
+        release.set()
+        await asyncio.sleep(0.01)
+
+        assert started == [first.run_id, second.run_id, third.run_id]
+        for run in (first, second, third):
+            assert (await queue.get(run.run_id)).state == RunState.COMPLETED
+    finally:
+        await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_failed_run_records_error():
+    async def runner(record: RunRecord) -> None:
+        raise RuntimeError("clone failed")
+
+    queue = JobQueue(runner=runner, max_concurrent_runs=2)
+    await queue.start()
+    try:
+        record, _ = await queue.submit(make_request())
+        await asyncio.sleep(0.01)
+
+        status = await queue.get(record.run_id)
+        assert status.state == RunState.FAILED
+        assert status.error == "clone failed"
+        assert status.queue_position is None
+    finally:
+        await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_identical_submissions_coalesce_while_in_flight():
+    release = asyncio.Event()
+    runs: list[str] = []
+
+    async def runner(record: RunRecord) -> None:
+        runs.append(record.run_id)
+        await release.wait()
+
+    queue = JobQueue(runner=runner, max_concurrent_runs=1)
+    await queue.start()
+    try:
+        first, created = await queue.submit(make_request("a"))
+        assert created
+        await asyncio.sleep(0.01)
+
+        duplicate, created = await queue.submit(
+            RepoRequest.model_validate({"repo_url": "https://github.com/acme/a"})
+        )
+        assert not created
+        assert duplicate.run_id == first.run_id
+        assert duplicate.duplicates == 1
+
+        _, created = await queue.submit(
+            RepoRequest.model_validate({"repo_url": "https://github.com/acme/a.git", "ref": "dev"})
+        )
+        assert created
+
+        release.set()
+        await asyncio.sleep(0.01)
+
+        # Once the run has finished, a new submission starts a fresh run
+        again, created = await queue.submit(make_request("a"))
+        assert created
+        assert again.run_id != first.run_id
+        await asyncio.sleep(0.01)
+        assert len(runs) == 3
+    finally:
+        await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_refs_of_the_same_commit_coalesce():
+    sha = "a" * 40
+    resolver = RemoteRefResolver(ttl_seconds=60)
+    refs = {"HEAD": sha, "refs/heads/main": sha, "refs/heads/dev": "b" * 40}
+    resolver._refs[normalize_repo_url("https://github.com/acme/a")] = (time.monotonic() + 60, refs)
+
+    async def runner(record: RunRecord) -> None:
+        await asyncio.Event().wait()
+
+    queue = JobQueue(runner=runner, resolver=resolver)
+    try:
+
+        def request(ref):
+            return RepoRequest.model_validate(
+                {"repo_url": "https://github.com/acme/a.git", "ref": ref}
+            )
+
+        first, created = await queue.submit(request(None))
+        assert created
+        for ref in ["main", sha]:
+            duplicate, created = await queue.submit(request(ref))
+            assert not created and duplicate.run_id == first.run_id
+        _, created = await queue.submit(request("dev"))
+        assert created
+    finally:
+        await queue.stop()
+
+
+class SlowResolver:
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def resolve(self, repo_url: str, ref: str | None) -> str:
+        self.calls += 1
+        await self.release.wait()
+        return "a" * 40
+
+
+@pytest.mark.asyncio
+async def test_submit_admits_first_and_bounds_the_ref_lookup():
+    async def runner(record: RunRecord) -> None:
+        await asyncio.Event().wait()
+
+    resolver = SlowResolver()
+    queue = JobQueue(runner=runner, resolver=resolver, resolve_timeout=0.05)
+    try:
+
+        async def refuse() -> None:
+            raise RuntimeError("rejected")
+
+        # Refused submissions never reach the remote
+        with pytest.raises(RuntimeError):
+            await queue.submit(make_request("a"), admit=refuse)
+        assert resolver.calls == 0
+
+        # A slow remote costs the submission resolve_timeout; the run is keyed on the ref
+        first, created = await queue.submit(make_request("a"))
+        assert created and resolver.calls == 1
+        duplicate, created = await queue.submit(make_request("a"), admit=refuse)
+        assert not created and duplicate.run_id == first.run_id
+    finally:
+        resolver.release.set()
+        await queue.stop()
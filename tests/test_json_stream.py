@@ -0,0 +1,53 @@
+import io
+import json
+import sys
+
+import pytest
+
+from app.utils.json_stream import iter_json_array, iter_json_object
+from app.utils.subprocess_runner import run_spooled_subprocess
+
+DOCUMENT = {
+    "errors": [{"message": "bad rule"}],
+    "results": [
+        {"path": f"src/é{i}.py", "line": 123456789 + i, "ok": i % 2 == 0} for i in range(50)
+    ],
+    "paths": {"scanned": ["a.py", "b.py"]},
+    "version": 1.5,
+    "empty": [],
+}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64 * 1024])
+def test_iter_json_object_expands_arrays_across_chunk_boundaries(chunk_size):
+    stream = io.BytesIO(json.dumps(DOCUMENT, indent=2, ensure_ascii=False).encode())
+    members = list(iter_json_object(stream, expand={"results", "empty"}, chunk_size=chunk_size))
+
+    assert [value for key, value in members if key == "results"] == DOCUMENT["results"]
+    assert dict((k, v) for k, v in members if k != "results") == {
+        k: v for k, v in DOCUMENT.items() if k not in ("results", "empty")
+    }
+
+
+def test_iter_json_array_and_bad_input():
+    assert list(iter_json_array(io.BytesIO(b'[1, [2], {"a": 3}]'), chunk_size=2)) == [
+        1,
+        [2],
+        {"a": 3},
+    ]
+    assert list(iter_json_array(io.BytesIO(b""))) == []
+    assert list(iter_json_array(io.BytesIO(b" [ ] "))) == []
+
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_array(io.BytesIO(b"[1, 2")))
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_object(io.BytesIO(b'{"a": 1 "b": 2}')))
+
+
+def test_spooled_subprocess_streams_stdout_from_disk():
+    script = "import json, sys; json.dump([{'n': i} for i in range(20000)], sys.stdout)"
+    with run_spooled_subprocess([sys.executable, "-c", script]) as result:
+        assert result["returncode"] == 0
+        count = sum(1 for item in iter_json_array(result["stdout"]) if "n" in item)
+
+    assert count == 20000
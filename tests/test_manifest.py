@@ -0,0 +1,57 @@
+from app.agents.auditor_agent import AuditorAgent
+from app.utils.manifest import git_manifest, scan_manifest
+from app.utils.sparse_checkout import remove_large_files
+from tests.conftest import git, init_repo
+
+
+def make_repo(path):
+    files = {
+        "app/main.py": "print('hi')\n",
+        "app/with space\nand newline.py": "x = 1\n",
+        "web/index.ts": "export {}\n",
+        "docs/guide.md": "# Guide\n",
+        "assets/big.py": "y = 2\n" * 1000,
+    }
+    init_repo(path, files)
+    return files
+
+
+def test_git_manifest_matches_the_checkout(tmp_path):
+    files = make_repo(tmp_path)
+    git("sparse-checkout", "set", "--no-cone", "*.py", "*.ts", cwd=tmp_path)
+
+    manifest = {entry.path: entry for entry in git_manifest(tmp_path)}
+    scanned = {entry.path: entry.size for entry in scan_manifest(tmp_path)}
+
+    # docs/guide.md is outside the sparse checkout
+    assert sorted(manifest) == sorted(scanned) == sorted(set(files) - {"docs/guide.md"})
+    assert {path: entry.size for path, entry in manifest.items()} == scanned
+    assert manifest["app/main.py"].sha == git("hash-object", "app/main.py", cwd=tmp_path)
+
+    # Removed files drop out of the index view as well
+    assert remove_large_files(tmp_path, max_bytes=1000) == 1
+    assert "assets/big.py" not in {entry.path for entry in git_manifest(tmp_path)}
+    assert git_manifest(tmp_path / "app") is None
+
+
+def test_auditor_reads_the_index(tmp_path):
+    make_repo(tmp_path)
+    metadata = AuditorAgent(str(tmp_path)).generate_dir_metadata()
+
+    files = {e.name: e for e in metadata.dir_tree if e.type == "file"}
+    directories = {e.name for e in metadata.dir_tree if e.type == "directory"}
+    assert files["main.py"].sha == git("hash-object", "app/main.py", cwd=tmp_path)
+    assert files["main.py"].path == str(tmp_path / "app" / "main.py")
+    assert directories == {"app", "web", "docs", "assets"}
+    assert metadata.py_files == 3 and metadata.js_ts_files == 1
+
+
+def test_git_manifest_sizes_do_not_wrap_at_4_gib(tmp_path):
+    make_repo(tmp_path)
+    # Sparse, so it takes no disk space; git's index records sizes in 32 bits
+    with open(tmp_path / "app" / "main.py", "r+b") as f:
+        f.truncate(4 * 1024**3 + 12)
+
+    manifest = {entry.path: entry.size for entry in git_manifest(tmp_path)}
+    assert manifest["app/main.py"] == 4 * 1024**3 + 12
+    assert remove_large_files(tmp_path, max_bytes=1000) == 2
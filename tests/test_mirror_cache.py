@@ -0,0 +1,44 @@
+import pytest
+
+from app.services.mirror_cache import MirrorCache, normalize_repo_url
+from tests.conftest import commit_files, git
+
+
+def test_normalize_repo_url():
+    assert normalize_repo_url("https://GitHub.com/acme/Repo.git/") == "https://github.com/acme/Repo"
+    assert normalize_repo_url("https://user:pw@github.com/acme/repo") == (
+        "https://github.com/acme/repo"
+    )
+
+
+@pytest.mark.asyncio
+async def test_checkout_fetches_updates_incrementally(tmp_path, origin):
+    cache = MirrorCache(tmp_path / "mirrors", max_bytes=10**9)
+
+    first = tmp_path / "ws1"
+    first.mkdir()
+    sha1 = await cache.checkout(str(origin), "main", first)
+    assert (first / "app.py").read_text() == "print('v1')\n"
+
+    sha2 = commit_files(origin, {"app.py": "print('v2')\n"})
+    second = tmp_path / "ws2"
+    second.mkdir()
+    assert await cache.checkout(str(origin), "main", second) == sha2
+    assert sha2 != sha1
+    assert (second / "app.py").read_text() == "print('v2')\n"
+    assert len(list((tmp_path / "mirrors").glob("*.git"))) == 1
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction_keeps_latest_mirror(tmp_path, origin):
+    other = tmp_path / "other"
+    git("clone", "-q", str(origin), str(other))
+
+    cache = MirrorCache(tmp_path / "mirrors", max_bytes=1)
+    for index, repo in enumerate((origin, other)):
+        dest = tmp_path / f"ws{index}"
+        dest.mkdir()
+        await cache.checkout(str(repo), "", dest)
+
+    mirrors = list((tmp_path / "mirrors").glob("*.git"))
+    assert mirrors == [cache._mirror_dir(cache._key(str(other)))]
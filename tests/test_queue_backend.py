@@ -0,0 +1,176 @@
+import asyncio
+from datetime import UTC, datetime
+
+import pytest
+
+from app.models.jobs import BatchRecord, RunRecord, RunState
+from app.models.requests import RepoRequest
+from app.services.event_log import SQLiteEventLog
+from app.services.job_queue import JobQueue
+from app.services.queue_backend import InMemoryQueueBackend, SQLiteQueueBackend
+from app.services.run_events import RunEventBus
+
+
+def make_record(run_id: str) -> RunRecord:
+    return RunRecord(
+        run_id=run_id, repo_url="https://github.com/acme/a.git", submitted_at=datetime.now(UTC)
+    )
+
+
+def test_sqlite_backend_claims_in_order_and_coalesces(tmp_path):
+    backend = SQLiteQueueBackend(tmp_path / "queue.sqlite3")
+
+    first, created = backend.enqueue(make_record("run_1"), "a")
+    assert created and first.queue_position == 1
+    duplicate, created = backend.enqueue(make_record("run_2"), "a")
+    assert not created and duplicate.run_id == "run_1" and duplicate.duplicates == 1
+    backend.enqueue(make_record("run_3"), "b")
+    assert backend.get("run_3").queue_position == 2
+
+    claimed = backend.claim("w1", lease_seconds=60)
+    assert claimed.run_id == "run_1" and claimed.state == RunState.RUNNING
+    assert backend.get("run_3").queue_position == 1
+    assert backend.running() == 1 and backend.depth() == 1
+
+    # Another worker cannot finish a run it does not hold
+    assert not backend.finish(claimed, "w2")
+    assert backend.finish(claimed, "w1")
+    assert backend.get("run_1").state == RunState.COMPLETED
+
+    # Once finished, the dedup key is free again
+    _, created = backend.enqueue(make_record("run_4"), "a")
+    assert created
+
+
+@pytest.mark.parametrize("backend_type", ["memory", "sqlite"])
+def test_get_many_reads_runs_in_chunks(tmp_path, backend_type):
+    if backend_type == "sqlite":
+        backend = SQLiteQueueBackend(tmp_path / "queue.sqlite3")
+    else:
+        backend = InMemoryQueueBackend()
+    backend.enqueue(make_record("run_1"), "a")
+    backend.enqueue(make_record("run_2"), "b")
+    backend.finish(backend.claim("w1", lease_seconds=60), "w1")
+
+    # More ids than one statement binds; unknown ids are left out
+    run_ids = [f"run_missing_{i}" for i in range(1200)] + ["run_2", "run_1"]
+    runs = backend.get_many(run_ids)
+    assert set(runs) == {"run_1", "run_2"}
+    assert runs["run_1"].state == RunState.COMPLETED
+    assert runs["run_2"].state == RunState.QUEUED
+
+
+def test_memory_backend_prunes_finished_runs():
+    backend = InMemoryQueueBackend()
+    for run_id, key in [("run_old", "a"), ("run_new", "b"), ("run_queued", "c")]:
+        backend.enqueue(make_record(run_id), key)
+    old = backend.claim("w1", lease_seconds=60)
+    backend.finish(old, "w1")
+    old.finished_at = datetime(2020, 1, 1, tzinfo=UTC)
+    backend.finish(backend.claim("w1", lease_seconds=60), "w1")
+
+    assert backend.prune(3600) == 1
+    assert backend.get("run_old") is None
+    assert backend.get("run_new").state == RunState.COMPLETED
+    assert backend.get("run_queued").state == RunState.QUEUED
+    assert backend.finished_since(3600) == 1
+
+
+def test_sqlite_backend_recovers_expired_leases(tmp_path):
+    backend = SQLiteQueueBackend(tmp_path / "queue.sqlite3")
+    backend.enqueue(make_record("run_1"), "a")
+
+    backend.claim("dead-worker", lease_seconds=-1)
+    [requeued] = backend.recover(max_attempts=2)
+    assert requeued.state == RunState.QUEUED
+
+    again = backend.claim("w2", lease_seconds=-1)
+    assert again.run_id == "run_1" and again.attempts == 2
+    [failed] = backend.recover(max_attempts=2)
+    assert failed.state == RunState.FAILED
+    assert "stopped responding" in failed.error
+
+
+@pytest.mark.asyncio
+async def test_api_enqueues_and_worker_process_executes(tmp_path):
+    db_path = tmp_path / "queue.sqlite3"
+    executed: list[str] = []
+
+    async def runner(record: RunRecord) -> None:
+        executed.append(record.run_id)
+
+    async def never(record: RunRecord) -> None:
+        raise AssertionError("the API must not execute runs")
+
+    bus = RunEventBus()
+    bus.attach_loop(asyncio.get_running_loop())
+    log = SQLiteEventLog(db_path)
+    api = JobQueue(never, backend=SQLiteQueueBackend(db_path), events=log, poll_interval=0.02)
+    worker = JobQueue(runner, backend=SQLiteQueueBackend(db_path), events=log, poll_interval=0.02)
+
+    # Left over from before the API started: not replayed
+    log.publish("run_old", "completed")
+    relay = asyncio.create_task(log.relay(bus, poll_interval=0.02))
+    await asyncio.sleep(0.05)
+    await worker.start()
+    try:
+        record, _ = await api.submit(
+            RepoRequest.model_validate({"repo_url": "https://github.com/acme/a.git"})
+        )
+        final = await asyncio.wait_for(api.wait(record.run_id), timeout=5)
+        assert final.state == RunState.COMPLETED
+        assert executed == [record.run_id]
+
+        await asyncio.sleep(0.1)
+        assert [e["event"] for e in bus.history(record.run_id)] == [
+            "queued",
+            "running",
+            "completed",
+        ]
+        assert not bus.history("run_old")
+    finally:
+        relay.cancel()
+        await worker.stop()
+
+
+def test_sqlite_backend_cancellation(tmp_path):
+    backend = SQLiteQueueBackend(tmp_path / "queue.sqlite3")
+    backend.enqueue(make_record("run_1"), "a")
+    backend.enqueue(make_record("run_2"), "b")
+
+    claimed = backend.claim("w1", lease_seconds=60)
+    assert backend.cancel("run_2").state == RunState.CANCELLED
+    assert backend.depth() == 0
+
+    # A running run is cancelled by its worker, which polls for the request
+    assert backend.cancel("run_1").state == RunState.RUNNING
+    assert backend.cancel_requested("run_1")
+    assert backend.finish(claimed, "w1", cancelled=True)
+    assert backend.get("run_1").state == RunState.CANCELLED
+
+
+def test_sqlite_backend_batches_are_leased_and_pruned(tmp_path):
+    backend = SQLiteQueueBackend(tmp_path / "queue.sqlite3")
+    record = BatchRecord(
+        batch_id="batch_1",
+        total=1,
+        parallelism=1,
+        run_ids=[None],
+        submitted_at=datetime.now(UTC),
+    )
+    requests = [RepoRequest.model_validate({"repo_url": "https://github.com/acme/a.git"})]
+    backend.add_batch(record, requests, "api1", lease_seconds=60)
+    assert backend.claim_batch("api2", lease_seconds=60) is None
+
+    # The feeder died: its lease runs out and another process takes over
+    record.run_ids = ["run_1"]
+    assert backend.update_batch(record, "api1", lease_seconds=-1)
+    claimed, claimed_requests = backend.claim_batch("api2", lease_seconds=60)
+    assert claimed.run_ids == ["run_1"] and claimed_requests == requests
+    assert not backend.update_batch(record, "api1", lease_seconds=60)
+
+    claimed.finished_at = datetime.now(UTC)
+    assert backend.update_batch(claimed, "api2", lease_seconds=60)
+    assert backend.prune_batches(older_than_seconds=3600) == 0
+    assert backend.prune_batches(older_than_seconds=-1) == 1
+    assert backend.get_batch("batch_1") is None
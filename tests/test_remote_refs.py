@@ -0,0 +1,35 @@
+import pytest
+
+from app.services.remote_refs import RefNotFoundError, RemoteRefResolver, RepositoryNotFoundError
+from tests.conftest import commit_files, git
+
+
+@pytest.mark.asyncio
+async def test_resolves_branches_tags_and_default_head(origin):
+    git("-c", "user.name=t", "-c", "user.email=t@t", "tag", "-a", "v1", "-m", "v1", cwd=origin)
+    resolver = RemoteRefResolver(ttl_seconds=60)
+    head = git("rev-parse", "HEAD", cwd=origin)
+
+    assert await resolver.resolve(str(origin), "") == head
+    assert await resolver.resolve(str(origin), "main") == head
+    assert await resolver.resolve(str(origin), "v1") == head  # peeled annotated tag
+    assert await resolver.resolve(str(origin), head) == head
+
+    with pytest.raises(RefNotFoundError):
+        await resolver.resolve(str(origin), "missing-branch")
+
+
+@pytest.mark.asyncio
+async def test_results_are_cached_within_ttl(origin, tmp_path):
+    resolver = RemoteRefResolver(ttl_seconds=60)
+    first = await resolver.resolve(str(origin), "main")
+
+    commit_files(origin, {"app.py": "print('changed')\n"})
+    assert await resolver.resolve(str(origin), "main") == first
+
+    resolver.ttl_seconds = 0
+    resolver._refs.clear()
+    assert await resolver.resolve(str(origin), "main") != first
+
+    with pytest.raises(RepositoryNotFoundError):
+        await resolver.resolve(str(tmp_path / "nope"), "main")
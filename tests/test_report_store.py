@@ -0,0 +1,54 @@
+import json
+
+from app.models.report import AgentFinding, ConsolidatedReport
+from app.services.report_store import ReportStore
+
+
+def make_report(run_id: str, commit: str = "abc123") -> ConsolidatedReport:
+    return ConsolidatedReport(
+        run_id=run_id,
+        repo_url="https://github.com/acme/repo.git",
+        commit_sha=commit,
+        markdown="# Report",
+        findings=[
+            AgentFinding(agent="style", findings=[{"tool": "ruff", "output": []}]),
+            AgentFinding(agent="performance", findings=[], metadata={"total_functions": 3}),
+        ],
+    )
+
+
+def test_report_roundtrip_and_stream(tmp_path):
+    store = ReportStore(tmp_path / "reports.sqlite3")
+    store.CHUNK_SIZE = 8  # force multi-chunk blob reads
+    report = make_report("run_1")
+    store.save(report)
+
+    streamed = b"".join(store.stream("run_1"))
+    assert json.loads(streamed) == report.model_dump(mode="json")
+    assert store.load("run_1") == report
+    assert store.load("missing") is None
+    assert list(store.stream("missing")) == []
+
+
+def test_headers_of_many_runs(tmp_path):
+    store = ReportStore(tmp_path / "reports.sqlite3")
+    store.save(make_report("run_1"))
+    store.save(make_report("run_2", commit="def456"))
+
+    run_ids = ["run_2", *(f"missing_{i}" for i in range(1200)), "run_1"]
+    headers = store.headers(run_ids)
+    assert set(headers) == {"run_1", "run_2"}
+    assert headers["run_2"] == store.header("run_2")
+    assert "findings" not in headers["run_1"]
+
+
+def test_find_by_repo_and_commit(tmp_path):
+    store = ReportStore(tmp_path / "reports.sqlite3")
+    store.save(make_report("run_1", commit="aaa"))
+    store.save(make_report("run_2", commit="bbb"))
+
+    assert [r["run_id"] for r in store.find(commit_sha="bbb")] == ["run_2"]
+    assert {r["run_id"] for r in store.find(repo_url="https://github.com/acme/repo.git")} == {
+        "run_1",
+        "run_2",
+    }
@@ -0,0 +1,109 @@
+from datetime import UTC, datetime
+
+import pytest
+
+from app.models.jobs import RunRecord
+from app.models.report import ConsolidatedReport
+from app.services.code_review_service import AnalysisRunner
+from app.services.report_store import ReportStore
+from app.services.result_cache import ResultCache, run_cache_key
+from app.utils.toolchain import toolchain_fingerprint
+
+
+def test_cache_key_depends_on_commit_and_toolchain():
+    key = run_cache_key("https://github.com/acme/repo.git", "abc", "tools-v1")
+    assert key == run_cache_key("https://github.com/acme/repo", "abc", "tools-v1")
+    assert key != run_cache_key("https://github.com/acme/repo.git", "def", "tools-v1")
+    assert key != run_cache_key("https://github.com/acme/repo.git", "abc", "tools-v2")
+
+
+def test_lookup_store_and_ttl(tmp_path):
+    cache = ResultCache(tmp_path / "cache.sqlite3", ttl_seconds=3600, max_entries=10)
+    assert cache.lookup("k1") is None
+
+    cache.store("k1", "run_1")
+    assert cache.lookup("k1") == "run_1"
+
+    cache.ttl_seconds = -1
+    assert cache.lookup("k1") is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResultCache(tmp_path / "cache.sqlite3", ttl_seconds=3600, max_entries=2)
+    cache.store("k1", "run_1")
+    cache.store("k2", "run_2")
+    assert cache.lookup("k1") == "run_1"  # k2 becomes least recently used
+
+    cache.store("k3", "run_3")
+    assert cache.lookup("k2") is None
+    assert cache.lookup("k1") == "run_1"
+    assert cache.lookup("k3") == "run_3"
+
+
+class FakeResolver:
+    async def resolve(self, repo_url: str, ref: str | None) -> str:
+        return "abc123"
+
+
+@pytest.mark.asyncio
+async def test_runner_serves_cache_hit_without_cloning(tmp_path):
+    store = ReportStore(tmp_path / "reports.sqlite3")
+    cache = ResultCache(tmp_path / "reports.sqlite3", ttl_seconds=3600, max_entries=10)
+    repo_url = "https://github.com/acme/repo.git"
+
+    store.save(ConsolidatedReport(run_id="run_old", repo_url=repo_url, markdown="# cached"))
+    cache.store(run_cache_key(repo_url, "abc123", toolchain_fingerprint()), "run_old")
+
+    def no_orchestrator():
+        raise AssertionError("workflow must not run on a cache hit")
+
+    runner = AnalysisRunner(
+        orchestrator_factory=no_orchestrator,
+        report_store=store,
+        result_cache=cache,
+        resolver=FakeResolver(),
+    )
+    record = RunRecord(run_id="run_new", repo_url=repo_url, submitted_at=datetime.now(UTC))
+    await runner(record)
+
+    assert record.cached_from == "run_old"
+    assert record.workspace is None
+    report = store.load("run_new")
+    assert report.markdown == "# cached"
+    assert report.metadata == {"cached_from": "run_old"}
+
+
+class FakeOrchestrator:
+    def __init__(self, state: dict):
+        self.state = state
+
+    def run(self, tmpdir, log_all_audit, progress):
+        return self.state
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(("failures", "cached"), [([], True), (["semgrep: exit code 2"], False)])
+async def test_runs_with_failed_analyzers_are_not_cached(tmp_path, failures, cached):
+    store = ReportStore(tmp_path / "reports.sqlite3")
+    cache = ResultCache(tmp_path / "reports.sqlite3", ttl_seconds=3600, max_entries=10)
+    repo_url = "https://github.com/acme/repo.git"
+    state = {"style_findings": [], "tool_failures": failures}
+
+    runner = AnalysisRunner(
+        orchestrator_factory=lambda: FakeOrchestrator(state),
+        report_store=store,
+        result_cache=cache,
+        resolver=FakeResolver(),
+    )
+    record = RunRecord(
+        run_id="run_1",
+        repo_url=repo_url,
+        submitted_at=datetime.now(UTC),
+        commit_sha="abc123",
+        workspace=str(tmp_path),
+    )
+    await runner._analyze(record)
+
+    assert store.load("run_1").metadata["tool_failures"] == failures
+    key = run_cache_key(repo_url, "abc123", toolchain_fingerprint())
+    assert (cache.lookup(key) == "run_1") is cached
@@ -0,0 +1,79 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.services.run_events import RunEventBus, format_sse
+from app.workflows.code_review_workflow import track_progress
+
+
+@pytest.mark.asyncio
+async def test_subscriber_replays_history_and_stops_at_terminal_event():
+    bus = RunEventBus()
+    bus.attach_loop(asyncio.get_running_loop())
+    bus.publish("run_1", "queued")
+
+    received = []
+
+    async def consume():
+        async for event in bus.subscribe("run_1"):
+            received.append(event["event"])
+
+    consumer = asyncio.create_task(consume())
+    await asyncio.sleep(0)
+
+    # Workflow nodes publish from worker threads
+    worker = threading.Thread(target=lambda: bus.publish("run_1", "node_started", node="style"))
+    worker.start()
+    worker.join()
+    await asyncio.sleep(0)
+    bus.publish("run_2", "running")
+    bus.publish("run_1", "completed")
+
+    await asyncio.wait_for(consumer, timeout=1)
+    assert received == ["queued", "node_started", "completed"]
+
+
+@pytest.mark.asyncio
+async def test_events_without_a_loop_are_only_kept_for_replay():
+    bus = RunEventBus()
+    subscription = bus.subscribe("run_1", keepalive=0.01)
+    assert await anext(subscription) is None  # subscribed, nothing published yet
+
+    worker = threading.Thread(target=lambda: bus.publish("run_1", "completed"))
+    worker.start()
+    worker.join()
+    # Nothing reached the subscriber's queue from the worker thread...
+    assert await anext(subscription) is None
+    await subscription.aclose()
+
+    # ...the event is replayed once subscribers are served
+    replay = bus.subscribe("run_1")
+    assert (await anext(replay))["event"] == "completed"
+    await replay.aclose()
+
+
+def test_track_progress_reports_timings_and_findings():
+    events = []
+
+    def style_node(state):
+        return {
+            "style_findings": [{"tool": "ruff", "output": [{"code": "F401"}, {"code": "E711"}]}]
+        }
+
+    node = track_progress("style", style_node)
+    node({"progress": lambda event, **data: events.append((event, data))})
+
+    assert events[0] == ("node_started", {"node": "style"})
+    name, data = events[1]
+    assert name == "node_finished"
+    assert data["node"] == "style"
+    assert data["findings"] == 2
+    assert data["duration_ms"] >= 0
+
+
+def test_format_sse_frames():
+    assert format_sse(None) == b": keepalive\n\n"
+    frame = format_sse({"id": 3, "run_id": "run_1", "event": "completed"}).decode()
+    assert frame.startswith("id: 3\nevent: completed\ndata: ")
+    assert frame.endswith("\n\n")
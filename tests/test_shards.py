@@ -0,0 +1,52 @@
+from contextvars import ContextVar
+
+from app.agents.auditor_agent import AuditorAgent
+from app.agents.performance_agent import PerformanceAgent
+from app.utils.shards import package_roots, run_shards, shard_paths
+
+run_id: ContextVar[str | None] = ContextVar("run_id", default=None)
+
+
+def test_files_are_sharded_by_deepest_package():
+    packages = package_roots(["package.json", "libs/a/pyproject.toml", "libs/a/b/package.json"])
+    assert packages == ["", "libs/a", "libs/a/b"]
+
+    paths = ["main.py", "libs/a/x.py", "libs/a/b/c/y.ts", "libs/a/z.py", "libs/ab/w.py"]
+    assert shard_paths(paths, packages, max_files=10) == [
+        ["main.py", "libs/ab/w.py"],
+        ["libs/a/x.py", "libs/a/z.py"],
+        ["libs/a/b/c/y.ts"],
+    ]
+    assert shard_paths(paths, [""], max_files=2) == [paths[:2], paths[2:4], paths[4:]]
+
+
+def test_shards_keep_their_order_and_the_callers_context():
+    token = run_id.set("run-1")
+    try:
+        results = run_shards(lambda shard: (run_id.get(), shard), [["a"], ["b"], ["c"]])
+    finally:
+        run_id.reset(token)
+    assert results == [("run-1", ["a"]), ("run-1", ["b"]), ("run-1", ["c"])]
+
+
+def test_radon_results_do_not_depend_on_sharding(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.utils.finding_cache.settings.FINDING_CACHE_ENABLED", False)
+    for package in ["svc", "lib"]:
+        (tmp_path / package).mkdir()
+        (tmp_path / package / "requirements.txt").write_text("")
+        for i in range(3):
+            (tmp_path / package / f"m{i}.py").write_text(f"def f{i}(x):\n    return x + {i}\n")
+
+    files = AuditorAgent(str(tmp_path)).generate_dir_metadata()
+    assert files.packages == ["", "lib", "svc"]
+
+    def raw_metrics(packages, max_files):
+        monkeypatch.setattr("app.utils.shards.settings.SHARD_MAX_FILES", max_files)
+        agent = PerformanceAgent(
+            str(tmp_path), py_files=files.py_files, py_paths=files.py_paths, packages=packages
+        )
+        return agent._run_radon_raw()
+
+    sharded = raw_metrics(files.packages, max_files=2)
+    assert list(sharded) == files.py_paths
+    assert sharded == raw_metrics([""], max_files=100)
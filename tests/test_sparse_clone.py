@@ -0,0 +1,85 @@
+import pytest
+
+from app.services.code_review_service import RepoClonerService
+from app.services.mirror_cache import MirrorCache
+from app.utils.sparse_checkout import remove_large_files
+from tests.conftest import commit_files, git, init_repo
+
+
+def checked_out(path):
+    return sorted(
+        str(p.relative_to(path)) for p in path.rglob("*") if p.is_file() and ".git" not in p.parts
+    )
+
+
+@pytest.fixture
+def origin(tmp_path):
+    repo = tmp_path / "origin"
+    files = {
+        "app/main.py": "print('hi')\n",
+        "web/index.ts": "export {}\n",
+        "web/vendor.min.js": "var a;",
+        "web/node_modules/lib/index.js": "var b;",
+        "package.json": "{}\n",
+        "Dockerfile": "FROM python\n",
+        "assets/logo.png": "\x89PNG" * 1000,
+        "data/train.csv": "a,b\n" * 1000,
+        "app/generated.py": "x = 1\n" * 1000,
+    }
+    init_repo(repo, files)
+    return repo
+
+
+EXPECTED = ["Dockerfile", "app/main.py", "package.json", "web/index.ts"]
+
+
+@pytest.mark.asyncio
+async def test_sparse_clone_checks_out_only_analyzable_files(tmp_path, origin):
+    dest = tmp_path / "ws"
+    dest.mkdir()
+    cloner = RepoClonerService(f"file://{origin}", "main", "", sparse=True)
+    await cloner._clone_direct(str(dest))
+
+    assert remove_large_files(dest, max_bytes=1000) == 1
+    assert checked_out(dest) == EXPECTED
+
+    # Blobless: the asset blobs were never downloaded
+    missing = git("rev-list", "--objects", "--missing=print", "HEAD", cwd=dest)
+    assert len([line for line in missing.splitlines() if line.startswith("?")]) >= 4
+
+
+@pytest.mark.asyncio
+async def test_size_filtered_clone_never_downloads_large_files(tmp_path, origin):
+    commit_files(origin, {"app/gen [1].py": "y = 2\n" * 1000})
+    dest = tmp_path / "ws"
+    dest.mkdir()
+    cloner = RepoClonerService(f"file://{origin}", "main", "", sparse=True, max_file_bytes=1000)
+    await cloner._clone_direct(str(dest))
+
+    # Left out of the checkout already; the backstop finds nothing to remove
+    assert checked_out(dest) == EXPECTED
+    assert remove_large_files(dest, max_bytes=1000) == 0
+    assert len(missing_objects(dest, "HEAD")) >= 4
+
+
+@pytest.mark.asyncio
+async def test_sparse_checkout_from_mirror(tmp_path, origin):
+    cache = MirrorCache(tmp_path / "mirrors", max_bytes=10**9, max_file_bytes=1000)
+    for name in ("ws1", "ws2"):
+        dest = tmp_path / name
+        dest.mkdir()
+        await cache.checkout(str(origin), "main", dest, sparse=True)
+
+        assert checked_out(dest) == EXPECTED
+        assert remove_large_files(dest, max_bytes=1000) == 0
+        # Anything the workspace lacks would come from the mirror, never from upstream
+        [mirror] = cache.root.glob("*.git")
+        assert git("remote", "get-url", "origin", cwd=dest) == str(mirror)
+
+    # The mirror keeps the blobs of every file under the limit, for the next runs
+    assert len(missing_objects(mirror, "--all")) == 3
+
+
+def missing_objects(repo, revision):
+    listed = git("rev-list", "--objects", "--missing=print", revision, cwd=repo)
+    return [line for line in listed.splitlines() if line.startswith("?")]
@@ -0,0 +1,34 @@
+from app.agents.auditor_agent import AuditorAgent
+from app.agents.style_agent import StyleAgent
+from app.utils.targets import target_commands
+
+
+def test_targets_split_to_fit_the_budget():
+    targets = [f"pkg/module_{i}.py" for i in range(100)]
+    commands = list(target_commands(["ruff", "check"], targets, budget=1000))
+
+    assert len(commands) > 1
+    assert all(command[:2] == ["ruff", "check"] for command in commands)
+    assert [t for command in commands for t in command[2:]] == targets
+    assert list(target_commands(["ruff", "check"], [])) == []
+
+
+def test_option_like_targets_are_made_relative():
+    assert list(target_commands(["bandit"], ["-rf.py", "a.py"])) == [["bandit", "./-rf.py", "a.py"]]
+
+
+def test_ruff_only_sees_manifest_files(tmp_path):
+    (tmp_path / "app").mkdir()
+    (tmp_path / "app/main.py").write_text("import os\n")
+    (tmp_path / "build").mkdir()
+    (tmp_path / "build/generated.py").write_text("import sys\n")
+
+    files = AuditorAgent(str(tmp_path)).generate_dir_metadata()
+    assert files.py_paths == ["app/main.py"]
+
+    findings = StyleAgent(
+        str(tmp_path), js_ts_files=0, py_files=files.py_files, py_paths=files.py_paths
+    ).run()
+    (ruff,) = [finding for finding in findings if finding["tool"] == "ruff"]
+    paths = {issue["filename"] for issue in ruff["output"]}
+    assert paths == {str(tmp_path / "app/main.py")}
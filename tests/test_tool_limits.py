@@ -0,0 +1,67 @@
+import signal
+import sys
+
+from app.utils.subprocess_runner import run_safe_subprocess
+from app.utils.tool_limits import ToolLimits, ToolUsage, limited_command, tool_usage
+
+ALLOCATE = "x = bytearray(512 * 1024 * 1024); print(len(x))"
+
+
+def test_memory_and_cpu_limits_are_enforced():
+    unlimited = run_safe_subprocess([sys.executable, "-c", ALLOCATE], limits=ToolLimits())
+    assert unlimited["returncode"] == 0
+
+    capped = run_safe_subprocess(
+        [sys.executable, "-c", ALLOCATE], limits=ToolLimits(memory_bytes=256 * 1024**2)
+    )
+    assert capped["returncode"] != 0
+    assert "MemoryError" in capped["stderr"]
+
+    spinning = run_safe_subprocess(
+        [sys.executable, "-c", "while True: pass"], timeout=30, limits=ToolLimits(cpu_seconds=1)
+    )
+    assert spinning["returncode"] < 0  # SIGXCPU, not the timeout
+
+
+def test_usage_is_recorded_for_the_current_run():
+    usage: list[ToolUsage] = []
+    token = tool_usage.set(usage)
+    try:
+        run_safe_subprocess([sys.executable, "-c", ALLOCATE], limits=ToolLimits())
+    finally:
+        tool_usage.reset(token)
+
+    [entry] = usage
+    assert entry.returncode == 0
+    assert entry.max_rss_bytes > 512 * 1024**2
+    assert entry.user_cpu_seconds + entry.system_cpu_seconds > 0
+    assert entry.wall_seconds > 0
+
+
+def test_limited_command_wraps_in_place():
+    command = limited_command(["semgrep", "scan"], ToolLimits(memory_bytes=1024, cpu_seconds=5))
+    assert command[-2:] == ["semgrep", "scan"]
+    assert "--as=1024" in command and "--cpu=5" in command
+    assert command[command.index("nice") : command.index("nice") + 3] == ["nice", "-n", "10"]
+
+
+def test_exit_status_and_timeout_of_reaped_children():
+    usage: list[ToolUsage] = []
+    token = tool_usage.set(usage)
+    try:
+        failed = run_safe_subprocess(
+            [sys.executable, "-c", "import sys; print('out'); sys.exit('err')"],
+            limits=ToolLimits(),
+        )
+        # The child closes its pipes early and keeps running into the timeout
+        hung = run_safe_subprocess(
+            [sys.executable, "-c", "import os, time; os.close(1); os.close(2); time.sleep(30)"],
+            timeout=1,
+            limits=ToolLimits(),
+        )
+    finally:
+        tool_usage.reset(token)
+
+    assert failed == {"stdout": "out\n", "stderr": "err\n", "returncode": 1}
+    assert hung["returncode"] == -1 and "timed out" in hung["stderr"]
+    assert [entry.returncode for entry in usage] == [1, -signal.SIGKILL]
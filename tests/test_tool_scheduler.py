@@ -0,0 +1,91 @@
+import os
+import threading
+import time
+
+from app.utils import tool_scheduler
+from app.utils.cancellation import CancelScope, RunCancelled, current_scope
+from app.utils.subprocess_runner import tool_version
+from app.utils.tool_scheduler import ToolScheduler, apply_threads
+
+
+def test_slots_are_shared_across_concurrent_tools():
+    scheduler = ToolScheduler(slots=2)
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def tool():
+        nonlocal running, peak
+        with scheduler.reserve("bandit"):
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.02)
+            with lock:
+                running -= 1
+
+    threads = [threading.Thread(target=tool) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert peak == 2
+    assert scheduler.free == 2
+
+
+def test_multithreaded_tools_get_what_is_free():
+    scheduler = ToolScheduler(slots=4)
+    with scheduler.reserve("semgrep") as jobs:
+        assert jobs == 4
+    with scheduler.reserve("radon"), scheduler.reserve("semgrep") as jobs:
+        assert jobs == 3
+        assert scheduler.free == 0
+    with scheduler.reserve("git") as threads:
+        assert threads == 0 and scheduler.free == 4
+
+    command, env = apply_threads(["semgrep", "scan", "."], None, "semgrep", 3)
+    assert command[-2:] == ["--jobs", "3"] and env is None
+    command, env = apply_threads(["ruff", "check"], {"PATH": "/bin"}, "ruff", 2)
+    assert command == ["ruff", "check"] and env == {"PATH": "/bin", "RAYON_NUM_THREADS": "2"}
+
+
+def test_cancelled_run_stops_waiting_for_slots():
+    scheduler = ToolScheduler(slots=1)
+    scope = CancelScope("run_1")
+    outcome: list[BaseException] = []
+
+    def waiter():
+        current_scope.set(scope)
+        try:
+            with scheduler.reserve("bandit"):
+                pass
+        except RunCancelled as e:
+            outcome.append(e)
+
+    with scheduler.reserve("bandit"):
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        time.sleep(0.05)
+        scope.cancel()
+        thread.join(timeout=5)
+
+    assert isinstance(outcome[0], RunCancelled)
+    assert scheduler.free == 1
+
+
+def test_version_probes_bypass_the_scheduler(tmp_path, monkeypatch):
+    stub = tmp_path / "semgrep"
+    stub.write_text('#!/bin/sh\necho "$@"\n')
+    stub.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{tmp_path}:{os.environ['PATH']}")
+
+    scheduler = ToolScheduler(slots=1)
+    monkeypatch.setattr(tool_scheduler, "_scheduler", scheduler)
+    tool_version.cache_clear()
+    try:
+        # Every slot is held by a running scan; the probe neither waits nor gets --jobs
+        with scheduler.reserve("semgrep"):
+            assert tool_version("semgrep") == "--version"
+    finally:
+        tool_version.cache_clear()